@@ -1,10 +1,68 @@
+import logging
+import os
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import login, register, forgot_password, admin_register, subjects, auth, dashboard, admin_crud, student_profile, site_status
+from routers import login, register, forgot_password, admin_register, subjects, exams, auth, dashboard, admin_crud, student_profile, site_status, password_pool, db_router, query_stats
+from routers.catalog import catalog
+from routers.subject_stats import reconciler as subject_stats_reconciler
 import uvicorn
+import create_tables
 
 app = FastAPI(title="My API")
 
+
+def _run_schema_bootstrap():
+    try:
+        create_tables.bootstrap()
+    except Exception as e:
+        logging.error(f"Schema bootstrap failed: {e}")
+
+
+@app.on_event("startup")
+def start_schema_bootstrap():
+    """SCHEMA_BOOTSTRAP_ON_STARTUP=1: الـ bootstrap في thread في الخلفية — السيرفر مش بيستناه."""
+    if os.getenv("SCHEMA_BOOTSTRAP_ON_STARTUP", "0").lower() in ("1", "true", "yes"):
+        threading.Thread(target=_run_schema_bootstrap, name="schema-bootstrap", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_catalog_refresh():
+    """snapshot المواد والفصول (routers/catalog.py) بيتبني في الخلفية ويتحدث كل CATALOG_REFRESH_SECONDS."""
+    catalog.start_background_refresh()
+
+
+@app.on_event("shutdown")
+def stop_catalog_refresh():
+    catalog.stop_background_refresh()
+
+
+@app.on_event("startup")
+def start_subject_stats_reconcile():
+    """تصحيح دوري لجدول subject_stats كل SUBJECT_STATS_RECONCILE_SECONDS (routers/subject_stats.py)."""
+    subject_stats_reconciler.start()
+
+
+@app.on_event("shutdown")
+def stop_subject_stats_reconcile():
+    subject_stats_reconciler.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    password_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_replicas():
+    await db_router.db_router.dispose()
+
+
+# عدد الاستعلامات ووقت الـ DB للـ request في header الـ Server-Timing (routers/query_stats.py)
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -24,6 +82,7 @@ app.include_router(register.router, prefix="/api/v1")
 app.include_router(forgot_password.router, prefix="/api/v1")
 app.include_router(admin_register.router, prefix="/api/v1")
 app.include_router(subjects.router, prefix="/api/v1")
+app.include_router(exams.router, prefix="/api/v1")
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(admin_crud.router, prefix="/api/v1")
@@ -0,0 +1,38 @@
+# 0001_hot_path_indexes.py — indexes على الأعمدة اللي الـ routers بتفلتر وتعمل join عليها
+# من غير الـ indexes دي كل صفحة أسئلة/عدّاد داشبورد كان seq scan على الجدول كله.
+# CONCURRENTLY عشان البناء ما يقفلش الكتابة على الجداول الكبيرة (لازم برّه transaction).
+NAME = "hot_path_indexes"
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    # صفحة الأسئلة والعدّ: WHERE subject_id AND status ORDER BY order_index, id
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_subject_status_order
+       ON public.questions (subject_id, status, order_index, id)""",
+    # نفس الصفحة متفلترة بالفصل (chapter_id)
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_subject_status_chapter_order
+       ON public.questions (subject_id, status, chapter_id, order_index, id)""",
+    # اختيارات السؤال: WHERE question_id ORDER BY "order", id
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_question_choices_question_order
+       ON public.question_choices (question_id, "order", id)""",
+    # الأسئلة المحلولة للطالب (الداشبورد)
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_submissions_user_question
+       ON public.questions_submissions (user_id, question_id)""",
+    # امتحانات المادة (الداشبورد)
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_exams_questions_subject_exam
+       ON public.exams_questions (subject_id, exam_id)""",
+    # الامتحانات المحلولة للطالب
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_exams_submissions_user_exam
+       ON public.exams_submissions (user_id, exam_id)""",
+    # فصول المادة بالترتيب
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chapters_subject_order
+       ON public.chapters (subject_id, order_index)""",
+    # مواد الصف: WHERE grade ORDER BY name
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subjects_grade_name
+       ON public.subjects (grade, name)""",
+    # التحقق من الـ OTP في forgot-password
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_otp_codes_email_code
+       ON public.otp_codes (email, code)""",
+    # الـ planner يحتاج إحصائيات محدثة عشان يختار الـ index scan
+    "ANALYZE public.questions",
+    "ANALYZE public.question_choices",
+]
@@ -0,0 +1,147 @@
+# 0002_subject_stats.py — جدول subject_stats: عدد الفصول والأسئلة النشطة والامتحانات النشطة لكل مادة
+# بدل 3 subqueries مترابطة (منها COUNT(DISTINCT) على exams_questions) في كل بناء للـ catalog.
+# بيتحدث incrementally بـ triggers على مستوى الـ statement (transition tables)، فـ INSERT لألف سؤال
+# = UPDATE واحد لكل مادة مش ألف. exams_count مبيتجمعش بـ +1/-1 (DISTINCT) فبيتحسب تاني للمواد
+# اللي اتأثرت بس (index على exams_questions(subject_id, exam_id) من 0001).
+# أي انحراف بيتصلح بالـ reconcile الدوري (routers/subject_stats.py).
+NAME = "subject_stats"
+TRANSACTIONAL = True
+
+
+def _delta_function(name: str, table_filter: str, column: str) -> str:
+    """trigger function بتزود/تنقص column بعدد الصفوف (اللي بتحقق table_filter) لكل subject_id."""
+    def delta(sign: str, rows: str) -> str:
+        return f"SELECT subject_id, {sign}1 AS n FROM {rows} WHERE {table_filter}"
+
+    def apply(source: str) -> str:
+        return f"""
+            UPDATE public.subject_stats s
+            SET {column} = s.{column} + d.n, updated_at = now()
+            FROM (SELECT subject_id, SUM(n) AS n FROM ({source}) x
+                  GROUP BY subject_id HAVING SUM(n) <> 0) d
+            WHERE s.subject_id = d.subject_id;"""
+
+    return f"""
+    CREATE OR REPLACE FUNCTION public.{name}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN{apply(delta('', 'new_rows'))}
+        ELSIF TG_OP = 'DELETE' THEN{apply(delta('-', 'old_rows'))}
+        ELSE{apply(delta('', 'new_rows') + ' UNION ALL ' + delta('-', 'old_rows'))}
+        END IF;
+        RETURN NULL;
+    END
+    $$"""
+
+
+def _statement_triggers(table: str, function: str, events=("INSERT", "UPDATE", "DELETE")) -> list:
+    """trigger لكل event (الـ transition tables مبتشتغلش مع trigger واحد لأكتر من event)."""
+    statements = []
+    for event in events:
+        trigger = f"trg_subject_stats_{table}_{event.lower()}"
+        referencing = {
+            "INSERT": "NEW TABLE AS new_rows",
+            "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+            "DELETE": "OLD TABLE AS old_rows",
+        }[event]
+        statements.append(f"DROP TRIGGER IF EXISTS {trigger} ON public.{table}")
+        statements.append(f"""
+            CREATE TRIGGER {trigger} AFTER {event} ON public.{table}
+            REFERENCING {referencing}
+            FOR EACH STATEMENT EXECUTE FUNCTION public.{function}()""")
+    return statements
+
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS public.subject_stats (
+        subject_id INTEGER PRIMARY KEY REFERENCES public.subjects(id) ON DELETE CASCADE,
+        chapters_count INTEGER NOT NULL DEFAULT 0,
+        questions_count INTEGER NOT NULL DEFAULT 0,
+        exams_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    # مادة جديدة = صف أصفار (الحذف بيتمسح بالـ CASCADE)
+    """
+    CREATE OR REPLACE FUNCTION public.subject_stats_subjects() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO public.subject_stats (subject_id)
+        SELECT id FROM new_rows
+        ON CONFLICT (subject_id) DO NOTHING;
+        RETURN NULL;
+    END
+    $$""",
+    *_statement_triggers("subjects", "subject_stats_subjects", events=("INSERT",)),
+    _delta_function("subject_stats_chapters", "subject_id IS NOT NULL", "chapters_count"),
+    *_statement_triggers("chapters", "subject_stats_chapters"),
+    _delta_function("subject_stats_questions", "status = 'active'", "questions_count"),
+    *_statement_triggers("questions", "subject_stats_questions"),
+    # exams_count = COUNT(DISTINCT exam) للامتحانات النشطة — بيتحسب من جديد للمواد المتأثرة بس
+    """
+    CREATE OR REPLACE FUNCTION public.subject_stats_refresh_exams(subject_ids INTEGER[]) RETURNS void
+    LANGUAGE sql AS $$
+        UPDATE public.subject_stats s
+        SET exams_count = (
+                SELECT COUNT(DISTINCT eq.exam_id)
+                FROM public.exams_questions eq
+                JOIN public.exams e ON e.id = eq.exam_id
+                WHERE eq.subject_id = s.subject_id AND e.is_active = true
+            ),
+            updated_at = now()
+        WHERE s.subject_id = ANY(subject_ids)
+    $$""",
+    """
+    CREATE OR REPLACE FUNCTION public.subject_stats_exams_questions() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM public.subject_stats_refresh_exams(ARRAY(SELECT DISTINCT subject_id FROM new_rows));
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM public.subject_stats_refresh_exams(ARRAY(SELECT DISTINCT subject_id FROM old_rows));
+        ELSE
+            PERFORM public.subject_stats_refresh_exams(ARRAY(
+                SELECT subject_id FROM new_rows UNION SELECT subject_id FROM old_rows));
+        END IF;
+        RETURN NULL;
+    END
+    $$""",
+    *_statement_triggers("exams_questions", "subject_stats_exams_questions"),
+    # تفعيل/إيقاف امتحان أو حذفه بيغير exams_count لكل المواد اللي فيها أسئلة منه
+    """
+    CREATE OR REPLACE FUNCTION public.subject_stats_exams() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM public.subject_stats_refresh_exams(ARRAY(
+                SELECT DISTINCT eq.subject_id FROM public.exams_questions eq
+                WHERE eq.exam_id IN (SELECT id FROM old_rows)));
+        ELSE
+            PERFORM public.subject_stats_refresh_exams(ARRAY(
+                SELECT DISTINCT eq.subject_id FROM public.exams_questions eq
+                WHERE eq.exam_id IN (
+                    SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                    WHERE n.is_active IS DISTINCT FROM o.is_active)));
+        END IF;
+        RETURN NULL;
+    END
+    $$""",
+    *_statement_triggers("exams", "subject_stats_exams", events=("UPDATE", "DELETE")),
+    # الملء الأول — بعد الـ triggers: CREATE TRIGGER قافل الكتابة على الجداول لحد الـ commit
+    """
+    INSERT INTO public.subject_stats (subject_id, chapters_count, questions_count, exams_count)
+    SELECT s.id, COALESCE(c.n, 0), COALESCE(q.n, 0), COALESCE(e.n, 0)
+    FROM public.subjects s
+    LEFT JOIN (SELECT subject_id, COUNT(*) AS n FROM public.chapters GROUP BY subject_id) c
+        ON c.subject_id = s.id
+    LEFT JOIN (SELECT subject_id, COUNT(*) AS n FROM public.questions
+               WHERE status = 'active' GROUP BY subject_id) q
+        ON q.subject_id = s.id
+    LEFT JOIN (SELECT eq.subject_id, COUNT(DISTINCT eq.exam_id) AS n
+               FROM public.exams_questions eq JOIN public.exams ex ON ex.id = eq.exam_id
+               WHERE ex.is_active = true GROUP BY eq.subject_id) e
+        ON e.subject_id = s.id
+    ON CONFLICT (subject_id) DO UPDATE
+    SET chapters_count = EXCLUDED.chapters_count,
+        questions_count = EXCLUDED.questions_count,
+        exams_count = EXCLUDED.exams_count,
+        updated_at = now()
+    """,
+]
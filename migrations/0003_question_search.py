@@ -0,0 +1,73 @@
+# 0003_question_search.py — بحث نصي في الأسئلة (GET /subjects/{id}/questions/search)
+# arabic_normalize: بيشيل التشكيل والتطويل، وبيوحّد أشكال الألف/الهمزة (أ إ آ ٱ ← ا، ؤ ← و، ئ ← ي)،
+# والتاء المربوطة (ة ← ه)، والألف المقصورة (ى ← ي)، والأرقام الهندية، فـ "المعادلة" و "المعادله" و "المُعادَلة"
+# يبقوا نفس الكلمة. الـ config 'simple' (من غير stemming) عشان Postgres معندوش قاموس عربي.
+# search_vector (question_text بوزن A، والشرح بوزن B) و search_text (نص السؤال normalized للـ trigram)
+# بيتملوا بـ trigger قبل أي INSERT أو تعديل للنص، فالاستيراد بالـ COPY (routers/question_import.py) والأدمن مش محتاجين يعملوا حاجة.
+# الـ GIN indexes مركبة مع subject_id (btree_gin) وجزئية على الأسئلة النشطة: البحث بيلف على أسئلة المادة بس.
+# من غير transaction: الـ indexes بـ CONCURRENTLY، والـ backfill UPDATE واحد بيقفل الصفوف مش الجدول.
+NAME = "question_search"
+TRANSACTIONAL = False
+
+
+def _search_columns(question_text: str, explanation: str) -> tuple:
+    """(search_text, search_vector) كـ SQL expressions من عمودين النص والشرح."""
+    search_text = f"public.arabic_normalize(COALESCE({question_text}, ''))"
+    search_vector = (
+        f"setweight(to_tsvector('simple', {search_text}), 'A')"
+        f" || setweight(to_tsvector('simple', public.arabic_normalize(COALESCE({explanation}, ''))), 'B')"
+    )
+    return search_text, search_vector
+
+
+_TRIGGER_TEXT, _TRIGGER_VECTOR = _search_columns("NEW.question_text", "NEW.explanation")
+_BACKFILL_TEXT, _BACKFILL_VECTOR = _search_columns("question_text", "explanation")
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    # نفس الدالة بتتنادى على الأسئلة وعلى نص البحث، فالاتنين بيتوحدوا بنفس الطريقة
+    r"""
+    CREATE OR REPLACE FUNCTION public.arabic_normalize(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+        SELECT lower(translate(
+            regexp_replace(value, '[\u064B-\u065F\u0670\u0640]', '', 'g'),
+            'أإآٱؤئىةیک٠١٢٣٤٥٦٧٨٩',
+            'ااااوييهيك0123456789'
+        ))
+    $$
+    """,
+    """
+    ALTER TABLE public.questions
+        ADD COLUMN IF NOT EXISTS search_text TEXT,
+        ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION public.questions_search_fill() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_text := {_TRIGGER_TEXT};
+        NEW.search_vector := {_TRIGGER_VECTOR};
+        RETURN NEW;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS trg_questions_search_fill ON public.questions",
+    """
+    CREATE TRIGGER trg_questions_search_fill
+    BEFORE INSERT OR UPDATE OF question_text, explanation ON public.questions
+    FOR EACH ROW EXECUTE FUNCTION public.questions_search_fill()
+    """,
+    # بعد الـ trigger: أي سؤال يتضاف أثناء الـ backfill بيتملى لوحده
+    f"""
+    UPDATE public.questions
+    SET search_text = {_BACKFILL_TEXT}, search_vector = {_BACKFILL_VECTOR}
+    WHERE search_vector IS NULL
+    """,
+    # full-text: WHERE subject_id = $1 AND status = 'active' AND search_vector @@ tsquery
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_search_vector
+       ON public.questions USING gin (subject_id, search_vector) WHERE status = 'active'""",
+    # fuzzy (pg_trgm): WHERE subject_id = $1 AND status = 'active' AND $2 <% search_text
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_search_trgm
+       ON public.questions USING gin (subject_id, search_text gin_trgm_ops) WHERE status = 'active'""",
+    "ANALYZE public.questions",
+]
@@ -0,0 +1,15 @@
+# 0004_exam_delivery_indexes.py — indexes لتحميل حزمة الامتحان (routers/exam_packages.py)
+# أسئلة الامتحان بالترتيب واختياراتها — من غيرهم كل تحميل حزمة seq scan على exams_questions و exam_choises.
+NAME = "exam_delivery_indexes"
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    # أسئلة الامتحان: WHERE exam_id AND status ORDER BY order_index, id
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_exams_questions_exam_status_order
+       ON public.exams_questions (exam_id, status, order_index, id)""",
+    # اختيارات أسئلة الامتحان: WHERE exam_question_id = ANY(...) ORDER BY "order", id
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_exam_choises_question_order
+       ON public.exam_choises (exam_question_id, "order", id)""",
+    "ANALYZE public.exams_questions",
+    "ANALYZE public.exam_choises",
+]
@@ -0,0 +1,38 @@
+# 0005_users_phone_unique.py — unique index على users.phone_number (التسجيل بـ ON CONFLICT في routers/register.py)
+# كان في الـ baseline، ولو فيه أرقام مكررة قديمة الـ CREATE UNIQUE INDEX كان بيوقع transaction الـ baseline كلها.
+# هنا: فحص التكرار الأول — لو فيه، الـ migration بتفشل برسالة فيها الأرقام (ومبتتسجلش، فبتتعاد في التشغيل الجاي)
+# لحد ما الحسابات المكررة تتدمج أو تتمسح يدوياً (ليها submissions و sessions، فمفيش دمج أوتوماتيك).
+# بعدها الـ index بيتبني CONCURRENTLY (من غير قفل الكتابة)، ولو رقم مكرر اتسجل أثناء البناء البناء بيفشل
+# والـ runner بيمسح الـ index الـ INVALID ويعيد في المرة الجاية. الـ index القديم (غير unique) بيتمسح في الآخر.
+NAME = "users_phone_unique"
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    """
+    DO $$
+    DECLARE
+        duplicated INTEGER;
+        examples TEXT;
+    BEGIN
+        SELECT COUNT(*), string_agg(phone_number || ' (' || accounts || ' accounts)', ', ')
+                         FILTER (WHERE rank <= 20)
+        INTO duplicated, examples
+        FROM (
+            SELECT phone_number, COUNT(*) AS accounts, row_number() OVER (ORDER BY phone_number) AS rank
+            FROM public.users
+            GROUP BY phone_number
+            HAVING COUNT(*) > 1
+        ) d;
+        IF duplicated > 0 THEN
+            RAISE EXCEPTION 'users.phone_number has % duplicated numbers: %', duplicated, examples
+                USING HINT = 'Merge or delete the duplicate accounts '
+                             '(SELECT phone_number, array_agg(id ORDER BY id) FROM public.users '
+                             'GROUP BY phone_number HAVING COUNT(*) > 1), then run scripts/migrate.py again.';
+        END IF;
+    END
+    $$
+    """,
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_users_phone_number ON public.users (phone_number)",
+    # الـ unique index بيخدم نفس الـ lookups
+    "DROP INDEX CONCURRENTLY IF EXISTS public.idx_users_phone_number",
+]
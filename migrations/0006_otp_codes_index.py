@@ -0,0 +1,12 @@
+# 0006_otp_codes_index.py — index الـ OTP من 0001 تاني
+# otp_codes مكانش في الـ baseline، فـ 0001 كانت بتتخطى الـ index ده بـ warning وتتسجل متطبقة. الجدول بقى في
+# الـ baseline والـ runner بقى بيفشل لو الجدول مش موجود؛ القواعد اللي 0001 اتسجلت فيها من غير الـ index بتاخده هنا
+# (والباقي IF NOT EXISTS = ولا حاجة).
+NAME = "otp_codes_index"
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    # forgot-password: WHERE email AND code AND used = FALSE AND expires_at > now
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_otp_codes_email_code
+       ON public.otp_codes (email, code)""",
+]
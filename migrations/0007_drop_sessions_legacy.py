@@ -0,0 +1,24 @@
+# 0007_drop_sessions_legacy.py — نقل السيشنات السارية من sessions_legacy كـ digest ومسح الجدول القديم
+# create_tables.py بيغير اسم جدول sessions القديم (غير مقسّم) لـ sessions_legacy، وده فيه التوكن كامل (JWT خام).
+# السيشنات اللي لسه active ومخلصتش بتتنقل لـ public.sessions كـ SHA256 (زي token_digest في sessions_store)،
+# و expires_at = created_at + ACCESS_TOKEN_EXPIRE_MINUTES (60 دقيقة، زي session_params؛ created_at كان UTC)،
+# وبعدين الجدول بيتمسح. القواعد اللي مفيهاش sessions_legacy = ولا حاجة.
+NAME = "drop_sessions_legacy"
+TRANSACTIONAL = True
+
+STATEMENTS = [
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('public.sessions_legacy') IS NOT NULL THEN
+            INSERT INTO public.sessions (user_id, token_hash, created_at, expires_at, active)
+            SELECT user_id, sha256(convert_to(session, 'UTF8')), created_at,
+                   created_at + interval '60 minutes', TRUE
+            FROM public.sessions_legacy
+            WHERE active AND user_id IS NOT NULL AND session IS NOT NULL
+              AND created_at + interval '60 minutes' > (now() AT TIME ZONE 'UTC');
+            DROP TABLE public.sessions_legacy;
+        END IF;
+    END $$
+    """,
+]
@@ -1,12 +1,20 @@
-# admin_crud.py — CRUD للأدمن (Grades, Subjects, Chapters, Sources, Users)
+# admin_crud.py — CRUD للأدمن (Grades, Subjects, Chapters, Questions import, Sources, Users)
+import os
+import tempfile
 from datetime import date, datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from sqlalchemy import text
 from typing import Optional
 
 from .users_common import verify_user_jwt_token, create_response, engine
+from . import metrics
+from .user_cache import invalidate_user
+from .catalog import refresh_catalog
+from .response_cache import invalidate_subject_pages
+from .question_import import question_importer, QuestionImportError
 
 
 def _serialize_row(r) -> dict:
@@ -40,6 +48,13 @@ def get_current_admin(
         raise HTTPException(status_code=401, detail=str(e))
 
 
+# --- Metrics ---
+@router.get("/metrics")
+def get_metrics(payload: dict = Depends(get_current_admin)):
+    """مقاييس داخلية للعملية الحالية (طابور تشفير كلمات المرور، ...)."""
+    return create_response(True, "OK", {"data": metrics.snapshot()}, status_code=200)
+
+
 # --- Grades ---
 class GradeCreate(BaseModel):
     name: str
@@ -126,6 +141,7 @@ def create_subject(body: SubjectCreate, payload: dict = Depends(get_current_admi
             SELECT s.id, s.name, s.grade, s.stream, s.created_at, s.created_by, a.name as created_by_name
             FROM public.subjects s LEFT JOIN public.admins a ON s.created_by = a.id ORDER BY s.id DESC LIMIT 1
         """)).mappings().fetchone()
+    refresh_catalog()
     return create_response(True, "تم الإنشاء", {"data": _serialize_row(row)}, status_code=201)
 
 @router.put("/subjects/{subject_id}")
@@ -147,6 +163,8 @@ def update_subject(subject_id: int, body: SubjectUpdate, payload: dict = Depends
             SELECT s.id, s.name, s.grade, s.stream, s.created_at, s.created_by, a.name as created_by_name
             FROM public.subjects s LEFT JOIN public.admins a ON s.created_by = a.id WHERE s.id = :id
         """), {"id": subject_id}).mappings().fetchone()
+    refresh_catalog()
+    invalidate_subject_pages(subject_id)
     return create_response(True, "تم التحديث", {"data": _serialize_row(row)}, status_code=200)
 
 @router.delete("/subjects/{subject_id}")
@@ -155,6 +173,8 @@ def delete_subject(subject_id: int, payload: dict = Depends(get_current_admin)):
         r = conn.execute(text("DELETE FROM public.subjects WHERE id = :id"), {"id": subject_id})
         if r.rowcount == 0:
             raise HTTPException(status_code=404, detail="Subject not found")
+    refresh_catalog()
+    invalidate_subject_pages(subject_id)
     return create_response(True, "تم الحذف", None, status_code=200)
 
 
@@ -196,6 +216,7 @@ def create_chapter(body: ChapterCreate, payload: dict = Depends(get_current_admi
             SELECT c.id, c.subject_id, c.name, c.order_index, c.created_at, c.created_by, a.name as created_by_name
             FROM public.chapters c LEFT JOIN public.admins a ON c.created_by = a.id ORDER BY c.id DESC LIMIT 1
         """)).mappings().fetchone()
+    refresh_catalog()
     return create_response(True, "تم الإنشاء", {"data": _serialize_row(row)}, status_code=201)
 
 @router.put("/chapters/{chapter_id}")
@@ -217,17 +238,55 @@ def update_chapter(chapter_id: int, body: ChapterUpdate, payload: dict = Depends
             SELECT c.id, c.subject_id, c.name, c.order_index, c.created_at, c.created_by, a.name as created_by_name
             FROM public.chapters c LEFT JOIN public.admins a ON c.created_by = a.id WHERE c.id = :id
         """), {"id": chapter_id}).mappings().fetchone()
+    refresh_catalog()
+    invalidate_subject_pages(*{cur["subject_id"], subject_id})
     return create_response(True, "تم التحديث", {"data": _serialize_row(row)}, status_code=200)
 
 @router.delete("/chapters/{chapter_id}")
 def delete_chapter(chapter_id: int, payload: dict = Depends(get_current_admin)):
     with engine.begin() as conn:
-        r = conn.execute(text("DELETE FROM public.chapters WHERE id = :id"), {"id": chapter_id})
-        if r.rowcount == 0:
+        deleted = conn.execute(text("DELETE FROM public.chapters WHERE id = :id RETURNING subject_id"), {"id": chapter_id}).fetchone()
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Chapter not found")
+    refresh_catalog()
+    invalidate_subject_pages(deleted[0])
     return create_response(True, "تم الحذف", None, status_code=200)
 
 
+# --- Questions (bulk import) ---
+QUESTION_IMPORT_MAX_BYTES = int(os.getenv("QUESTION_IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+@router.post("/questions/import")
+async def import_questions(
+    request: Request,
+    created_by: int = Query(..., description="users.id لعمود created_by"),
+    fmt: Optional[str] = Query(None, alias="format", description="jsonl أو csv (افتراضياً من الـ Content-Type)"),
+    dry_run: bool = Query(False, description="راجع بس من غير ما تحفظ"),
+    payload: dict = Depends(get_current_admin),
+):
+    """
+    استيراد بنك أسئلة (JSONL أو CSV في body الطلب مباشرة) — routers/question_import.py.
+    الـ body بيتكتب في ملف مؤقت وهو بيوصل، والاستيراد نفسه (COPY + merge) في threadpool.
+    """
+    fmt = fmt or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as bundle:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > QUESTION_IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"File larger than {QUESTION_IMPORT_MAX_BYTES} bytes")
+            bundle.write(chunk)
+        bundle.seek(0)
+        try:
+            report = await run_in_threadpool(question_importer.run, bundle, fmt, created_by, dry_run)
+        except QuestionImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if report["inserted"] and not dry_run:
+        await run_in_threadpool(refresh_catalog)
+        invalidate_subject_pages(*report["subject_ids"])
+    return create_response(True, "تمت المراجعة" if dry_run else "تم الاستيراد", {"data": report}, status_code=200)
+
+
 # --- Sources ---
 class SourceCreate(BaseModel):
     name: str
@@ -381,6 +440,7 @@ def update_user(user_id: int, body: UserUpdate, payload: dict = Depends(get_curr
             }
         )
         row = conn.execute(text("SELECT id, name, phone_number, grade, account_status, role, created_at FROM public.users WHERE id = :id"), {"id": user_id}).mappings().fetchone()
+    invalidate_user(user_id)
     return create_response(True, "تم التحديث", {"data": _serialize_row(row)}, status_code=200)
 
 @router.delete("/users/{user_id}")
@@ -389,4 +449,5 @@ def delete_user(user_id: int, payload: dict = Depends(get_current_admin)):
         r = conn.execute(text("DELETE FROM public.users WHERE id = :id"), {"id": user_id})
         if r.rowcount == 0:
             raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user(user_id)
     return create_response(True, "تم الحذف", None, status_code=200)
@@ -1,10 +1,13 @@
 # admin_register.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy import text
 from datetime import datetime
 import logging
 from .users_common import engine, validate_phone_number, create_user_jwt_token, create_response, hash_password, verify_password
+from .rate_limit import login_rate_limit
+from .password_pool import verify_and_update_password_async, PasswordPoolBusy
 
 router = APIRouter()
 
@@ -14,8 +17,25 @@ class AdminLoginBody(BaseModel):
     password: str
 
 
-@router.post("/admin/login")
-def admin_login(body: AdminLoginBody):
+def _fetch_admin(phone_number: str):
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT * FROM public.admins WHERE phone_number = :phone_number"),
+            {"phone_number": phone_number}
+        ).mappings().fetchone()
+
+
+def _upgrade_admin_password(admin_id: int, hashed: str, old_hash: str):
+    # بس لو الهاش لسه هو اللي اتحقق منه
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE public.admins SET password = :hashed WHERE id = :admin_id AND password = :old_hash"),
+            {"hashed": hashed, "admin_id": admin_id, "old_hash": old_hash}
+        )
+
+
+@router.post("/admin/login", dependencies=[Depends(login_rate_limit)])
+async def admin_login(body: AdminLoginBody):
     """تسجيل دخول الأدمن — يتحقق من جدول admins ويرجع توكن برول admin."""
     try:
         phone_number = (body.phone_number or "").strip()
@@ -27,24 +47,26 @@ def admin_login(body: AdminLoginBody):
         except ValueError as e:
             return create_response(False, str(e), status_code=400)
 
-        with engine.connect() as connection:
-            admin = connection.execute(
-                text("SELECT * FROM public.admins WHERE phone_number = :phone_number"),
-                {"phone_number": phone_number}
-            ).mappings().fetchone()
+        admin = await run_in_threadpool(_fetch_admin, phone_number)
 
-            if not admin:
-                return create_response(False, "Invalid credentials", status_code=401)
-            stored_password = (admin["password"] or "").strip()
-            if not verify_password(password, stored_password):
-                return create_response(False, "Invalid credentials", status_code=401)
+        if not admin:
+            return create_response(False, "Invalid credentials", status_code=401)
+        stored_password = (admin["password"] or "").strip()
+        password_ok, new_hash = await verify_and_update_password_async(password, stored_password)
+        if not password_ok:
+            return create_response(False, "Invalid credentials", status_code=401)
+        if new_hash:
+            await run_in_threadpool(_upgrade_admin_password, admin["id"], new_hash, admin["password"])
 
-            admin_id = admin["id"]
-            created_at = admin.get("created_at") or datetime.utcnow()
-            role = admin.get("role") or "admin"
-            token = create_user_jwt_token(admin_id, created_at, role=role)
+        admin_id = admin["id"]
+        created_at = admin.get("created_at") or datetime.utcnow()
+        role = admin.get("role") or "admin"
+        token = create_user_jwt_token(admin_id, created_at, role=role)
 
         return create_response(True, "Login successful", {"token": token, "token_type": "bearer"}, status_code=200)
+    except PasswordPoolBusy:
+        logging.warning("Admin login rejected: password pool is busy")
+        return create_response(False, "Server is busy, please try again shortly", status_code=503)
     except Exception as e:
         logging.error(f"Error in admin_login: {str(e)}")
         return create_response(False, str(e), status_code=500)
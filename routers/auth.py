@@ -1,17 +1,20 @@
 # auth.py — التحقق من التوكن والـ authentication
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import text
-from .users_common import verify_user_jwt_token, create_response, engine
+from .users_common import verify_user_jwt_token, create_response
+from .user_cache import get_user_profile_async
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
 ):
-    """يستخرج التوكن من Authorization: Bearer <token> ويفحصه ويرجع الـ payload (user_id, role, ...)."""
+    """
+    يستخرج التوكن من Authorization: Bearer <token> ويفحصه ويرجع الـ payload (user_id, role, ...).
+    async عشان FastAPI ما يبعتهاش للـ threadpool: غالباً lookup في كاش التوكنات، والـ hop للـ thread كان أغلى منه.
+    """
     if not credentials:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     token = credentials.credentials
@@ -23,7 +26,7 @@ def get_current_user(
 
 
 @router.get("/verify")
-def verify_token(payload: dict = Depends(get_current_user)):
+async def verify_token(payload: dict = Depends(get_current_user)):
     """
     يتحقق من صلاحية التوكن.
     يتوقع: Authorization: Bearer <token>
@@ -32,13 +35,9 @@ def verify_token(payload: dict = Depends(get_current_user)):
     user_id = payload.get("user_id")
     name = None
     if user_id:
-        with engine.connect() as connection:
-            row = connection.execute(
-                text("SELECT name FROM public.users WHERE id = :user_id"),
-                {"user_id": user_id},
-            ).fetchone()
-            if row:
-                name = row[0]
+        profile = await get_user_profile_async(user_id)
+        if profile:
+            name = profile["name"]
     return create_response(
         True,
         "Token is valid",
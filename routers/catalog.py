@@ -0,0 +1,242 @@
+# catalog.py — snapshot في الذاكرة لشجرة المواد والفصول وأعدادها لكل صف
+# /subjects/available و /subjects/with-counts و /subjects/{id}/chapters بيتخدموا من هنا من غير DB.
+# الـ snapshot مبيتعدلش أبداً: أي rebuild بيبني snapshot جديد ويبدّل المرجع مرة واحدة (atomic)،
+# فالطلب اللي ماسك snapshot قديم بيكمل عليه عادي.
+# بيتبني تاني بعد أي create/update/delete لمادة أو فصل من admin_crud (في نفس الـ worker)،
+# وكل CATALOG_REFRESH_SECONDS في الخلفية كاحتياط (workers تانية / تعديلات من برّه الـ API).
+# الأعداد من جدول subject_stats (migrations/0002_subject_stats.py) — scan واحد بالـ primary key؛
+# لو الـ migration لسه متطبقتش بنرجع للـ subqueries القديمة على الجداول نفسها.
+# وفيه كمان إجمالي الأسئلة والامتحانات النشطة لكل صف (نفس الرقم لكل طلبة الصف) لـ /dashboard/stats.
+# مع DB_JSON_RENDERING: قوايم with-counts والفصول بتتعمل encode مرة واحدة مع كل snapshot،
+# والـ handler بيلزق الـ bytes في الرد على طول.
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from . import metrics
+from .database import engine
+from .queries import DB_JSON_RENDERING
+from .users_common import render_json
+
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "300"))
+
+CATALOG_SUBJECTS_SQL = """
+    SELECT s.id, s.name, s.grade, s.stream,
+        st.chapters_count, st.questions_count, st.exams_count
+    FROM public.subjects s
+    LEFT JOIN public.subject_stats st ON st.subject_id = s.id
+    ORDER BY s.grade, s.name
+"""
+
+# قبل 0002: نفس الأعداد محسوبة لكل مادة
+CATALOG_SUBJECTS_LIVE_SQL = """
+    SELECT s.id, s.name, s.grade, s.stream,
+        (SELECT COUNT(*) FROM public.chapters c WHERE c.subject_id = s.id) AS chapters_count,
+        (SELECT COUNT(*) FROM public.questions q WHERE q.subject_id = s.id AND q.status = 'active') AS questions_count,
+        (SELECT COUNT(DISTINCT eq.exam_id) FROM public.exams_questions eq
+         JOIN public.exams e ON e.id = eq.exam_id
+         WHERE eq.subject_id = s.id AND e.is_active = true) AS exams_count
+    FROM public.subjects s
+    ORDER BY s.grade, s.name
+"""
+
+# امتحان ممكن يكون فيه أسئلة من أكتر من مادة، فالعدد لكل صف مش مجموع exams_count بتاع المواد
+CATALOG_GRADE_EXAMS_SQL = """
+    SELECT s.grade, COUNT(DISTINCT eq.exam_id) AS exams_count
+    FROM public.exams_questions eq
+    JOIN public.subjects s ON s.id = eq.subject_id
+    JOIN public.exams e ON e.id = eq.exam_id
+    WHERE e.is_active = true
+    GROUP BY s.grade
+"""
+
+CATALOG_CHAPTERS_SQL = """
+    SELECT id, subject_id, name, order_index
+    FROM public.chapters
+    ORDER BY subject_id, order_index ASC, name ASC
+"""
+
+
+def with_counts_item(subject: dict) -> dict:
+    """مادة في رد /subjects/with-counts."""
+    return {
+        "id": subject["id"],
+        "name": subject["name"] or "",
+        "grade": subject["grade"] or "",
+        "stream": subject["stream"] or "",
+        "chapters_count": subject["chapters_count"],
+        "questions_count": subject["questions_count"],
+        "exams_count": subject["exams_count"],
+    }
+
+
+class CatalogSnapshot:
+    """
+    subjects_by_grade:   {grade: ({id, name, grade, stream, chapters_count, questions_count, exams_count}, ...)}
+    subjects:            {subject_id: نفس الـ dict}
+    chapters_by_subject: {subject_id: ({id, subject_id, name, order}, ...)}
+    grade_totals:        {grade: (questions_count, exams_count)} — الأسئلة النشطة والامتحانات النشطة للصف
+    rendered_with_counts / rendered_chapters: نفس القوايم JSON جاهز (bytes) لو render_json=True
+    """
+
+    __slots__ = ("subjects_by_grade", "subjects", "chapters_by_subject", "grade_totals", "built_at",
+                 "rendered_with_counts", "rendered_chapters")
+
+    def __init__(self, subject_rows, chapter_rows, grade_exam_rows=(), render: bool = DB_JSON_RENDERING):
+        subjects_by_grade = {}
+        subjects = {}
+        for row in subject_rows:
+            subject = {
+                "id": row["id"],
+                "name": row["name"],
+                "grade": row["grade"],
+                "stream": row["stream"],
+                "chapters_count": row["chapters_count"] or 0,
+                "questions_count": row["questions_count"] or 0,
+                "exams_count": row["exams_count"] or 0,
+            }
+            subjects[subject["id"]] = subject
+            subjects_by_grade.setdefault(subject["grade"], []).append(subject)
+        chapters_by_subject = {}
+        for row in chapter_rows:
+            chapters_by_subject.setdefault(row["subject_id"], []).append({
+                "id": row["id"],
+                "subject_id": row["subject_id"],
+                "name": row["name"],
+                "order": row["order_index"],
+            })
+        self.subjects_by_grade = {grade: tuple(items) for grade, items in subjects_by_grade.items()}
+        self.subjects = subjects
+        self.chapters_by_subject = {sid: tuple(items) for sid, items in chapters_by_subject.items()}
+        grade_exams = {row["grade"]: row["exams_count"] for row in grade_exam_rows}
+        self.grade_totals = {
+            grade: (sum(subject["questions_count"] for subject in items), grade_exams.get(grade, 0))
+            for grade, items in self.subjects_by_grade.items()
+        }
+        self.rendered_with_counts = {}
+        self.rendered_chapters = {}
+        if render:
+            self.rendered_with_counts = {
+                grade: render_json([with_counts_item(subject) for subject in items])
+                for grade, items in self.subjects_by_grade.items()
+            }
+            self.rendered_chapters = {sid: render_json(items) for sid, items in self.chapters_by_subject.items()}
+        self.built_at = time.time()
+
+    def grade_subjects(self, grade: str) -> tuple:
+        return self.subjects_by_grade.get(grade, ())
+
+    def subject_for_grade(self, subject_id: int, grade: str) -> dict | None:
+        subject = self.subjects.get(subject_id)
+        return subject if subject is not None and subject["grade"] == grade else None
+
+    def totals_for_grade(self, grade: str) -> tuple:
+        """(عدد الأسئلة النشطة، عدد الامتحانات النشطة) في مواد الصف."""
+        return self.grade_totals.get(grade, (0, 0))
+
+    def chapters(self, subject_id: int) -> tuple:
+        return self.chapters_by_subject.get(subject_id, ())
+
+    def with_counts_json(self, grade: str) -> bytes:
+        return self.rendered_with_counts.get(grade, b"[]")
+
+    def chapters_json(self, subject_id: int) -> bytes:
+        return self.rendered_chapters.get(subject_id, b"[]")
+
+
+class GradeCatalog:
+    def __init__(self, refresh_seconds: float = CATALOG_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._build_lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self.rebuilds = 0
+        self.failures = 0
+        self.live_count_builds = 0
+        self.build_ms = metrics.LatencyStats()
+
+    def _build(self) -> CatalogSnapshot:
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            try:
+                subject_rows = conn.execute(text(CATALOG_SUBJECTS_SQL)).mappings().fetchall()
+            except ProgrammingError:
+                # subject_stats مش موجود لسه (الـ bootstrap شغال أو الـ migrations متطبقتش)
+                conn.rollback()
+                subject_rows = conn.execute(text(CATALOG_SUBJECTS_LIVE_SQL)).mappings().fetchall()
+                self.live_count_builds += 1
+            chapter_rows = conn.execute(text(CATALOG_CHAPTERS_SQL)).mappings().fetchall()
+            grade_exam_rows = conn.execute(text(CATALOG_GRADE_EXAMS_SQL)).mappings().fetchall()
+        snapshot = CatalogSnapshot(subject_rows, chapter_rows, grade_exam_rows)
+        self._snapshot = snapshot
+        self.rebuilds += 1
+        self.build_ms.observe((time.perf_counter() - started) * 1000)
+        return snapshot
+
+    def rebuild(self) -> CatalogSnapshot:
+        """يبني snapshot جديد من الـ primary ويبدّله. بيتنادى بعد أي تعديل في المواد/الفصول."""
+        with self._build_lock:
+            return self._build()
+
+    def get(self) -> CatalogSnapshot:
+        """الـ snapshot الحالي — أول مرة بيتبني (blocking، فمن async يتنادى في threadpool)."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            return self._snapshot or self._build()
+
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"Catalog refresh failed: {e}")
+            if self._stop.wait(self.refresh_seconds):
+                return
+
+    def start_background_refresh(self):
+        """thread في الخلفية: يبني الـ snapshot فوراً وبعدين كل refresh_seconds."""
+        if self._refresher is None or not self._refresher.is_alive():
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="catalog-refresh", daemon=True)
+            self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "age_seconds": round(time.time() - snapshot.built_at, 1) if snapshot else None,
+            "subjects": len(snapshot.subjects) if snapshot else 0,
+            "grades": sorted(g or "" for g in snapshot.subjects_by_grade) if snapshot else [],
+            "refresh_seconds": self.refresh_seconds,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures,
+            "live_count_builds": self.live_count_builds,
+            "build": self.build_ms.snapshot(),
+        }
+
+
+catalog = GradeCatalog()
+metrics.register("catalog", catalog.stats)
+
+
+def refresh_catalog():
+    """لـ admin_crud: يعيد بناء الـ snapshot بعد الـ commit. فشل البناء ما يفشلش طلب الأدمن."""
+    try:
+        catalog.rebuild()
+    except Exception as e:
+        catalog.failures += 1
+        logging.error(f"Catalog rebuild after admin change failed: {e}")
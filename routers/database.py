@@ -0,0 +1,167 @@
+# database.py — مصنع الـ engine المشترك (إعدادات الـ pool من environment variables) ومقاييس الـ pool
+#
+# DATABASE_URL               رابط قاعدة البيانات (افتراضياً السيرفر الحالي)
+# WEB_CONCURRENCY            عدد الـ workers (uvicorn/gunicorn) — ميزانية الـ connections بتتقسم عليهم
+# DB_MAX_CONNECTIONS         إجمالي الـ connections المسموح بيها من كل الـ workers على الـ primary (افتراضياً 60)
+# DB_ASYNC_POOL_SHARE        نصيب الـ async_engine من ميزانية الـ worker (افتراضياً 0.5) — الباقي للـ engine الـ sync
+# DB_POOL_SIZE / DB_MAX_OVERFLOW               لتحديد حجم pool الـ engine الـ sync لكل worker يدوياً بدل الحساب
+# DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW   نفس الكلام للـ async_engine (وكل replica في db_router)
+# DB_POOL_TIMEOUT            ثواني انتظار connection من الـ pool قبل الخطأ (افتراضياً 10)
+# DB_POOL_RECYCLE            ثواني قبل إعادة فتح الـ connection (افتراضياً 1800)
+# DB_STATEMENT_TIMEOUT_MS    statement_timeout على السيرفر (افتراضياً 15000)
+#
+# async_engine (postgresql+asyncpg) لمسارات القراءة الـ async — بيشتغل على الـ event loop
+# مباشرةً بدل ما ياخد thread من threadpool الـ Starlette (40 thread افتراضياً).
+# الاتنين بيتقاسموا نفس الميزانية: sync + async لكل الـ workers <= DB_MAX_CONNECTIONS (مش الضعف).
+# الـ replicas (db_router.py) بتاخد حجم الـ async pool بس على سيرفراتها هي، فمبتتحسبش من ميزانية الـ primary.
+import logging
+import os
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from . import metrics
+
+db_user = os.getenv("DB_USER", "postgres")
+db_password = os.getenv("DB_PASSWORD", "x4IQEBxzpSwDSUIcYxqNfsuEY40jzdrTP5AMKWiDppbAY4kevp0KeL3odvWHqhfE")
+db_host = os.getenv("DB_HOST", "37.60.236.213")
+db_port = os.getenv("DB_PORT", "5432")
+db_name = os.getenv("DB_NAME", "naqwa")
+database_url = os.getenv(
+    "DATABASE_URL",
+    f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
+)
+
+
+def to_async_url(url: str) -> str:
+    """نفس الرابط بـ driver الـ asyncpg."""
+    scheme, sep, rest = url.partition("://")
+    return f"postgresql+asyncpg{sep}{rest}"
+
+
+async_database_url = os.getenv("ASYNC_DATABASE_URL", to_async_url(database_url))
+
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "60"))
+DB_ASYNC_POOL_SHARE = min(1.0, max(0.0, float(os.getenv("DB_ASYNC_POOL_SHARE", "0.5"))))
+
+
+def _split_budget(connections: int) -> tuple:
+    """(pool_size, max_overflow) من عدد connections: التلتين ثابتين والتلت overflow، والمجموع مبيزيدش عنه."""
+    pool_size = max(1, connections * 2 // 3)
+    return pool_size, max(0, connections - pool_size)
+
+
+_WORKER_BUDGET = max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+_ASYNC_BUDGET = max(1, int(_WORKER_BUDGET * DB_ASYNC_POOL_SHARE))
+_SYNC_BUDGET = max(1, _WORKER_BUDGET - _ASYNC_BUDGET)
+_sync_pool_size, _sync_max_overflow = _split_budget(_SYNC_BUDGET)
+_async_pool_size, _async_max_overflow = _split_budget(_ASYNC_BUDGET)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", _sync_pool_size))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", _sync_max_overflow))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", _async_pool_size))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", _async_max_overflow))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+
+class _WaitInstrumentedPool:
+    """Mixin بيقيس وقت انتظار الـ checkout (الوقت اللي الطلب بيستناه لحد ما ياخد connection)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = metrics.LatencyStats()
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.observe((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.wait_stats = self.wait_stats
+        return new_pool
+
+
+class InstrumentedQueuePool(_WaitInstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitInstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def create_db_engine(url: str = database_url, **overrides):
+    """ينشئ engine بإعدادات الـ pool الموحدة. أي إعداد ممكن يتغير بـ overrides."""
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+    }
+    options.update(overrides)
+    return create_engine(url, **options)
+
+
+def create_async_db_engine(url: str = async_database_url, **overrides):
+    """نسخة async من create_db_engine (asyncpg) بحجم الـ async pool (DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW)."""
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": DB_ASYNC_POOL_SIZE,
+        "max_overflow": DB_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}},
+    }
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
+
+def pool_metrics(db_engine) -> dict:
+    pool = db_engine.pool
+    result = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout_seconds": pool.timeout(),
+    }
+    if isinstance(pool, _WaitInstrumentedPool):
+        result["checkout_timeouts"] = pool.timeouts
+        result["checkout_wait"] = pool.wait_stats.snapshot()
+    return result
+
+
+engine = create_db_engine()
+async_engine = create_async_db_engine()
+_primary_connections = (DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW) * WEB_CONCURRENCY
+if _primary_connections > DB_MAX_CONNECTIONS:
+    logging.warning(
+        f"DB pools can open {_primary_connections} connections across {WEB_CONCURRENCY} workers "
+        f"(sync {DB_POOL_SIZE}+{DB_MAX_OVERFLOW}, async {DB_ASYNC_POOL_SIZE}+{DB_ASYNC_MAX_OVERFLOW} per worker), "
+        f"over DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS}"
+    )
+_connection_counts = {"opened": 0}
+
+
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    _connection_counts["opened"] += 1
+
+
+metrics.register("db_pool", lambda: {**pool_metrics(engine), "connections_opened": _connection_counts["opened"]})
+metrics.register("async_db_pool", lambda: pool_metrics(async_engine.sync_engine))
@@ -0,0 +1,277 @@
+# db_router.py — توجيه القراءة للـ replicas والكتابة للـ primary
+#
+# DB_REPLICA_URLS             روابط الـ replicas مفصولة بفاصلة (فاضي = كل القراءة على الـ primary)
+# DB_REPLICA_MAX_LAG_SECONDS  أقصى تأخير مسموح للـ replica قبل ما القراءة ترجع للـ primary (افتراضياً 5)
+# DB_REPLICA_CHECK_SECONDS    كل قد إيه نفحص الـ lag وحالة الـ replicas (افتراضياً 5)
+# DB_REPLICA_CONNECT_TIMEOUT  ثواني فتح connection للـ replica قبل ما نعتبرها واقعة (افتراضياً 2)
+# DB_STICKY_PRIMARY_SECONDS   بعد كتابة المستخدم، قراءاته بتفضل على الـ primary المدة دي (افتراضياً 10)
+#
+# الـ handler بيعلن نيته: async with db_router.connect(READ, user_id=...) أو connect(WRITE).
+# القراءة بتتوزع round-robin على الـ replicas السليمة، ولو كلها واقعة/متأخرة أو المستخدم لسه كاتب
+# حاجة بتروح للـ primary (async_engine). الـ sticky window داخل الـ worker بس.
+# قدام كل pool طابور FIFO (PoolGate) بحجمه: الـ asyncio.Queue بتاعة الـ pool مش عادلة — connection راجعة
+# بياخدها طلب لسه واصل قبل اللي مستني، فتحت ضغط (500 عميل) طلبات بتفضل مستنية لحد DB_POOL_TIMEOUT وتفشل.
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+
+from . import metrics
+from .database import (
+    async_engine, create_async_db_engine, pool_metrics, to_async_url, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS,
+)
+
+READ = "read"
+WRITE = "write"
+
+DB_REPLICA_URLS = [u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+DB_STICKY_PRIMARY_SECONDS = float(os.getenv("DB_STICKY_PRIMARY_SECONDS", "10"))
+
+# الـ lag = صفر لو الـ replica طبّقت كل اللي استلمته (عشان الـ primary الهادي ميبانش متأخر)
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_CONNECT_ERRORS = (OSError, asyncio.TimeoutError, SQLAlchemyError)
+
+
+class PoolGate:
+    """طابور عادل (FIFO) قدام الـ pool: أقصى عدد طلبات جوه = pool_size + max_overflow، والباقي بيستنى بالدور."""
+
+    def __init__(self, engine):
+        pool = engine.sync_engine.pool
+        self.capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        self._semaphore = asyncio.Semaphore(self.capacity)
+        self.waiting = 0
+        self.timeouts = 0
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeoutError(
+                f"{self.capacity} connections busy, waited {DB_POOL_TIMEOUT:.2f} s for one"
+            ) from None
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {"capacity": self.capacity, "waiting": self.waiting, "timeouts": self.timeouts}
+
+
+class Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.gate = PoolGate(engine)
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = False  # لحد أول فحص
+        self.lag_seconds = None
+        self.checked_at = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "url": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": pool_metrics(self.engine.sync_engine),
+            "gate": self.gate.stats(),
+        }
+
+
+class DatabaseRouter:
+    def __init__(self, primary, replica_engines=(), max_lag_seconds: float = DB_REPLICA_MAX_LAG_SECONDS,
+                 check_seconds: float = DB_REPLICA_CHECK_SECONDS, sticky_seconds: float = DB_STICKY_PRIMARY_SECONDS):
+        self.primary = primary
+        self.primary_gate = PoolGate(primary)
+        self.replicas = [Replica(e) for e in replica_engines]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.sticky_seconds = sticky_seconds
+        self._round_robin = itertools.count()
+        self._sticky = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._check_task = None
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.fallbacks = 0
+        self.writes = 0
+
+    # ---------- sticky primary بعد الكتابة ----------
+
+    def mark_write(self, user_id):
+        """يتنادى بعد أي كتابة تخص المستخدم: قراءاته تفضل على الـ primary لمدة sticky_seconds."""
+        if not user_id or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sticky) > 10000:
+                self._sticky = {k: v for k, v in self._sticky.items() if v > now}
+            self._sticky[user_id] = now + self.sticky_seconds
+
+    def _is_sticky(self, user_id) -> bool:
+        if not user_id:
+            return False
+        with self._lock:
+            deadline = self._sticky.get(user_id)
+            if deadline is None:
+                return False
+            if deadline <= time.monotonic():
+                del self._sticky[user_id]
+                return False
+            return True
+
+    # ---------- فحص الـ replicas ----------
+
+    async def _check_replica(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                lag = await asyncio.wait_for(
+                    conn.scalar(text(REPLICA_LAG_SQL)), timeout=DB_REPLICA_CONNECT_TIMEOUT
+                )
+            replica.lag_seconds = round(float(lag or 0), 3)
+            replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+            replica.last_error = None if replica.healthy else "lagging"
+        except _CONNECT_ERRORS as e:
+            replica.healthy = False
+            replica.failures += 1
+            replica.last_error = type(e).__name__
+            logging.warning(f"Replica {replica.name} check failed: {e}")
+        replica.checked_at = time.time()
+
+    async def refresh_health(self):
+        self._last_check = time.monotonic()
+        await asyncio.gather(*(self._check_replica(r) for r in self.replicas))
+
+    def _maybe_refresh(self):
+        """الفحص بيشتغل في الخلفية — الطلب الحالي ما بيستناهوش."""
+        if not self.replicas or time.monotonic() - self._last_check < self.check_seconds:
+            return
+        if self._check_task is not None and not self._check_task.done():
+            return
+        self._last_check = time.monotonic()
+        self._check_task = asyncio.get_running_loop().create_task(self.refresh_health())
+
+    # ---------- اختيار الـ engine ----------
+
+    def _pick_replica(self, intent: str, user_id) -> Replica | None:
+        if intent != READ or not self.replicas:
+            return None
+        if self._is_sticky(user_id):
+            self.sticky_reads += 1
+            return None
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            self.fallbacks += 1
+            return None
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    @asynccontextmanager
+    async def connect(self, intent: str = READ, user_id=None):
+        """AsyncConnection حسب النية: READ -> replica سليمة أو الـ primary، WRITE -> الـ primary."""
+        if intent not in (READ, WRITE):
+            raise ValueError(f"Unknown intent: {intent}")
+        self._maybe_refresh()
+        connection = None
+        replica = self._pick_replica(intent, user_id)
+        if replica is not None:
+            # الانتظار في الطابور مش عطل: لو خلص الوقت الطلب بيفشل من غير ما الـ replica تتعلّم واقعة
+            await replica.gate.acquire()
+            try:
+                connection = await replica.engine.connect()
+            except _CONNECT_ERRORS as e:
+                replica.gate.release()
+                # واقعة — نعلّمها لحد الفحص الجاي ونكمل على الـ primary
+                replica.healthy = False
+                replica.failures += 1
+                replica.last_error = type(e).__name__
+                self.fallbacks += 1
+                logging.warning(f"Replica {replica.name} unavailable, reading from primary: {e}")
+            except BaseException:
+                replica.gate.release()
+                raise
+            else:
+                gate = replica.gate
+                replica.reads += 1
+        if connection is None:
+            await self.primary_gate.acquire()
+            try:
+                connection = await self.primary.connect()
+            except BaseException:
+                self.primary_gate.release()
+                raise
+            gate = self.primary_gate
+            if intent == WRITE:
+                self.writes += 1
+            else:
+                self.primary_reads += 1
+        if intent == WRITE:
+            # قبل الـ yield: كتابة عملت commit وبعدين الـ body رمى exception لازم برضه تخلي قراءاته على الـ primary
+            self.mark_write(user_id)
+        try:
+            yield connection
+        finally:
+            try:
+                await connection.close()
+            finally:
+                gate.release()
+            if intent == WRITE:
+                # الـ window تبدأ من آخر الكتابة مش من أولها
+                self.mark_write(user_id)
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sticky_users = len(self._sticky)
+        return {
+            "replicas": [r.stats() for r in self.replicas],
+            "max_lag_seconds": self.max_lag_seconds,
+            "sticky_seconds": self.sticky_seconds,
+            "sticky_users": sticky_users,
+            "primary_gate": self.primary_gate.stats(),
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "fallbacks": self.fallbacks,
+            "writes": self.writes,
+        }
+
+
+def _create_replica_engine(url: str):
+    return create_async_db_engine(
+        to_async_url(url),
+        connect_args={
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+            "timeout": DB_REPLICA_CONNECT_TIMEOUT,
+        },
+    )
+
+
+db_router = DatabaseRouter(async_engine, [_create_replica_engine(u) for u in DB_REPLICA_URLS])
+metrics.register("db_router", db_router.stats)
@@ -0,0 +1,188 @@
+# exam_packages.py — حزمة الامتحان في الذاكرة: بيانات الامتحان وكل أسئلته واختياراتها بتتحمل مرة واحدة
+# لكل امتحان (في كل worker) وبتتخدم لكل الطلبة من الذاكرة. آلاف الطلبة اللي بيبدأوا نفس الامتحان الساعة 9:00
+# = تحميل واحد: أول طلب بيبدأ التحميل والباقيين بيستنوا نفس الـ task (single-flight) بدل ما كل واحد يروح للـ DB.
+# نسخة كل طالب (الأسئلة اللي هتظهر له وترتيبها وترتيب الاختيارات) من random.Random بـ seed ثابت
+# (exam_id, user_id): نفس الطالب بياخد نفس الامتحان لو عمل refresh أو اتقطع ورجع — على أي worker —
+# من غير ORDER BY random() ومن غير ما نخزن حاجة. الحزمة مفيهاش is_correct ولا الشرح.
+#
+# EXAM_PACKAGE_TTL_SECONDS  عمر الحزمة في الذاكرة (افتراضياً 300) — تعديلات الامتحان بتظهر بعدها
+# EXAM_PACKAGE_MAX_SIZE     أقصى عدد امتحانات في الذاكرة (افتراضياً 256)
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from . import metrics
+from .db_router import db_router, READ
+from .queries import hot_queries
+
+EXAM_PACKAGE_TTL_SECONDS = float(os.getenv("EXAM_PACKAGE_TTL_SECONDS", "300"))
+EXAM_PACKAGE_MAX_SIZE = int(os.getenv("EXAM_PACKAGE_MAX_SIZE", "256"))
+# امتحان مش موجود/مش نشط بيتكاش وقت قصير بس — امتحان اتفعّل قبل ميعاده بدقيقة لازم يظهر على طول
+EXAM_PACKAGE_MISSING_TTL_SECONDS = 10
+
+
+def _exam_question(row) -> dict:
+    """سؤال امتحان بالشكل اللي بيتبعت للطالب (من غير الشرح)."""
+    return {
+        "id": row["id"],
+        "subject_id": row["subject_id"],
+        "chapter_id": row["chapter_id"],
+        "question_text": row["question_text"],
+        "question_image_url": row["question_image_url"],
+        "question_type": row["question_type"],
+        "difficulty": row["difficulty"],
+        "expected_time": row["expected_time"],
+    }
+
+
+class ExamPackage:
+    """
+    exam:        {id, title, description, duration, num_to_show, shuffle_questions, shuffle_options, required}
+    questions:   ((سؤال, (اختيار, ...)), ...) بترتيب order_index ثم id
+    subject_ids: المواد اللي أسئلة الامتحان تبعها (للتأكد من صف الطالب)
+    مبتتعدلش بعد البناء، فكل الطلبة بيقروا نفس النسخة من غير lock.
+    """
+
+    __slots__ = ("exam", "questions", "subject_ids", "built_at")
+
+    def __init__(self, exam_row, question_rows, choices_by_question: dict):
+        self.exam = {
+            "id": exam_row["id"],
+            "title": exam_row["title"],
+            "description": exam_row["description"],
+            "duration": exam_row["duration"],
+            "num_to_show": exam_row["num_to_show"],
+            "shuffle_questions": bool(exam_row["shuffle_questions"]),
+            "shuffle_options": bool(exam_row["shuffle_options"]),
+            "required": bool(exam_row["required"]),
+        }
+        self.questions = tuple(
+            (_exam_question(row), tuple(choices_by_question.get(row["id"], ())))
+            for row in question_rows
+        )
+        self.subject_ids = frozenset(row["subject_id"] for row in question_rows)
+        self.built_at = time.time()
+
+    def question_count(self) -> int:
+        """عدد الأسئلة اللي بتظهر لكل طالب."""
+        num_to_show = self.exam["num_to_show"]
+        if num_to_show and 0 < num_to_show < len(self.questions):
+            return num_to_show
+        return len(self.questions)
+
+    def for_student(self, user_id: int) -> list:
+        """
+        أسئلة الطالب بالترتيب اللي هتظهر بيه: num_to_show سؤال من الـ pool (أو كلهم)، متلخبطين لو
+        shuffle_questions، واختيارات كل سؤال متلخبطة لو shuffle_options. نفس (exam_id, user_id) = نفس النتيجة.
+        """
+        rng = random.Random(f"{self.exam['id']}:{user_id}")
+        count = self.question_count()
+        if count < len(self.questions):
+            picked = rng.sample(range(len(self.questions)), count)
+            if not self.exam["shuffle_questions"]:
+                picked.sort()
+        else:
+            picked = list(range(count))
+            if self.exam["shuffle_questions"]:
+                rng.shuffle(picked)
+        questions = []
+        for position, index in enumerate(picked, 1):
+            question, choices = self.questions[index]
+            if self.exam["shuffle_options"]:
+                choices = rng.sample(choices, len(choices))
+            questions.append({**question, "position": position, "choices": list(choices)})
+        return questions
+
+
+class ExamPackageCache:
+    def __init__(self, ttl_seconds: float = EXAM_PACKAGE_TTL_SECONDS, max_size: int = EXAM_PACKAGE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = {}   # exam_id -> (ExamPackage | None, expires_at)
+        self._loading = {}   # exam_id -> asyncio.Task — التحميل الشغال دلوقتي
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.load_ms = metrics.LatencyStats()
+
+    async def _load(self, exam_id: int):
+        """3 استعلامات: الامتحان، أسئلته، اختيارات كل الأسئلة. None لو مش موجود أو مش نشط."""
+        started = time.perf_counter()
+        async with db_router.connect(READ) as connection:
+            exam_row = await hot_queries.fetchrow(connection, "exam_meta", exam_id)
+            package = None
+            if exam_row is not None:
+                question_rows = await hot_queries.fetch(connection, "exam_questions_pool", exam_id)
+                choices_by_question = {}
+                if question_rows:
+                    for row in await hot_queries.fetch(connection, "exam_choices_batch",
+                                                       [q["id"] for q in question_rows]):
+                        choices_by_question.setdefault(row["exam_question_id"], []).append(
+                            {"id": row["id"], "text": row["text"]})
+                package = ExamPackage(exam_row, question_rows, choices_by_question)
+        ttl = self.ttl_seconds if package is not None else min(self.ttl_seconds, EXAM_PACKAGE_MISSING_TTL_SECONDS)
+        with self._lock:
+            self._entries.pop(exam_id, None)
+            if len(self._entries) >= self.max_size:
+                # الأقدم تحميلاً يطلع الأول
+                del self._entries[next(iter(self._entries))]
+            self._entries[exam_id] = (package, time.monotonic() + ttl)
+        self.load_ms.observe((time.perf_counter() - started) * 1000)
+        return package
+
+    def _load_done(self, exam_id: int, task: asyncio.Task):
+        self._loading.pop(exam_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+            logging.error(f"Exam package load failed for exam_id: {exam_id}: {task.exception()}")
+
+    async def get(self, exam_id: int) -> ExamPackage | None:
+        """الحزمة من الذاكرة، أو تحميل واحد مشترك لكل الطلبات اللي وصلت قبل ما يخلص."""
+        with self._lock:
+            entry = self._entries.get(exam_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+        task = self._loading.get(exam_id)
+        if task is None:
+            self.loads += 1
+            task = asyncio.ensure_future(self._load(exam_id))
+            self._loading[exam_id] = task
+            task.add_done_callback(lambda t: self._load_done(exam_id, t))
+        else:
+            self.coalesced += 1
+        # shield: لو الطالب اللي بدأ التحميل قفل الاتصال، التحميل يكمل للباقيين
+        return await asyncio.shield(task)
+
+    def invalidate(self, exam_id: int):
+        with self._lock:
+            self._entries.pop(exam_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        requests = self.hits + self.loads + self.coalesced
+        return {
+            "entries": entries,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "hit_rate": round((self.hits + self.coalesced) / requests, 4) if requests else 0,
+            "load": self.load_ms.snapshot(),
+        }
+
+
+exam_packages = ExamPackageCache()
+metrics.register("exam_packages", exam_packages.stats)
@@ -0,0 +1,57 @@
+# exams.py — تسليم الامتحان للطالب
+# الامتحان كله من حزمة في الذاكرة (routers/exam_packages.py) — مفيش استعلام لكل طالب.
+from fastapi import APIRouter, Header
+import logging
+from .users_common import create_response
+from .exam_packages import exam_packages
+from .subjects import decode_token_and_get_user, _catalog_snapshot
+
+router = APIRouter()
+
+
+@router.get("/exams/{exam_id}/start")
+async def start_exam(exam_id: int, authorization: str = Header(None)):
+    """
+    بدء امتحان: بيانات الامتحان + أسئلة الطالب (من غير الإجابات الصحيحة ولا الشرح).
+    الأسئلة اللي بتظهر وترتيبها وترتيب الاختيارات ثابتين لنفس الطالب في نفس الامتحان (seed = exam_id + user_id)،
+    فإعادة الطلب بعد انقطاع بترجع نفس الامتحان.
+    Requires JWT token in Authorization header: "Bearer <token>"
+    """
+    try:
+        user_id, result = await decode_token_and_get_user(authorization)
+        if not user_id:
+            return result
+
+        grade = result.get("grade")
+        if not grade:
+            logging.warning(f"User grade not set for user_id: {user_id}")
+            return create_response(False, "User grade not configured", status_code=400)
+
+        package = await exam_packages.get(exam_id)
+        snapshot = await _catalog_snapshot()
+        # الامتحان متاح لو أسئلته تبع مادة من مواد صف الطالب
+        if package is None or not package.questions or not any(
+            snapshot.subject_for_grade(subject_id, grade) for subject_id in package.subject_ids
+        ):
+            logging.warning(f"Exam {exam_id} not found or not available for grade {grade}")
+            return create_response(False, "Exam not found or not available for your grade", status_code=404)
+
+        questions = package.for_student(user_id)
+        logging.info(f"Exam {exam_id} started with {len(questions)} questions for user_id: {user_id}")
+
+        return create_response(True, "Exam started successfully", {
+            "exam": {
+                "id": package.exam["id"],
+                "title": package.exam["title"],
+                "description": package.exam["description"],
+                "duration": package.exam["duration"],
+                "required": package.exam["required"],
+                "question_count": len(questions),
+            },
+            "questions": questions,
+            "count": len(questions)
+        }, status_code=200)
+
+    except Exception as e:
+        logging.error(f"Error in start_exam: {str(e)}")
+        return create_response(False, f"An error occurred: {str(e)}", status_code=500)
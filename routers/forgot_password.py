@@ -1,10 +1,13 @@
 # forgot_password.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy import text
 from datetime import datetime
 import logging
-from .users_common import engine, validate_phone_number, create_response, hash_password
+from .users_common import engine, validate_phone_number, create_response
+from .rate_limit import login_rate_limit
+from .password_pool import hash_password_async, PasswordPoolBusy
 
 router = APIRouter()
 
@@ -16,8 +19,94 @@ class ForgotPasswordBody(BaseModel):
     new_password: str
 
 
-@router.post("/forgot-password")
-def forgot_password(body: ForgotPasswordBody):
+def _check_user_and_otp(phone_number: str | None, email: str | None, otp: str, identifier: str):
+    """يتحقق من وجود المستخدم وصلاحية الـ OTP. يرجع response بالخطأ أو None لو كله تمام."""
+    # Check if user exists in database
+    with engine.connect() as connection:
+        if phone_number:
+            user = connection.execute(
+                text("SELECT * FROM public.users WHERE phone_number = :phone_number"),
+                {"phone_number": phone_number}
+            ).mappings().fetchone()
+        else:
+            user = connection.execute(
+                text("SELECT * FROM public.users WHERE email = :email"),
+                {"email": email}
+            ).mappings().fetchone()
+        
+        if not user:
+            logging.warning(f"Forgot password failed: user not found for {identifier}")
+            return create_response(False, "User not found. Please check your phone number or email address.", status_code=404)
+        
+        # Validate OTP if email is provided
+        if email:
+            otp_record = connection.execute(
+                text("""
+                    SELECT * FROM public.otp_codes 
+                    WHERE email = :email 
+                    AND code = :otp 
+                    AND used = FALSE
+                    AND expires_at > :current_time
+                """),
+                {
+                    "email": email,
+                    "otp": otp,
+                    "current_time": datetime.utcnow()
+                }
+            ).mappings().fetchone()
+            
+            if not otp_record:
+                logging.warning(f"Invalid or expired OTP for forgot password: {email}")
+                return create_response(False, "Invalid or expired OTP code. Please request a new OTP.", status_code=400)
+    return None
+
+
+def _update_password(phone_number: str | None, email: str | None, otp: str, new_password_hashed: str):
+    with engine.begin() as connection:  # commit automatically
+        # Mark OTP as used if email was provided
+        if email:
+            connection.execute(
+                text("""
+                    UPDATE public.otp_codes 
+                    SET used = TRUE 
+                    WHERE email = :email 
+                    AND code = :otp
+                """),
+                {
+                    "email": email,
+                    "otp": otp
+                }
+            )
+        
+        # Update user password (مشفر)
+        if phone_number:
+            connection.execute(
+                text("""
+                    UPDATE public.users 
+                    SET password = :new_password
+                    WHERE phone_number = :phone_number
+                """),
+                {
+                    "phone_number": phone_number,
+                    "new_password": new_password_hashed
+                }
+            )
+        else:
+            connection.execute(
+                text("""
+                    UPDATE public.users 
+                    SET password = :new_password
+                    WHERE email = :email
+                """),
+                {
+                    "email": email,
+                    "new_password": new_password_hashed
+                }
+            )
+
+
+@router.post("/forgot-password", dependencies=[Depends(login_rate_limit)])
+async def forgot_password(body: ForgotPasswordBody):
     try:
         phone_number = body.phone_number
         email = body.email
@@ -40,94 +129,21 @@ def forgot_password(body: ForgotPasswordBody):
                 return create_response(False, str(e), status_code=400)
         
         logging.info(f"Forgot password attempt for phone: {phone_number} or email: {email}")
+        identifier = phone_number or email
         
-        # Check if user exists in database
-        with engine.connect() as connection:
-            if phone_number:
-                user = connection.execute(
-                    text("SELECT * FROM public.users WHERE phone_number = :phone_number"),
-                    {"phone_number": phone_number}
-                ).mappings().fetchone()
-                identifier = phone_number
-            else:
-                user = connection.execute(
-                    text("SELECT * FROM public.users WHERE email = :email"),
-                    {"email": email}
-                ).mappings().fetchone()
-                identifier = email
-            
-            if not user:
-                logging.warning(f"Forgot password failed: user not found for {identifier}")
-                return create_response(False, "User not found. Please check your phone number or email address.", status_code=404)
-            
-            # Validate OTP if email is provided
-            if email:
-                otp_record = connection.execute(
-                    text("""
-                        SELECT * FROM public.otp_codes 
-                        WHERE email = :email 
-                        AND code = :otp 
-                        AND used = FALSE
-                        AND expires_at > :current_time
-                    """),
-                    {
-                        "email": email,
-                        "otp": otp,
-                        "current_time": datetime.utcnow()
-                    }
-                ).mappings().fetchone()
-                
-                if not otp_record:
-                    logging.warning(f"Invalid or expired OTP for forgot password: {email}")
-                    return create_response(False, "Invalid or expired OTP code. Please request a new OTP.", status_code=400)
+        error_response = await run_in_threadpool(_check_user_and_otp, phone_number, email, otp, identifier)
+        if error_response is not None:
+            return error_response
         
         # OTP is valid, hash and update password
-        new_password_hashed = hash_password(new_password)
-        with engine.begin() as connection:  # commit automatically
-            # Mark OTP as used if email was provided
-            if email:
-                connection.execute(
-                    text("""
-                        UPDATE public.otp_codes 
-                        SET used = TRUE 
-                        WHERE email = :email 
-                        AND code = :otp
-                    """),
-                    {
-                        "email": email,
-                        "otp": otp
-                    }
-                )
-            
-            # Update user password (مشفر)
-            if phone_number:
-                connection.execute(
-                    text("""
-                        UPDATE public.users 
-                        SET password = :new_password
-                        WHERE phone_number = :phone_number
-                    """),
-                    {
-                        "phone_number": phone_number,
-                        "new_password": new_password_hashed
-                    }
-                )
-            else:
-                connection.execute(
-                    text("""
-                        UPDATE public.users 
-                        SET password = :new_password
-                        WHERE email = :email
-                    """),
-                    {
-                        "email": email,
-                        "new_password": new_password_hashed
-                    }
-                )
+        new_password_hashed = await hash_password_async(new_password)
+        await run_in_threadpool(_update_password, phone_number, email, otp, new_password_hashed)
         logging.info(f"Password updated successfully for {identifier}")
         return create_response(True, "Password updated successfully", status_code=200)
     
+    except PasswordPoolBusy:
+        logging.warning("Forgot password rejected: password pool is busy")
+        return create_response(False, "Server is busy, please try again shortly", status_code=503)
     except Exception as e:
         logging.error(f"Error in forgot_password: {str(e)}")
         return create_response(False, f"An error occurred: {str(e)}", status_code=500)
-
@@ -0,0 +1,76 @@
+# jwt_cache.py — كاش LRU للتوكنات اللي اتعمل لها verify قبل كده
+# الطالب اللي بيقلب في صفحات الأسئلة بيبعت نفس التوكن مئات المرات؛ بدل ما نعمل
+# decode + HMAC verify كل مرة، بنحفظ الـ payload بمفتاح SHA256 للتوكن لحد وقت الـ exp.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+
+class VerifiedTokenCache:
+    """LRU محدود الحجم: المفتاح digest للتوكن، والقيمة (payload, exp كـ unix timestamp)."""
+
+    def __init__(self, max_size: int = JWT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, exp = entry
+            if exp is not None and now >= exp:
+                # التوكن انتهى — نمسحه ونسيب jwt.decode يرجع خطأ الانتهاء
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(payload)
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(payload), float(exp) if exp is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / total, 4) if total else 0,
+            }
+
+
+verified_tokens = VerifiedTokenCache()
+metrics.register("jwt_cache", verified_tokens.stats)
@@ -0,0 +1,40 @@
+# loaders.py — batch loaders: البيانات التابعة لمجموعة ids في استعلام واحد (= ANY) بدل استعلام لكل id
+# أي endpoint بيعرض أسئلة (صفحة الأسئلة، الامتحانات، التدريب) يستخدمها بدل loop فيه query.
+from .queries import hot_queries
+
+
+def _choice(row) -> dict:
+    return {"id": row["id"], "text": row["text"], "is_correct": row["is_correct"], "order": row["order"]}
+
+
+def question_item(row, choices: list) -> dict:
+    """سؤال (صف فيه QUESTION_COLUMNS) بالشكل اللي الـ API بيرجعه، مع اختياراته."""
+    return {
+        "id": row["id"],
+        "subject_id": row["subject_id"],
+        "chapter_id": row["chapter_id"],
+        "question_text": row["question_text"],
+        "question_image_url": row["question_image_url"],
+        "question_type": row["question_type"],
+        "difficulty": row["difficulty"],
+        "expected_time": row["expected_time"],
+        "explanation": row["explanation"],
+        "order_index": row["order_index"],
+        "choices": choices,
+    }
+
+
+async def load_question_choices(connection, question_ids) -> dict:
+    """
+    {question_id: [choice, ...]} لكل id في question_ids (سؤال من غير اختيارات = []).
+    الاختيارات مرتبة بـ "order" ثم id زي الاستعلام القديم لكل سؤال.
+    connection: AsyncConnection (asyncpg).
+    """
+    ids = list(dict.fromkeys(question_ids))
+    choices = {question_id: [] for question_id in ids}
+    if not ids:
+        return choices
+    rows = await hot_queries.fetch(connection, "question_choices_batch", ids)
+    for row in rows:
+        choices[row["question_id"]].append(_choice(row))
+    return choices
@@ -1,10 +1,15 @@
 # login.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy import text
 from datetime import datetime
 import logging
-from .users_common import engine, create_user_jwt_token, validate_phone_number, create_response, verify_password, hash_password
+from .users_common import engine, create_user_jwt_token, validate_phone_number, create_response
+from .sessions_store import INSERT_SESSION_SQL, session_params
+from .rate_limit import login_rate_limit
+from .password_pool import verify_and_update_password_async, PasswordPoolBusy
+from .db_router import db_router
 
 router = APIRouter()
 
@@ -15,8 +20,48 @@ class LoginBody(BaseModel):
     password: str
 
 
-@router.post("/login")
-def login(body: LoginBody):
+# ترقية الهاش (لو محتاج) + إضافة السيشن في statement واحد — الـ statement الواحد atomic بذاته.
+# الترقية بس لو الهاش لسه هو اللي اتحقق منه (لو كلمة المرور اتغيرت في النص مبنرجعش القديمة)
+LOGIN_WRITE_SQL = f"""
+    WITH upgraded AS (
+        UPDATE public.users SET password = :new_hash
+        WHERE id = :user_id AND CAST(:new_hash AS VARCHAR) IS NOT NULL AND password = :old_hash
+        RETURNING id
+    )
+    {INSERT_SESSION_SQL}
+"""
+
+
+def _autocommit_connection():
+    """statement واحد لكل connection: من غير BEGIN/COMMIT (round trip واحد للـ statement + الـ pre-ping)."""
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _fetch_user(phone_number: str, email: str):
+    """الأعمدة المطلوبة فقط (بدون SELECT *). الـ connection بيرجع للـ pool قبل bcrypt."""
+    with _autocommit_connection() as connection:
+        if phone_number:
+            return connection.execute(
+                text("SELECT id, password, created_at FROM public.users WHERE phone_number = :phone_number"),
+                {"phone_number": phone_number}
+            ).mappings().fetchone()
+        return connection.execute(
+            text("SELECT id, password, created_at FROM public.users WHERE email = :email"),
+            {"email": email}
+        ).mappings().fetchone()
+
+
+def _write_login(user_id: int, token: str, new_hash: str | None, old_hash: str):
+    """ترقية الهاش والسيشن مع بعض — statement واحد atomic بذاته فمش محتاج transaction."""
+    with _autocommit_connection() as connection:
+        connection.execute(
+            text(LOGIN_WRITE_SQL),
+            {**session_params(user_id, token, datetime.utcnow()), "new_hash": new_hash, "old_hash": old_hash}
+        )
+
+
+@router.post("/login", dependencies=[Depends(login_rate_limit)])
+async def login(body: LoginBody):
     try:
         phone_number = (body.phone_number or "").strip()
         email = (body.email or "").strip()
@@ -36,77 +81,54 @@ def login(body: LoginBody):
         
         logging.info(f"Login attempt for phone: {phone_number} or email: {email}")
 
-        with engine.connect() as connection:
-            if phone_number:
-                user = connection.execute(
-                    text("SELECT * FROM public.users WHERE phone_number = :phone_number"),
-                    {"phone_number": phone_number}
-                ).mappings().fetchone()
-                identifier = phone_number
-            else:
-                user = connection.execute(
-                    text("SELECT * FROM public.users WHERE email = :email"),
-                    {"email": email}
-                ).mappings().fetchone()
-                identifier = email
-
-            if not user:
-                logging.warning(f"Login failed: user not found for {identifier}")
-                return create_response(False, "Invalid credentials", status_code=401)
-
-            stored_password = (user["password"] or "").strip()
-            if not verify_password(password, stored_password):
-                logging.warning(f"Login failed: incorrect password for {identifier}")
-                return create_response(False, "Invalid credentials", status_code=401)
-
-            # ترقية كلمة مرور قديمة (نص عادي) إلى هاش عند أول دخول ناجح
-            if not (stored_password.startswith("$2") or stored_password.startswith("$b$")):
-                with engine.begin() as upgrade_conn:
-                    if phone_number:
-                        upgrade_conn.execute(
-                            text("UPDATE public.users SET password = :hashed WHERE id = :user_id"),
-                            {"hashed": hash_password(password), "user_id": user["id"]}
-                        )
-                    else:
-                        upgrade_conn.execute(
-                            text("UPDATE public.users SET password = :hashed WHERE id = :user_id"),
-                            {"hashed": hash_password(password), "user_id": user["id"]}
-                        )
-
-            # Get user_id and created_at from user
-            user_id = user["id"]
-            created_at = user.get("created_at")
-            
-            # If created_at is None, use current time (shouldn't happen but safety check)
-            if not created_at:
-                created_at = datetime.utcnow()
-            
-            # Create JWT token with user_id, created_at, and role (same as register)
-            token = create_user_jwt_token(user_id, created_at, "user")
-            
-            # Insert session into sessions table
-            with engine.begin() as conn:
-                conn.execute(
-                    text("""
-                        INSERT INTO public.sessions (user_id, session, created_at, active)
-                        VALUES (:user_id, :session, :created_at, :active)
-                    """),
-                    {
-                        "user_id": user_id,
-                        "session": token,
-                        "created_at": datetime.utcnow(),
-                        "active": True
-                    }
-                )
-            
-            logging.info(f"Login successful for {identifier}, user_id: {user_id}")
-
-            return create_response(True, "Login successful", {
-                "token": token,
-                "token_type": "bearer"
-            }, status_code=200)
+        return await _login(phone_number, email, password)
     
+    except PasswordPoolBusy:
+        logging.warning("Login rejected: password pool is busy")
+        return create_response(False, "Server is busy, please try again shortly", status_code=503)
     except Exception as e:
         logging.error(f"Error in login: {str(e)}")
         return create_response(False, f"An error occurred: {str(e)}", status_code=500)
 
+
+async def _login(phone_number: str, email: str, password: str):
+    """
+    القراءة ثم bcrypt ثم الكتابة. مفيش connection محجوز أثناء طابور bcrypt (~250ms) — وإلا موجة دخول
+    بتخلّص الـ pool وباقي الـ endpoints الـ sync تستنى DB_POOL_TIMEOUT.
+    الدخول الناجح = 4 round trips: (pre-ping + SELECT) ثم (pre-ping + الـ write CTE)، والفاشل أول اتنين بس.
+    """
+    user = await run_in_threadpool(_fetch_user, phone_number, email)
+    identifier = phone_number or email
+
+    if not user:
+        logging.warning(f"Login failed: user not found for {identifier}")
+        return create_response(False, "Invalid credentials", status_code=401)
+
+    stored_password = (user["password"] or "").strip()
+    password_ok, new_hash = await verify_and_update_password_async(password, stored_password)
+    if not password_ok:
+        logging.warning(f"Login failed: incorrect password for {identifier}")
+        return create_response(False, "Invalid credentials", status_code=401)
+
+    # Get user_id and created_at from user
+    user_id = user["id"]
+    created_at = user.get("created_at")
+    
+    # If created_at is None, use current time (shouldn't happen but safety check)
+    if not created_at:
+        created_at = datetime.utcnow()
+    
+    # Create JWT token with user_id, created_at, and role (same as register)
+    token = create_user_jwt_token(user_id, created_at, "user")
+    
+    # ترقية الهاش القديم (لو new_hash موجود — مثلاً bcrypt من غير prefix بيتعمله tag فمبقاش فيه تحقق مزدوج)
+    # + إضافة السيشن في statement واحد
+    await run_in_threadpool(_write_login, user_id, token, new_hash, user["password"])
+    db_router.mark_write(user_id)
+    
+    logging.info(f"Login successful for {identifier}, user_id: {user_id}")
+
+    return create_response(True, "Login successful", {
+        "token": token,
+        "token_type": "bearer"
+    }, status_code=200)
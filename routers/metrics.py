@@ -0,0 +1,70 @@
+# metrics.py — سجل مقاييس داخل العملية (in-process) تقرأها نقطة /admin/metrics
+import threading
+
+# حدود الـ buckets بالمللي ثانية لهيستوجرام الزمن
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+class LatencyStats:
+    """
+    عداد زمن بسيط وآمن مع الـ threads: عدد المرات، المجموع، الأقصى، وهيستوجرام بـ buckets ثابتة.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self._lock = threading.Lock()
+        self._buckets_ms = tuple(buckets_ms)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._count = 0
+            self._total_ms = 0.0
+            self._max_ms = 0.0
+            self._bucket_counts = [0] * (len(self._buckets_ms) + 1)
+
+    def observe(self, elapsed_ms: float):
+        with self._lock:
+            self._count += 1
+            self._total_ms += elapsed_ms
+            if elapsed_ms > self._max_ms:
+                self._max_ms = elapsed_ms
+            for i, bound in enumerate(self._buckets_ms):
+                if elapsed_ms <= bound:
+                    self._bucket_counts[i] += 1
+                    break
+            else:
+                self._bucket_counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histogram = {f"le_{bound}ms": n for bound, n in zip(self._buckets_ms, self._bucket_counts)}
+            histogram["inf"] = self._bucket_counts[-1]
+            return {
+                "count": self._count,
+                "total_ms": round(self._total_ms, 3),
+                "avg_ms": round(self._total_ms / self._count, 3) if self._count else 0,
+                "max_ms": round(self._max_ms, 3),
+                "histogram": histogram,
+            }
+
+
+def register(name: str, provider):
+    """تسجيل دالة ترجع dict بالمقاييس تحت اسم قسم (مثلاً "password_pool")."""
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def snapshot() -> dict:
+    """قراءة كل المقاييس المسجلة. أي provider يفشل يرجع الخطأ بدل ما يوقع الباقي."""
+    with _providers_lock:
+        providers = dict(_providers)
+    result = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
@@ -0,0 +1,177 @@
+# migrations.py — runner للـ migrations المرقّمة في مجلد migrations/ مع تسجيل نسخة الـ schema
+#
+# كل ملف migrations/NNNN_name.py فيه:
+#   NAME           وصف قصير
+#   TRANSACTIONAL  True = كل الـ STATEMENTS في transaction واحدة، False = AUTOCOMMIT (لازم لـ CONCURRENTLY)
+#   STATEMENTS     قائمة SQL بتتنفذ بالترتيب
+# النسخة = رقم الملف، وبتتسجل في public.schema_migrations بعد ما الـ migration تخلص.
+# الـ runner ماسك pg_advisory_lock طول التشغيل، فلو أكتر من container بدأ مع بعض واحد بس بيطبّق
+# والباقيين بياخدوا MigrationLocked.
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from .database import database_url
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+MIGRATION_LOCK_KEY = 0x6E61717761  # "naqwa"
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+([\w.]+)",
+    re.IGNORECASE,
+)
+
+CREATE_SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS public.schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum VARCHAR(64) NOT NULL,
+        duration_ms INTEGER,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+class MigrationLocked(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version: int, path: str):
+        self.version = version
+        self.path = path
+        with open(path, "rb") as f:
+            self.checksum = hashlib.sha256(f.read()).hexdigest()
+        spec = importlib.util.spec_from_file_location(f"migrations_{version:04d}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.name = module.NAME
+        self.transactional = getattr(module, "TRANSACTIONAL", True)
+        self.statements = list(module.STATEMENTS)
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_RE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}: {versions}")
+    return migrations
+
+
+def _migration_engine():
+    """engine منفصل بدون pool وبدون statement_timeout — بناء index على جدول كبير بياخد دقايق."""
+    return create_engine(
+        database_url,
+        poolclass=NullPool,
+        connect_args={"options": f"-c statement_timeout=0 -c lock_timeout={MIGRATION_LOCK_TIMEOUT}"},
+    )
+
+
+def applied_versions(conn) -> dict:
+    conn.execute(text(CREATE_SCHEMA_MIGRATIONS_SQL))
+    rows = conn.execute(text("SELECT version, checksum FROM public.schema_migrations")).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def _run_concurrent_index(conn, statement: str):
+    """
+    CREATE INDEX CONCURRENTLY: بيمسح index فاضل INVALID من محاولة فاشلة. لو الجدول مش موجود الـ migration
+    بتفشل (ومبتتسجلش) بدل ما تتسجل متطبقة من غير الـ index.
+    """
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    index_name, table = match.group(1), match.group(2)
+    if conn.execute(text("SELECT to_regclass(:t)"), {"t": table}).scalar() is None:
+        raise RuntimeError(f"Migration: table {table} not found for index {index_name}")
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": index_name}).scalar()
+    if invalid:
+        logging.warning(f"Migration: dropping invalid index {index_name} left by an interrupted build")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+    conn.execute(text(statement))
+
+
+def _record(conn, migration: Migration, duration_ms: int):
+    conn.execute(text("""
+        INSERT INTO public.schema_migrations (version, name, checksum, duration_ms)
+        VALUES (:version, :name, :checksum, :duration_ms)
+    """), {"version": migration.version, "name": migration.name,
+           "checksum": migration.checksum, "duration_ms": duration_ms})
+
+
+def _apply(db_engine, conn, migration: Migration):
+    """conn: الـ connection الماسكة الـ lock (AUTOCOMMIT). الـ migrations الـ transactional بتاخد connection تانية."""
+    started = time.perf_counter()
+    if migration.transactional:
+        with db_engine.begin() as tx:
+            for statement in migration.statements:
+                tx.execute(text(statement))
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            _record(tx, migration, duration_ms)
+    else:
+        for statement in migration.statements:
+            if _CONCURRENT_INDEX_RE.search(statement):
+                _run_concurrent_index(conn, statement)
+            else:
+                conn.execute(text(statement))
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        _record(conn, migration, duration_ms)
+    logging.info(f"Migration {migration!r} applied in {duration_ms} ms")
+    return duration_ms
+
+
+def status() -> dict:
+    """{current_version, applied, pending, changed} — changed = migrations اتعدلت بعد ما اتطبقت."""
+    migrations = load_migrations()
+    db_engine = _migration_engine()
+    try:
+        with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            applied = applied_versions(conn)
+    finally:
+        db_engine.dispose()
+    return {
+        "current_version": max(applied, default=0),
+        "applied": sorted(applied),
+        "pending": [repr(m) for m in migrations if m.version not in applied],
+        "changed": [repr(m) for m in migrations if m.version in applied and applied[m.version] != m.checksum],
+    }
+
+
+def migrate(target: int | None = None) -> list:
+    """يطبّق الـ migrations اللي لسه متطبقتش (لحد target لو محدد). يرجع قائمة (migration, duration_ms)."""
+    migrations = [m for m in load_migrations() if target is None or m.version <= target]
+    db_engine = _migration_engine()
+    done = []
+    try:
+        with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+                raise MigrationLocked("Another migration run holds the lock")
+            try:
+                applied = applied_versions(conn)
+                for migration in migrations:
+                    if migration.version in applied:
+                        if applied[migration.version] != migration.checksum:
+                            logging.warning(f"Migration {migration!r} changed after it was applied")
+                        continue
+                    done.append((migration, _apply(db_engine, conn, migration)))
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    finally:
+        db_engine.dispose()
+    return done
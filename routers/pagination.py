@@ -0,0 +1,96 @@
+# pagination.py — cursor معتم (opaque) للـ keyset pagination + كاش لعدد الأسئلة
+# الـ cursor = base64url لـ JSON بآخر مفتاح في الصفحة، فالعميل بيرجعه زي ما هو من غير ما يفهمه.
+import base64
+import json
+import os
+import threading
+import time
+
+from . import metrics
+
+QUESTIONS_DEFAULT_PER_PAGE = 50
+QUESTIONS_MAX_PER_PAGE = int(os.getenv("QUESTIONS_MAX_PER_PAGE", "100"))
+QUESTION_COUNT_TTL_SECONDS = float(os.getenv("QUESTION_COUNT_TTL_SECONDS", "60"))
+
+
+def encode_cursor(key: dict) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """يرجع الـ dict اللي اتعمله encode. ValueError لو الـ cursor بايظ."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def question_cursor(row) -> str:
+    """cursor بعد سؤال معين: (order_index, id) بنفس ترتيب الصفحة."""
+    return encode_cursor({"o": row["order_index"], "i": row["id"]})
+
+
+def parse_question_cursor(cursor: str) -> tuple:
+    """(order_index | None, id) من cursor صفحة الأسئلة."""
+    key = decode_cursor(cursor)
+    order_index, last_id = key.get("o"), key.get("i")
+    if not isinstance(last_id, int) or not (order_index is None or isinstance(order_index, int)):
+        raise ValueError("Invalid cursor")
+    return order_index, last_id
+
+
+def search_cursor(score: float, question_id: int) -> str:
+    """cursor بعد نتيجة بحث: (score, id) بنفس ترتيب النتائج (score DESC, id ASC)."""
+    return encode_cursor({"s": score, "i": question_id})
+
+
+def parse_search_cursor(cursor: str) -> tuple:
+    """(score, id) من cursor البحث."""
+    key = decode_cursor(cursor)
+    score, last_id = key.get("s"), key.get("i")
+    if not isinstance(last_id, int) or isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError("Invalid cursor")
+    return float(score), last_id
+
+
+class QuestionCountCache:
+    """عدد الأسئلة النشطة لكل (subject_id, chapter_id) لمدة TTL — بدل COUNT(*) على كل صفحة."""
+
+    def __init__(self, ttl_seconds: float = QUESTION_COUNT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject_id: int, chapter_id: int | None) -> int | None:
+        with self._lock:
+            entry = self._entries.get((subject_id, chapter_id))
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, subject_id: int, chapter_id: int | None, count: int):
+        with self._lock:
+            self._entries[(subject_id, chapter_id)] = (count, time.monotonic() + self.ttl_seconds)
+
+    def invalidate_subject(self, subject_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == subject_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "ttl_seconds": self.ttl_seconds,
+                    "hits": self.hits, "misses": self.misses}
+
+
+question_counts = QuestionCountCache()
+metrics.register("question_counts", question_counts.stats)
@@ -0,0 +1,110 @@
+# password_pool.py — تشغيل bcrypt (hash/verify) على process pool منفصل بدل threadpool الخاص بالـ FastAPI
+# bcrypt بـ 12 round ياخد حوالي 250ms لكل عملية؛ لو اشتغل في handler عادي بيحجز thread من
+# الـ threadpool المشترك ويجوّع الـ endpoints الخفيفة (/site-status, /subjects/available).
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import metrics
+from .users_common import hash_password, verify_password, verify_and_update_password
+
+# عدد الـ workers = عدد الأنوية افتراضياً، وطول الطابور الأقصى (قيد التنفيذ + منتظر)
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 1))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", PASSWORD_POOL_WORKERS * 8))
+
+
+class PasswordPoolBusy(Exception):
+    """الطابور ممتلئ — الـ router يرجع 503 فوراً بدل ما يستنى."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = 0
+_inflight_lock = threading.Lock()
+_rejected = 0
+_hash_latency = metrics.LatencyStats()
+_verify_latency = metrics.LatencyStats()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """إنشاء الـ pool عند أول استخدام (spawn لتفادي fork لعملية فيها threads)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logging.info(f"Password pool started with {PASSWORD_POOL_WORKERS} workers")
+    return _executor
+
+
+def _acquire_slot():
+    global _inflight, _rejected
+    with _inflight_lock:
+        if _inflight >= PASSWORD_POOL_MAX_QUEUE:
+            _rejected += 1
+            raise PasswordPoolBusy("Password hashing queue is full")
+        _inflight += 1
+
+
+def _release_slot():
+    global _inflight
+    with _inflight_lock:
+        _inflight -= 1
+
+
+async def _run(stats: metrics.LatencyStats, fn, *args):
+    _acquire_slot()
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _release_slot()
+        stats.observe((time.perf_counter() - started) * 1000)
+
+
+async def hash_password_async(password: str) -> str:
+    """نسخة async من hash_password تشتغل على الـ process pool. ترفع PasswordPoolBusy لو الطابور ممتلئ."""
+    return await _run(_hash_latency, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """نسخة async من verify_password تشتغل على الـ process pool. ترفع PasswordPoolBusy لو الطابور ممتلئ."""
+    return await _run(_verify_latency, verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """نسخة async من verify_and_update_password — ترجع (ok, new_hash) والـ caller يحفظ new_hash لو موجود."""
+    return await _run(_verify_latency, verify_and_update_password, plain_password, hashed_password)
+
+
+def get_metrics() -> dict:
+    with _inflight_lock:
+        queue_depth = _inflight
+        rejected = _rejected
+    return {
+        "workers": PASSWORD_POOL_WORKERS,
+        "max_queue": PASSWORD_POOL_MAX_QUEUE,
+        "queue_depth": queue_depth,
+        "rejected": rejected,
+        "hash_latency": _hash_latency.snapshot(),
+        "verify_latency": _verify_latency.snapshot(),
+    }
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+metrics.register("password_pool", get_metrics)
@@ -0,0 +1,297 @@
+# queries.py — سجل الاستعلامات الساخنة كـ prepared statements بأسماء ثابتة
+# كل statement بيتعمل له prepare مرة واحدة لكل connection في الـ pool (asyncpg) وبعد كده بيتنفذ
+# بالاسم، فـ Postgres مش بيعمل parse/plan تاني والـ SQLAlchemy مش بيعمل compile للـ text() كل مرة.
+#
+# DB_JSON_RENDERING=1: صفحة الأسئلة بتتقري من نسخ *_json (Postgres بيبني الـ JSON بـ json_agg ويرجعه نص)
+# والـ catalog بيعمل encode مرة واحدة مع كل snapshot — من غير dicts لكل request.
+import os
+import threading
+import time
+import weakref
+
+import asyncpg
+
+from . import metrics, query_stats
+
+DB_JSON_RENDERING = os.getenv("DB_JSON_RENDERING", "0").lower() in ("1", "true", "yes")
+# أقصى عدد تطابقات بيترتبوا بالـ rank في البحث — لو أكتر، أول N بترتيب id بس (truncated) والكلمة الشائعة ما تلفش على البنك كله
+QUESTION_SEARCH_MAX_CANDIDATES = int(os.getenv("QUESTION_SEARCH_MAX_CANDIDATES", "2000"))
+
+QUESTION_COLUMNS = """q.id, q.subject_id, q.chapter_id, q.question_text, q.question_image_url,
+               q.question_type, q.difficulty, q.expected_time, q.explanation, q.order_index"""
+
+
+def _keyset_sql(after_null: bool, chapter_param: str | None = None) -> str:
+    """
+    صفحة أسئلة بعد cursor. after_null=False: الـ cursor على order_index مش NULL ($3, $4) والصفحة ممكن
+    تكمل في صفوف الـ NULL. after_null=True: الـ cursor جوه صفوف الـ NULL ($3 = آخر id).
+    """
+    where = "q.subject_id = $1 AND q.status = 'active'"
+    if chapter_param:
+        where += f" AND q.chapter_id = {chapter_param}"
+    if after_null:
+        return f"""
+        SELECT {QUESTION_COLUMNS}
+        FROM public.questions q
+        WHERE {where} AND q.order_index IS NULL AND q.id > $3
+        ORDER BY q.id ASC
+        LIMIT $2
+    """
+    return f"""
+        SELECT * FROM (
+            (SELECT {QUESTION_COLUMNS} FROM public.questions q
+             WHERE {where} AND (q.order_index, q.id) > ($3, $4)
+             ORDER BY q.order_index ASC, q.id ASC LIMIT $2)
+            UNION ALL
+            (SELECT {QUESTION_COLUMNS} FROM public.questions q
+             WHERE {where} AND q.order_index IS NULL
+             ORDER BY q.id ASC LIMIT $2)
+        ) page
+        ORDER BY page.order_index ASC NULLS LAST, page.id ASC
+        LIMIT $2
+    """
+
+
+def _search_sql(chapter_param: str | None = None) -> str:
+    """
+    بحث في أسئلة المادة (migrations/0003_question_search.py): full-text على search_vector، ولو مفيش ولا نتيجة
+    fuzzy (pg_trgm word_similarity) على search_text — الـ trigram على كل سؤال غالي، فبيتعمل بس للأخطاء الإملائية.
+    النص بيتعمله arabic_normalize زي الأسئلة بالظبط.
+    $1 المادة، $2 نص البحث، $3 الـ limit، $4/$5 (score, id) آخر نتيجة من الصفحة اللي قبلها (NULL = أول صفحة).
+    الترتيب score DESC ثم id، والـ score = ts_rank_cd (normalized 0..1) + word_similarity.
+    الترتيب بيغطي كل التطابقات لحد QUESTION_SEARCH_MAX_CANDIDATES بس: ترتيب مليون صف بالـ rank بياخد ثواني
+    والـ GIN مبيرجعش بالترتيب. لو أكتر، أول N بترتيب id هي اللي بتترتب و truncated = true في كل صف
+    (نفس المجموعة في كل صفحة فالـ cursor مبيكررش ولا بينط نتايج).
+    """
+    where = "q.subject_id = $1 AND q.status = 'active'"
+    if chapter_param:
+        where += f" AND q.chapter_id = {chapter_param}"
+    query = "public.arabic_normalize($2)"
+    tsquery = f"websearch_to_tsquery('simple', {query})"
+    score = f"(ts_rank_cd(q.search_vector, {tsquery}, 32) + word_similarity({query}, q.search_text))::float8 AS score"
+    # N + 1 عشان نعرف لو فيه أكتر من N من غير count على كل التطابقات
+    limit = QUESTION_SEARCH_MAX_CANDIDATES + 1
+    return f"""
+        WITH fulltext AS MATERIALIZED (
+            SELECT {QUESTION_COLUMNS}, {score}
+            FROM public.questions q
+            WHERE {where} AND q.search_vector @@ {tsquery}
+            ORDER BY q.id
+            LIMIT {limit}
+        ),
+        fuzzy AS (
+            SELECT {QUESTION_COLUMNS}, {score}
+            FROM public.questions q
+            WHERE NOT EXISTS (SELECT 1 FROM fulltext) AND {where} AND {query} <% q.search_text
+            ORDER BY q.id
+            LIMIT {limit}
+        ),
+        matches AS (SELECT * FROM fulltext UNION ALL SELECT * FROM fuzzy),
+        hits AS (SELECT * FROM matches ORDER BY id LIMIT {QUESTION_SEARCH_MAX_CANDIDATES})
+        SELECT hits.*, (SELECT count(*) FROM matches) > {QUESTION_SEARCH_MAX_CANDIDATES} AS truncated
+        FROM hits
+        WHERE $4::float8 IS NULL OR hits.score < $4 OR (hits.score = $4 AND hits.id > $5)
+        ORDER BY hits.score DESC, hits.id ASC
+        LIMIT $3
+    """
+
+
+# الاسم -> SQL بـ placeholders positional ($1, $2, ...) زي ما asyncpg محتاج
+HOT_QUERIES = {
+    "user_profile": "SELECT id, name, grade FROM public.users WHERE id = $1",
+    "site_under_construction": "SELECT value FROM public.site_settings WHERE key = 'under_construction'",
+    "subjects_by_grade": "SELECT id, name, grade, stream FROM public.subjects WHERE grade = $1 ORDER BY name",
+    "subject_for_grade": "SELECT id, name, grade FROM public.subjects WHERE id = $1 AND grade = $2",
+    # التحقق من المادة + عدد أسئلتها في round trip واحد (صفحة الأسئلة)
+    "subject_with_count": """
+        SELECT s.id, s.name, s.grade,
+               (SELECT COUNT(*) FROM public.questions q
+                WHERE q.subject_id = s.id AND q.status = 'active') AS total
+        FROM public.subjects s WHERE s.id = $1 AND s.grade = $2
+    """,
+    "subject_with_count_by_chapter": """
+        SELECT s.id, s.name, s.grade,
+               (SELECT COUNT(*) FROM public.questions q
+                WHERE q.subject_id = s.id AND q.status = 'active' AND q.chapter_id = $3) AS total
+        FROM public.subjects s WHERE s.id = $1 AND s.grade = $2
+    """,
+    "questions_count": """
+        SELECT COUNT(*) AS total FROM public.questions q
+        WHERE q.subject_id = $1 AND q.status = 'active'
+    """,
+    "questions_count_by_chapter": """
+        SELECT COUNT(*) AS total FROM public.questions q
+        WHERE q.subject_id = $1 AND q.status = 'active' AND q.chapter_id = $2
+    """,
+    "questions_page": """
+        SELECT q.id, q.subject_id, q.chapter_id, q.question_text, q.question_image_url,
+               q.question_type, q.difficulty, q.expected_time, q.explanation, q.order_index
+        FROM public.questions q
+        WHERE q.subject_id = $1 AND q.status = 'active'
+        ORDER BY q.order_index ASC NULLS LAST, q.id ASC
+        LIMIT $2 OFFSET $3
+    """,
+    "questions_page_by_chapter": """
+        SELECT q.id, q.subject_id, q.chapter_id, q.question_text, q.question_image_url,
+               q.question_type, q.difficulty, q.expected_time, q.explanation, q.order_index
+        FROM public.questions q
+        WHERE q.subject_id = $1 AND q.status = 'active' AND q.chapter_id = $4
+        ORDER BY q.order_index ASC NULLS LAST, q.id ASC
+        LIMIT $2 OFFSET $3
+    """,
+    # keyset pagination على (order_index, id) — $1 المادة، $2 الـ limit، $3/$4 آخر (order_index, id)
+    # الصفوف اللي order_index بتاعها NULL بتيجي في الآخر (NULLS LAST) فليها فرع لوحدها في الـ UNION
+    "questions_after": _keyset_sql(after_null=False),
+    "questions_after_by_chapter": _keyset_sql(after_null=False, chapter_param="$5"),
+    "questions_after_null": _keyset_sql(after_null=True),
+    "questions_after_null_by_chapter": _keyset_sql(after_null=True, chapter_param="$4"),
+    # البحث (GET /subjects/{id}/questions/search)
+    "questions_search": _search_sql(),
+    "questions_search_by_chapter": _search_sql(chapter_param="$6"),
+    # اختيارات مجموعة أسئلة مرة واحدة (routers/loaders.py)
+    "question_choices_batch": """
+        SELECT question_id, id, text, is_correct, "order"
+        FROM public.question_choices
+        WHERE question_id = ANY($1::int[])
+        ORDER BY question_id, "order" ASC NULLS LAST, id ASC
+    """,
+    # حزمة الامتحان (routers/exam_packages.py) — بتتحمل مرة لكل امتحان مش لكل طالب
+    "exam_meta": """
+        SELECT id, title, description, duration, num_to_show, shuffle_questions, shuffle_options, required
+        FROM public.exams WHERE id = $1 AND is_active = true
+    """,
+    "exam_questions_pool": """
+        SELECT id, subject_id, chapter_id, question_text, question_image_url, question_type,
+               difficulty, expected_time, order_index
+        FROM public.exams_questions
+        WHERE exam_id = $1 AND status = 'active'
+        ORDER BY order_index ASC NULLS LAST, id ASC
+    """,
+    # من غير is_correct: الحزمة بتتبعت للطالب وهو بيحل
+    "exam_choices_batch": """
+        SELECT exam_question_id, id, text
+        FROM public.exam_choises
+        WHERE exam_question_id = ANY($1::int[])
+        ORDER BY exam_question_id, "order" ASC NULLS LAST, id ASC
+    """,
+    # المحلول بس — الإجمالي لكل صف من الـ catalog snapshot (نفس الرقم لكل طلبة الصف، وكان COUNT على كل
+    # أسئلة الصف في كل طلب). العددين في استعلام واحد: الـ connection بتتحجز round trip واحد (تحت الضغط كل
+    # await بيستنى دوره في الـ event loop والـ connection محجوزة)
+    "dashboard_stats": """
+        SELECT
+            (SELECT COUNT(DISTINCT qs.question_id)
+             FROM public.questions_submissions qs
+             JOIN public.questions q ON q.id = qs.question_id
+             WHERE q.subject_id IN (SELECT id FROM public.subjects WHERE grade = $1)
+             AND qs.user_id = $2) AS solved_questions,
+            (SELECT COUNT(DISTINCT es.exam_id)
+             FROM public.exams_submissions es
+             JOIN public.exams_questions eq ON eq.exam_id = es.exam_id
+             JOIN public.subjects s ON s.id = eq.subject_id
+             JOIN public.exams e ON e.id = es.exam_id
+             WHERE s.grade = $1 AND e.is_active = true AND es.user_id = $2) AS solved_exams
+    """,
+}
+
+
+def _json_page_sql(page_sql: str) -> str:
+    """
+    نفس صفحة page_sql بس في صف واحد: n (عدد الأسئلة)، last_order_index/last_id (مفتاح آخر سؤال
+    للـ cursor)، و questions = JSON array جاهز (نص) بنفس شكل الـ dicts في subjects.py ومعاه الاختيارات.
+    """
+    return f"""
+        WITH page AS ({page_sql})
+        SELECT COUNT(*) AS n,
+               (array_agg(p.order_index ORDER BY p.order_index DESC NULLS FIRST, p.id DESC))[1] AS last_order_index,
+               (array_agg(p.id ORDER BY p.order_index DESC NULLS FIRST, p.id DESC))[1] AS last_id,
+               COALESCE(json_agg(json_build_object(
+                   'id', p.id,
+                   'subject_id', p.subject_id,
+                   'chapter_id', p.chapter_id,
+                   'question_text', p.question_text,
+                   'question_image_url', p.question_image_url,
+                   'question_type', p.question_type,
+                   'difficulty', p.difficulty,
+                   'expected_time', p.expected_time,
+                   'explanation', p.explanation,
+                   'order_index', p.order_index,
+                   'choices', COALESCE((
+                       SELECT json_agg(json_build_object(
+                           'id', c.id, 'text', c.text, 'is_correct', c.is_correct, 'order', c."order"
+                       ) ORDER BY c."order" ASC NULLS LAST, c.id ASC)
+                       FROM public.question_choices c
+                       WHERE c.question_id = p.id
+                   ), '[]'::json)
+               ) ORDER BY p.order_index ASC NULLS LAST, p.id ASC), '[]'::json)::text AS questions
+        FROM page p
+    """
+
+
+# نسخ *_json من صفحات الأسئلة (DB_JSON_RENDERING)
+for _page_query in ("questions_page", "questions_page_by_chapter", "questions_after", "questions_after_by_chapter",
+                    "questions_after_null", "questions_after_null_by_chapter"):
+    HOT_QUERIES[f"{_page_query}_json"] = _json_page_sql(HOT_QUERIES[_page_query])
+
+
+class PreparedStatementRegistry:
+    """
+    prepared statements لكل asyncpg connection (WeakKeyDictionary — بيتمسح مع الـ connection)
+    مع عدد مرات التنفيذ والوقت التراكمي لكل statement.
+    """
+
+    def __init__(self, queries: dict):
+        self.queries = queries
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {name: {"executions": 0, "total_ms": 0.0, "prepares": 0} for name in queries}
+
+    async def _statement(self, raw, name: str):
+        statements = self._prepared.setdefault(raw, {})
+        statement = statements.get(name)
+        if statement is None:
+            statement = await raw.prepare(self.queries[name])
+            statements[name] = statement
+            with self._lock:
+                self._stats[name]["prepares"] += 1
+        return statement
+
+    async def _run(self, conn, name: str, method: str, args: tuple):
+        """conn: AsyncConnection بتاع SQLAlchemy — بنستخدم الـ asyncpg connection اللي تحته."""
+        raw = (await conn.get_raw_connection()).driver_connection
+        started = time.perf_counter()
+        try:
+            statement = await self._statement(raw, name)
+            try:
+                return await getattr(statement, method)(*args)
+            except asyncpg.exceptions.InvalidCachedStatementError:
+                # الـ schema اتغيرت بعد الـ prepare — prepare تاني مرة واحدة
+                self._prepared.get(raw, {}).pop(name, None)
+                statement = await self._statement(raw, name)
+                return await getattr(statement, method)(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            query_stats.record(self.queries[name], elapsed_ms)
+            with self._lock:
+                self._stats[name]["executions"] += 1
+                self._stats[name]["total_ms"] += elapsed_ms
+
+    async def fetch(self, conn, name: str, *args) -> list:
+        return await self._run(conn, name, "fetch", args)
+
+    async def fetchrow(self, conn, name: str, *args):
+        return await self._run(conn, name, "fetchrow", args)
+
+    async def fetchval(self, conn, name: str, *args):
+        return await self._run(conn, name, "fetchval", args)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {**s, "total_ms": round(s["total_ms"], 3),
+                       "avg_ms": round(s["total_ms"] / s["executions"], 3) if s["executions"] else 0}
+                for name, s in self._stats.items()
+            }
+
+
+hot_queries = PreparedStatementRegistry(HOT_QUERIES)
+metrics.register("prepared_statements", hot_queries.stats)
@@ -0,0 +1,183 @@
+# query_stats.py — عدد الاستعلامات ووقت الـ DB لكل request + كشف N+1
+#
+# before/after_cursor_execute على كل الـ engines (sync و async و الـ replicas) بيسجلوا في
+# RequestQueryStats الخاص بالـ request الحالي (ContextVar بيحطه QueryStatsMiddleware).
+# الـ prepared statements (routers/queries.py) مش بتعدي على الـ cursor events فبتسجل بنفسها.
+# النتيجة في header الـ Server-Timing، وأي statement اتكرر أكتر من SQL_N_PLUS_ONE_THRESHOLD
+# في نفس الـ request بيتسجل في الـ log كـ N+1.
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import metrics
+
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+
+_current = ContextVar("request_query_stats", default=None)
+
+
+class RequestQueryStats:
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.db_ms = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float):
+        with self._lock:
+            self.count += 1
+            self.db_ms += elapsed_ms
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> list:
+        """[(statement, times)] للاستعلامات اللي اتكررت أكتر من threshold."""
+        return [(s, n) for s, n in self.statements.most_common() if n > threshold]
+
+    def server_timing(self, total_ms: float) -> str:
+        return f'db;dur={self.db_ms:.1f};desc="{self.count} queries", total;dur={total_ms:.1f}'
+
+
+class _Totals:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.queries = 0
+        self.n_plus_one = 0
+        self.per_request = metrics.LatencyStats(buckets_ms=(1, 2, 3, 5, 10, 25, 50, 100))
+
+    def add(self, stats: RequestQueryStats, flagged: bool):
+        with self._lock:
+            self.requests += 1
+            self.queries += stats.count
+            self.n_plus_one += int(flagged)
+        # الهيستوجرام هنا بعدد الاستعلامات مش بالمللي ثانية
+        self.per_request.observe(stats.count)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {
+                "requests": self.requests,
+                "queries": self.queries,
+                "n_plus_one_flagged": self.n_plus_one,
+                "n_plus_one_threshold": SQL_N_PLUS_ONE_THRESHOLD,
+            }
+        result["queries_per_request"] = self.per_request.snapshot()
+        return result
+
+
+_totals = _Totals()
+metrics.register("sql", _totals.stats)
+
+# وضع الاختبار: كل capture_queries() شغالة بتستلم RequestQueryStats لكل request بيخلص
+_captures = []
+_captures_lock = threading.Lock()
+
+
+def record(statement: str, elapsed_ms: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    record(statement, (time.perf_counter() - started) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # الاستعلام فشل فـ after_cursor_execute مش هيتنادى — نشيل وقت البداية بتاعه
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def start_request(label: str) -> tuple:
+    stats = RequestQueryStats(label)
+    return stats, _current.set(stats)
+
+
+def finish_request(stats: RequestQueryStats, token):
+    """يقفل عدّاد الـ request: يسجل N+1 في الـ log ويبعت النتيجة لأي capture شغال."""
+    _current.reset(token)
+    repeated = stats.repeated()
+    for statement, times in repeated:
+        logging.warning(
+            f"N+1 suspected: {stats.label} ran the same statement {times} times "
+            f"({stats.count} queries total): {' '.join(statement.split())[:200]}"
+        )
+    _totals.add(stats, bool(repeated))
+    with _captures_lock:
+        for captured in _captures:
+            captured.append(stats)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware خام (مش @app.middleware / BaseHTTPMiddleware): الـ request بيتقفل لما الـ app يخلص
+    بعد آخر جزء من الـ body، فاستعلامات الـ StreamingResponse (الـ export) بتدخل في العدادات وكشف الـ N+1.
+    الـ Server-Timing بيتحط على http.response.start، فبيغطي الاستعلامات اللي حصلت قبل أول byte بس.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        stats, token = start_request(f"{scope['method']} {scope['path']}")
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing = stats.server_timing((time.perf_counter() - started) * 1000)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            finish_request(stats, token)
+
+
+@contextmanager
+def capture_queries():
+    """
+    للاختبارات: يجمع RequestQueryStats لكل request بيخلص جوه الـ block.
+        with capture_queries() as requests:
+            client.get("/api/v1/subjects/1/questions", headers=...)
+        assert requests[-1].count <= 3
+    """
+    captured = []
+    with _captures_lock:
+        _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with _captures_lock:
+            _captures.remove(captured)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """للاختبارات: AssertionError لو أي request جوه الـ block عمل أكتر من limit استعلام."""
+    with capture_queries() as captured:
+        yield captured
+    for stats in captured:
+        if stats.count > limit:
+            raise AssertionError(f"{stats.label} ran {stats.count} queries (limit {limit})")
@@ -0,0 +1,139 @@
+# question_export.py — تصدير كل أسئلة مادة كـ NDJSON (سطر JSON لكل سؤال باختياراته) بالـ streaming
+# server-side cursor (yield_per) ← دفعة أسئلة ← اختياراتها في استعلام واحد (loaders) ← سطور ← yield.
+# الذاكرة ثابتة (دفعة واحدة في المرة) مهما كبر بنك الأسئلة، وأول byte بيطلع بعد أول دفعة مش بعد آخر صف.
+# gzip لو العميل بعت Accept-Encoding: gzip — Z_SYNC_FLUSH بعد كل دفعة عشان الـ stream ما يتحبسش في الـ compressor.
+# كل export ماسك connection من الـ pool طول التحميل، فعددهم في نفس الوقت محدود لكل worker: الـ handler بيحجز
+# المكان (try_acquire) قبل ما يرجع الرد — الـ generator مبيبدأش غير بعد ما الـ handler يخلص، فالعدّ جواه
+# كان بيعدّي موجة طلبات كلها — والمكان بيرجع لما الرد يخلص بأي شكل (ExportStreamingResponse).
+#
+# QUESTIONS_EXPORT_BATCH_SIZE      حجم الدفعة (افتراضياً 500)
+# QUESTIONS_EXPORT_MAX_CONCURRENT  أقصى عدد exports شغالة في الـ worker (افتراضياً 4) — بعدها 503
+import logging
+import os
+import threading
+import zlib
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from . import metrics
+from .db_router import db_router, READ
+from .loaders import load_question_choices, question_item
+from .queries import QUESTION_COLUMNS
+from .users_common import render_json
+
+QUESTIONS_EXPORT_BATCH_SIZE = int(os.getenv("QUESTIONS_EXPORT_BATCH_SIZE", "500"))
+QUESTIONS_EXPORT_MAX_CONCURRENT = int(os.getenv("QUESTIONS_EXPORT_MAX_CONCURRENT", "4"))
+
+EXPORT_QUESTIONS_SQL = f"""
+    SELECT {QUESTION_COLUMNS}
+    FROM public.questions q
+    WHERE q.subject_id = :subject_id AND q.status = 'active'
+    ORDER BY q.order_index ASC NULLS LAST, q.id ASC
+"""
+
+
+class ExportSlot:
+    """مكان export محجوز في الـ worker. release() بترجعه مرة واحدة بس مهما اتنادت."""
+
+    def __init__(self, exporter):
+        self._exporter = exporter
+        self._released = False
+
+    def release(self):
+        with self._exporter._lock:
+            if self._released:
+                return
+            self._released = True
+            self._exporter.active -= 1
+
+
+class ExportStreamingResponse(StreamingResponse):
+    """StreamingResponse بيرجّع الـ slot لما الرد يخلص بأي شكل — حتى لو الـ stream ما بدأش (العميل قفل قبل أول byte)."""
+
+    def __init__(self, content, slot: ExportSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+class QuestionExporter:
+    def __init__(self, batch_size: int = QUESTIONS_EXPORT_BATCH_SIZE,
+                 max_concurrent: int = QUESTIONS_EXPORT_MAX_CONCURRENT):
+        self.batch_size = batch_size
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def try_acquire(self) -> ExportSlot | None:
+        """يحجز مكان export، أو None لو الـ worker وصل للحد — الـ router يرجع 503 قبل ما يبدأ الـ stream."""
+        with self._lock:
+            if self.active >= self.max_concurrent:
+                self.rejected += 1
+                return None
+            self.active += 1
+            return ExportSlot(self)
+
+    async def stream(self, slot: ExportSlot, subject_id: int, user_id: int, compress: bool = False):
+        """
+        async generator بـ chunks الـ NDJSON (أو gzip) على slot محجوز بـ try_acquire، وبيرجّعه في الآخر.
+        أي خطأ في النص بيقطع الـ stream عشان العميل يعرف إنه ناقص.
+        """
+        with self._lock:
+            self.started += 1
+        compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 = gzip container
+        try:
+            async with db_router.connect(READ, user_id=user_id) as connection:
+                result = await connection.stream(
+                    text(EXPORT_QUESTIONS_SQL).execution_options(yield_per=self.batch_size),
+                    {"subject_id": subject_id},
+                )
+                async for rows in result.mappings().partitions():
+                    choices = await load_question_choices(connection, [row["id"] for row in rows])
+                    chunk = b"".join(render_json(question_item(row, choices[row["id"]])) + b"\n" for row in rows)
+                    if compressor is not None:
+                        chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                    with self._lock:
+                        self.rows += len(rows)
+                        self.bytes += len(chunk)
+                    yield chunk
+            if compressor is not None:
+                yield compressor.flush()
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logging.error(f"Question export failed for subject_id: {subject_id}, user_id: {user_id}: {e}")
+            raise
+        finally:
+            slot.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "batch_size": self.batch_size,
+                "started": self.started,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "rows": self.rows,
+                "bytes": self.bytes,
+            }
+
+
+question_exporter = QuestionExporter()
+metrics.register("question_export", question_exporter.stats)
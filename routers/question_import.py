@@ -0,0 +1,387 @@
+# question_import.py — استيراد بنك أسئلة كامل (الأسئلة + اختياراتها) بـ COPY بدل INSERT لكل صف
+#
+# 1) الملف (JSONL أو CSV) بيتقري سطر سطر: كل سطر بيتراجع في Python، الصالح بيتكتب CSV في ملف مؤقت
+#    والغلط بيروح في تقرير الأخطاء برقم السطر — الملف كله مش بيتحمل في الذاكرة.
+# 2) في transaction واحدة: COPY FROM STDIN لجداول staging مؤقتة (ON COMMIT DROP)، تشيك الـ FKs
+#    (المادة، الفصل تبع المادة، المصدر) بـ SQL على الكل مرة واحدة، حجز الـ ids بـ nextval، وبعدين
+#    INSERT ... SELECT لـ questions و question_choices (الاختيارات بتتربط بالسؤال برقم السطر).
+#    dry_run = نفس الخطوات و ROLLBACK في الآخر.
+# الـ triggers بتاعة subject_stats بتشتغل مرة لكل statement فمش بتبطّأ الاستيراد.
+#
+# JSONL: سطر لكل سؤال:
+#   {"subject_id": 1, "chapter_id": 2, "question_text": "...", "question_type": "mcq", "difficulty": 3,
+#    "choices": [{"text": "...", "is_correct": true}, {"text": "..."}]}
+# CSV: header بأسماء أعمدة السؤال + choice_1 .. choice_N و correct (أرقام الاختيارات الصح: "2" أو "1,3")
+#
+# QUESTION_IMPORT_STATEMENT_TIMEOUT_MS  (600000) — الـ COPY والـ merge أطول من DB_STATEMENT_TIMEOUT_MS العادي
+# QUESTION_IMPORT_MAX_ERRORS            (1000) — أقصى عدد أخطاء بتتسجل تفصيلاً في التقرير
+# QUESTION_IMPORT_MAX_QUESTION_IDS      (1000) — أقصى عدد ids أسئلة جديدة في رد الـ API (الكل في --report بتاع الـ CLI)
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from . import metrics
+from .database import engine
+
+QUESTION_IMPORT_STATEMENT_TIMEOUT_MS = int(os.getenv("QUESTION_IMPORT_STATEMENT_TIMEOUT_MS", "600000"))
+QUESTION_IMPORT_MAX_ERRORS = int(os.getenv("QUESTION_IMPORT_MAX_ERRORS", "1000"))
+QUESTION_IMPORT_MAX_QUESTION_IDS = int(os.getenv("QUESTION_IMPORT_MAX_QUESTION_IDS", "1000"))
+
+FORMATS = ("jsonl", "csv")
+
+# ترتيب الأعمدة في staging (ونفس ترتيب الـ CSV اللي بيتعمله COPY)
+QUESTION_FIELDS = (
+    "subject_id", "chapter_id", "question_text", "question_image_url", "question_type", "difficulty",
+    "expected_time", "explanation", "order_index", "access_level", "source_id", "is_common", "status",
+)
+_INT_FIELDS = {"subject_id", "chapter_id", "difficulty", "expected_time", "order_index", "source_id"}
+_BOOL_FIELDS = {"is_common"}
+_FIELD_KINDS = tuple(
+    (field, int if field in _INT_FIELDS else bool if field in _BOOL_FIELDS else str) for field in QUESTION_FIELDS
+)
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+STAGING_SQL = """
+    CREATE TEMP TABLE import_questions (
+        line_no INTEGER PRIMARY KEY,
+        id INTEGER,
+        subject_id INTEGER NOT NULL,
+        chapter_id INTEGER,
+        question_text TEXT,
+        question_image_url TEXT,
+        question_type TEXT NOT NULL,
+        difficulty INTEGER,
+        expected_time INTEGER,
+        explanation TEXT,
+        order_index INTEGER,
+        access_level TEXT,
+        source_id INTEGER,
+        is_common BOOLEAN,
+        status TEXT
+    ) ON COMMIT DROP;
+    CREATE TEMP TABLE import_choices (
+        line_no INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        is_correct BOOLEAN NOT NULL,
+        "order" INTEGER
+    ) ON COMMIT DROP
+"""
+
+# كل check بيمسح الأسئلة اللي فشلت (واختياراتها) ويرجع أرقام سطورها
+REFERENCE_CHECKS = (
+    ("subject_id does not exist", """
+        DELETE FROM import_questions iq
+        WHERE NOT EXISTS (SELECT 1 FROM public.subjects s WHERE s.id = iq.subject_id)
+        RETURNING iq.line_no
+    """),
+    ("chapter_id does not exist or belongs to another subject", """
+        DELETE FROM import_questions iq
+        WHERE iq.chapter_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM public.chapters c WHERE c.id = iq.chapter_id AND c.subject_id = iq.subject_id)
+        RETURNING iq.line_no
+    """),
+    ("source_id does not exist", """
+        DELETE FROM import_questions iq
+        WHERE iq.source_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM public.sources s WHERE s.id = iq.source_id)
+        RETURNING iq.line_no
+    """),
+)
+
+ASSIGN_IDS_SQL = """
+    UPDATE import_questions
+    SET id = nextval(pg_get_serial_sequence('public.questions', 'id'))
+"""
+
+MERGE_QUESTIONS_SQL = """
+    INSERT INTO public.questions (
+        id, subject_id, chapter_id, question_text, question_image_url, question_type, difficulty,
+        expected_time, explanation, order_index, access_level, source_id, is_common, status, created_by
+    )
+    SELECT id, subject_id, chapter_id, question_text, question_image_url, question_type, difficulty,
+           expected_time, explanation, order_index, COALESCE(access_level, 'paid'), source_id,
+           COALESCE(is_common, false), COALESCE(status, 'active'), :created_by
+    FROM import_questions
+    ORDER BY line_no
+"""
+
+MERGE_CHOICES_SQL = """
+    INSERT INTO public.question_choices (question_id, text, is_correct, "order")
+    SELECT iq.id, ic.text, ic.is_correct, ic."order"
+    FROM import_choices ic
+    JOIN import_questions iq ON iq.line_no = ic.line_no
+    ORDER BY ic.line_no, ic."order"
+"""
+
+
+class QuestionImportError(ValueError):
+    """الملف أو الطلب نفسه غلط (مش سطر معين) — الـ router يرجع 400."""
+
+
+def _parse_int(value, field: str):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be an integer")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer")
+    if not -2**31 <= number < 2**31:
+        raise ValueError(f"{field} is out of range")
+    return number
+
+
+def _parse_bool(value, field: str):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(f"{field} must be a boolean")
+
+
+def validate_question(record: dict) -> tuple:
+    """
+    (question_values بترتيب QUESTION_FIELDS، [(text, is_correct, order), ...]) لسؤال واحد.
+    ValueError برسالة واضحة لأول مشكلة.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("each line must be a JSON object")
+    values = {}
+    for field, kind in _FIELD_KINDS:
+        value = record.get(field)
+        if value is None:
+            pass
+        elif kind is int:
+            if type(value) is not int or not -2**31 <= value < 2**31:
+                value = _parse_int(value, field)
+        elif kind is bool:
+            value = _parse_bool(value, field)
+        elif not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+        else:
+            value = value.strip() or None
+        values[field] = value
+    if values["subject_id"] is None:
+        raise ValueError("subject_id is required")
+    if not values["question_type"]:
+        raise ValueError("question_type is required")
+    if not values["question_text"] and not values["question_image_url"]:
+        raise ValueError("question_text or question_image_url is required")
+    if values["difficulty"] is not None and not 1 <= values["difficulty"] <= 5:
+        raise ValueError("difficulty must be between 1 and 5")
+
+    raw_choices = record.get("choices") or []
+    if not isinstance(raw_choices, list):
+        raise ValueError("choices must be a list")
+    choices = []
+    for index, choice in enumerate(raw_choices, start=1):
+        if not isinstance(choice, dict):
+            raise ValueError(f"choice {index} must be an object")
+        choice_text = choice.get("text")
+        if not isinstance(choice_text, str) or not choice_text.strip():
+            raise ValueError(f"choice {index} text is required")
+        is_correct = choice.get("is_correct", False)
+        if type(is_correct) is not bool:
+            is_correct = _parse_bool(is_correct, f"choice {index} is_correct") or False
+        order = choice.get("order")
+        if type(order) is not int:
+            order = _parse_int(order, f"choice {index} order")
+        choices.append((choice_text.strip(), is_correct, index if order is None else order))
+    if choices and not any(c[1] for c in choices):
+        raise ValueError("at least one choice must be correct")
+    return [values[field] for field in QUESTION_FIELDS], choices
+
+
+def _csv_record(row: dict) -> dict:
+    """صف CSV (choice_1..choice_N + correct) لنفس شكل سطر الـ JSONL."""
+    correct = set()
+    for part in (row.get("correct") or "").replace(";", ",").split(","):
+        part = part.strip()
+        if part:
+            if not part.isdigit():
+                raise ValueError("correct must be choice numbers like 2 or 1,3")
+            correct.add(int(part))
+    numbered = sorted(
+        (int(key[len("choice_"):]), value) for key, value in row.items()
+        if key and key.startswith("choice_") and key[len("choice_"):].isdigit() and value and value.strip()
+    )
+    record = {field: row.get(field) for field in QUESTION_FIELDS}
+    record["choices"] = [{"text": value, "is_correct": number in correct, "order": number} for number, value in numbered]
+    return record
+
+
+def _iter_records(stream, fmt: str):
+    """(line_no, record | None, error | None) لكل سطر في الملف — stream: ملف binary."""
+    reader = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    if fmt == "jsonl":
+        for line_no, line in enumerate(reader, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line), None
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON: {e}"
+    else:
+        rows = csv.DictReader(reader)
+        if not rows.fieldnames or "subject_id" not in rows.fieldnames:
+            raise QuestionImportError("CSV header must include subject_id, question_type and the question columns")
+        for row in rows:
+            # line_num = آخر سطر اتقري (الصف ممكن يكون على كذا سطر)
+            try:
+                yield rows.line_num, _csv_record(row), None
+            except ValueError as e:
+                yield rows.line_num, None, str(e)
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.choices = 0
+        self.error_count = 0
+        self.errors = []
+        self.question_ids = []  # [(line_no, question_id)] — أول max_question_ids بس
+        self.subject_ids = set()
+
+    def add_error(self, line_no: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < QUESTION_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line_no, "error": error})
+
+    def as_dict(self, dry_run: bool, duration_ms: int) -> dict:
+        return {
+            "dry_run": dry_run,
+            "total": self.total,
+            "inserted": self.inserted,
+            "choices": self.choices,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "question_ids": [{"line": line_no, "id": question_id} for line_no, question_id in self.question_ids],
+            "subject_ids": sorted(self.subject_ids),
+            "duration_ms": duration_ms,
+        }
+
+
+class QuestionImporter:
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.questions = 0
+        self.rejected_rows = 0
+        self.last_rows_per_second = None
+
+    def _stage(self, stream, fmt: str, report: ImportReport, questions_file, choices_file):
+        """يراجع الملف سطر سطر ويكتب الصالح CSV في questions_file / choices_file."""
+        # كل النصوص بين "" عشان مفيش قيمة تتقري كـ \. (نهاية الـ COPY)؛ None = "" وبيرجع NULL بـ FORCE_NULL،
+        # والـ bool بيتكتب True/False وPostgres بيقبلها
+        questions_writer = csv.writer(questions_file, quoting=csv.QUOTE_NONNUMERIC)
+        choices_writer = csv.writer(choices_file, quoting=csv.QUOTE_NONNUMERIC)
+        for line_no, record, error in _iter_records(stream, fmt):
+            report.total += 1
+            if error is None:
+                try:
+                    values, choices = validate_question(record)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                report.add_error(line_no, error)
+                continue
+            questions_writer.writerow([line_no, *values])
+            choices_writer.writerows([(line_no, *choice) for choice in choices])
+        questions_file.seek(0)
+        choices_file.seek(0)
+
+    def run(self, stream, fmt: str, created_by: int, dry_run: bool = False,
+            max_question_ids: int | None = QUESTION_IMPORT_MAX_QUESTION_IDS) -> dict:
+        """
+        يستورد الملف (binary stream) ويرجع التقرير:
+        {dry_run, total, inserted, choices, error_count, errors: [{line, error}], question_ids: [{line, id}],
+         subject_ids, duration_ms}
+        question_ids فيها أول max_question_ids سؤال بترتيب السطور (None = الكل) — العدد الكامل في inserted.
+        QuestionImportError لو الطلب نفسه غلط (format، created_by، header).
+        """
+        if fmt not in FORMATS:
+            raise QuestionImportError(f"format must be one of: {', '.join(FORMATS)}")
+        started = time.perf_counter()
+        report = ImportReport()
+        try:
+            with tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8") as questions_file, \
+                 tempfile.TemporaryFile(mode="w+", newline="", encoding="utf-8") as choices_file:
+                self._stage(stream, fmt, report, questions_file, choices_file)
+                with engine.connect() as conn, conn.begin() as tx:
+                    self._merge(conn, report, created_by, questions_file, choices_file, max_question_ids)
+                    if dry_run:
+                        tx.rollback()
+        except QuestionImportError:
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        self.runs += 1
+        self.rejected_rows += report.error_count
+        if not dry_run:
+            self.questions += report.inserted
+        if duration_ms:
+            self.last_rows_per_second = round(report.inserted * 1000 / duration_ms)
+        logging.info(
+            f"Question import{' (dry run)' if dry_run else ''}: {report.inserted}/{report.total} questions, "
+            f"{report.choices} choices, {report.error_count} errors in {duration_ms} ms"
+        )
+        return report.as_dict(dry_run, duration_ms)
+
+    def _merge(self, conn, report: ImportReport, created_by: int, questions_file, choices_file,
+               max_question_ids: int | None):
+        conn.execute(text(f"SET LOCAL statement_timeout = {QUESTION_IMPORT_STATEMENT_TIMEOUT_MS}"))
+        if conn.execute(text("SELECT 1 FROM public.users WHERE id = :id"), {"id": created_by}).scalar() is None:
+            raise QuestionImportError("created_by must be an existing users.id")
+        conn.execute(text(STAGING_SQL))
+        cursor = conn.connection.cursor()
+        try:
+            columns = ", ".join(QUESTION_FIELDS)
+            cursor.copy_expert(
+                f"COPY import_questions (line_no, {columns}) FROM STDIN WITH (FORMAT csv, FORCE_NULL ({columns}))",
+                questions_file,
+            )
+            cursor.copy_expert(
+                'COPY import_choices (line_no, text, is_correct, "order") FROM STDIN WITH (FORMAT csv, FORCE_NULL ("order"))',
+                choices_file,
+            )
+        finally:
+            cursor.close()
+        for message, sql in REFERENCE_CHECKS:
+            for (line_no,) in conn.execute(text(sql)).fetchall():
+                report.add_error(line_no, message)
+        conn.execute(text("DELETE FROM import_choices ic WHERE NOT EXISTS (SELECT 1 FROM import_questions iq WHERE iq.line_no = ic.line_no)"))
+        conn.execute(text(ASSIGN_IDS_SQL))
+        report.inserted = conn.execute(text(MERGE_QUESTIONS_SQL), {"created_by": created_by}).rowcount
+        report.choices = conn.execute(text(MERGE_CHOICES_SQL)).rowcount
+        report.question_ids = [tuple(row) for row in conn.execute(
+            text("SELECT line_no, id FROM import_questions ORDER BY line_no LIMIT :limit"), {"limit": max_question_ids}
+        )]
+        report.subject_ids = set(conn.execute(text("SELECT DISTINCT subject_id FROM import_questions")).scalars())
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "questions": self.questions,
+            "rejected_rows": self.rejected_rows,
+            "last_rows_per_second": self.last_rows_per_second,
+        }
+
+
+question_importer = QuestionImporter()
+metrics.register("question_import", question_importer.stats)
@@ -0,0 +1,204 @@
+# rate_limit.py — Token bucket لمحاولات تسجيل الدخول قبل أي شغل على قاعدة البيانات أو bcrypt
+# المفاتيح: رقم التليفون، الإيميل، والـ IP. الـ backend الافتراضي داخل العملية؛ ولو فيه أكتر من
+# worker يتشغل RATE_LIMIT_BACKEND=postgres عشان كل الـ workers يشوفوا نفس الـ buckets.
+#
+# TRUSTED_PROXIES  IPs أو شبكات (CIDR) مفصولة بفاصلة للـ load balancer / reverse proxy اللي قدام السيرفر.
+#                  الـ IP بيتاخد من X-Forwarded-For بس لو الطلب جاي مباشرةً من واحد منهم؛ غير كده الـ header
+#                  بيتجاهل (أي حد يقدر يبعته). فاضي (الافتراضي) = IP الاتصال نفسه.
+import ipaddress
+import logging
+import os
+import threading
+import time
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from . import metrics
+from .users_common import engine, validate_phone_number
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# لكل رقم/إيميل: 5 محاولات متتالية، وبعدها محاولة كل 12 ثانية
+IDENTIFIER_CAPACITY = float(os.getenv("LOGIN_RATE_IDENTIFIER_CAPACITY", "5"))
+IDENTIFIER_REFILL_PER_SEC = float(os.getenv("LOGIN_RATE_IDENTIFIER_REFILL_PER_SEC", str(5 / 60)))
+# لكل IP: 20 محاولة متتالية، وبعدها 20 في الدقيقة
+IP_CAPACITY = float(os.getenv("LOGIN_RATE_IP_CAPACITY", "20"))
+IP_REFILL_PER_SEC = float(os.getenv("LOGIN_RATE_IP_REFILL_PER_SEC", str(20 / 60)))
+TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(p.strip(), strict=False) for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()
+)
+
+
+class InMemoryBackend:
+    """Buckets في dict داخل الـ worker. الـ buckets اللي اتملت تاني بتتمسح دورياً."""
+
+    CLEANUP_EVERY = 1000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def consume(self, key: str, capacity: float, refill_per_sec: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_sec)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._calls += 1
+            if self._calls % self.CLEANUP_EVERY == 0:
+                self._cleanup(now, capacity, refill_per_sec)
+            return allowed
+
+    def _cleanup(self, now: float, capacity: float, refill_per_sec: float):
+        idle = capacity / refill_per_sec if refill_per_sec else 0
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated > idle]:
+            del self._buckets[key]
+
+
+class PostgresBackend:
+    """
+    Buckets في public.rate_limit_buckets (UNLOGGED) — statement واحد بيعمل refill + consume بشكل atomic.
+    الرصيد ممكن ينزل لحد -1 مع المحاولات المرفوضة، فالـ spam المستمر بيفضل مرفوض.
+    لو قاعدة البيانات وقعت الـ limiter بيسمح (fail open) عشان تسجيل الدخول ميتعطلش.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, refill_per_sec: float) -> bool:
+        try:
+            with engine.begin() as conn:
+                tokens = conn.execute(
+                    text("""
+                        INSERT INTO public.rate_limit_buckets AS b (key, tokens, updated_at)
+                        VALUES (:key, :capacity - 1, now())
+                        ON CONFLICT (key) DO UPDATE SET
+                            tokens = GREATEST(
+                                LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM (now() - b.updated_at)) * :rate) - 1,
+                                -1
+                            ),
+                            updated_at = now()
+                        RETURNING tokens
+                    """),
+                    {"key": key, "capacity": capacity, "rate": refill_per_sec}
+                ).scalar()
+                with self._lock:
+                    self._calls += 1
+                    prune = self._calls % self.PRUNE_EVERY == 0
+                if prune:
+                    conn.execute(text("DELETE FROM public.rate_limit_buckets WHERE updated_at < now() - interval '1 day'"))
+            return tokens >= 0
+        except Exception as e:
+            logging.error(f"Rate limit backend error (allowing request): {e}")
+            return True
+
+
+_backends = {"memory": InMemoryBackend, "postgres": PostgresBackend}
+backend = _backends[RATE_LIMIT_BACKEND]()
+
+_rejections = {"phone": 0, "email": 0, "ip": 0}
+_allowed = 0
+_counters_lock = threading.Lock()
+
+
+def _count(kind: str | None):
+    global _allowed
+    with _counters_lock:
+        if kind is None:
+            _allowed += 1
+        else:
+            _rejections[kind] += 1
+
+
+def get_metrics() -> dict:
+    with _counters_lock:
+        return {"backend": RATE_LIMIT_BACKEND, "allowed": _allowed, "rejected": dict(_rejections)}
+
+
+metrics.register("login_rate_limit", get_metrics)
+
+
+def _identifier_keys(body: dict) -> list:
+    keys = []
+    phone = str(body.get("phone_number") or "").strip()
+    if phone:
+        try:
+            phone = validate_phone_number(phone, "phone_number")
+        except ValueError:
+            pass
+        keys.append(("phone", f"phone:{phone}"))
+    email = str(body.get("email") or "").strip().lower()
+    if email:
+        keys.append(("email", f"email:{email}"))
+    return keys
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str | None:
+    """
+    IP العميل للـ rate limit. لو الاتصال من proxy موثوق: أول IP مش موثوق في X-Forwarded-For من اليمين
+    (اللي قبله ممكن يكون مزوّر من العميل نفسه). غير كده IP الاتصال.
+    """
+    peer = request.client.host if request.client else None
+    if not peer or not _is_trusted_proxy(peer):
+        return peer
+    forwarded = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for host in reversed(forwarded):
+        if not _is_trusted_proxy(host):
+            return host
+    return forwarded[0] if forwarded else peer
+
+
+def _check(keys: list) -> str | None:
+    """يرجع نوع المفتاح اللي اترفض أو None لو مسموح."""
+    for kind, key in keys:
+        capacity, rate = (IP_CAPACITY, IP_REFILL_PER_SEC) if kind == "ip" else (IDENTIFIER_CAPACITY, IDENTIFIER_REFILL_PER_SEC)
+        if not backend.consume(key, capacity, rate):
+            return kind
+    return None
+
+
+async def login_rate_limit(request: Request):
+    """
+    Dependency لـ /login و /admin/login و /forgot-password.
+    بيقرأ الـ body (FastAPI بيكون قراه وحفظه قبل الـ dependencies) ويرجع 429 قبل أي DB أو bcrypt.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    keys = []
+    ip = client_ip(request)
+    if ip:
+        keys.append(("ip", f"ip:{ip}"))
+    keys.extend(_identifier_keys(body))
+    if isinstance(backend, PostgresBackend):
+        rejected = await run_in_threadpool(_check, keys)
+    else:
+        rejected = _check(keys)
+    _count(rejected)
+    if rejected:
+        logging.warning(f"Login rate limit exceeded ({rejected}) for {request.url.path}")
+        rate = IP_REFILL_PER_SEC if rejected == "ip" else IDENTIFIER_REFILL_PER_SEC
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(max(1, round(1 / rate)) if rate else 60)},
+        )
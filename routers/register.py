@@ -1,10 +1,15 @@
 # register.py
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from datetime import datetime
 import logging
-from .users_common import engine, validate_phone_number, validate_governorate, create_user_jwt_token, create_response, hash_password
+from .users_common import engine, validate_phone_number, validate_governorate, create_user_jwt_token, create_response
+from .sessions_store import insert_session
+from .password_pool import hash_password_async, PasswordPoolBusy
+from .db_router import db_router
 
 router = APIRouter()
 
@@ -21,8 +26,72 @@ class RegisterBody(BaseModel):
     lang_type: str
 
 
+INSERT_USER_SQL = """
+    INSERT INTO public.users (
+        name, phone_number, parent_number, birth_date, governorate,
+        password, grade, section, lang_type, account_status, points,
+        early_access, subscription_plan, created_at
+    )
+    VALUES (
+        :name, :phone_number, :parent_number, :birth_date, :governorate,
+        :password, :grade, :section, :lang_type, :account_status, :points,
+        :early_access, :subscription_plan, :created_at
+    )
+"""
+# Postgres: no unique or exclusion constraint matching the ON CONFLICT specification
+_NO_UNIQUE_INDEX = "42P10"
+
+
+def _insert_user(fields: dict, created_at: datetime, on_conflict: bool):
+    with engine.begin() as conn:
+        params = {
+            **fields,
+            "account_status": "active",
+            "points": 0,
+            "early_access": False,
+            "subscription_plan": None,
+            "created_at": created_at
+        }
+        if on_conflict:
+            # Insert user and get the user_id
+            user_id = conn.execute(
+                text(INSERT_USER_SQL + " ON CONFLICT (phone_number) DO NOTHING RETURNING id"), params
+            ).scalar()
+        elif conn.execute(text("SELECT 1 FROM public.users WHERE phone_number = :phone_number"),
+                          {"phone_number": fields["phone_number"]}).first():
+            user_id = None
+        else:
+            user_id = conn.execute(text(INSERT_USER_SQL + " RETURNING id"), params).scalar()
+        if user_id is None:
+            return None
+
+        # Create JWT token with user_id, created_at, and role
+        token = create_user_jwt_token(user_id, created_at, "user")
+
+        # Insert session into sessions table
+        insert_session(conn, user_id, token, created_at)
+    return user_id, token
+
+
+def _create_user(fields: dict):
+    """
+    ينشئ الحساب والسيشن في transaction واحدة على connection واحدة.
+    التكرار يتكشف من الـ unique index على phone_number (ON CONFLICT) بدل SELECT قبل الـ INSERT.
+    لو الـ index لسه مش موجود (migration 0005 مستنية دمج أرقام مكررة) بنرجع للـ SELECT قبل الـ INSERT.
+    يرجع (user_id, token) أو None لو رقم التليفون مسجل.
+    """
+    created_at = datetime.utcnow()
+    try:
+        return _insert_user(fields, created_at, on_conflict=True)
+    except ProgrammingError as e:
+        if getattr(e.orig, "pgcode", None) != _NO_UNIQUE_INDEX:
+            raise
+        logging.warning("uq_users_phone_number is missing (migration 0005 not applied), checking duplicates with SELECT")
+        return _insert_user(fields, created_at, on_conflict=False)
+
+
 @router.post("/register")
-def add_user(body: RegisterBody):
+async def add_user(body: RegisterBody):
     try:
         name = body.name
         phone_number = body.phone_number
@@ -81,87 +150,42 @@ def add_user(body: RegisterBody):
         except ValueError as e:
             return create_response(False, str(e), status_code=400)
 
-        # تشفير كلمة المرور قبل الحفظ
-        password = hash_password(password)
-        
         # Parse birth_date
         try:
             birth_date_parsed = datetime.strptime(birth_date, "%Y-%m-%d").date()
         except ValueError:
             return create_response(False, "Invalid birth_date format. Use YYYY-MM-DD format.", status_code=400)
         
+        # تشفير كلمة المرور قبل الحفظ
+        password = await hash_password_async(password)
+        
         logging.info(f"Add user attempt: {phone_number}")
         
-        # Check if phone_number already exists in database
-        with engine.connect() as connection:
-            existing_user = connection.execute(
-                text("SELECT * FROM public.users WHERE phone_number = :phone_number"),
-                {"phone_number": phone_number}
-            ).mappings().fetchone()
-            
-            if existing_user:
-                logging.warning(f"Registration failed: phone number already exists: {phone_number}")
-                return create_response(False, "Phone number already registered. Please use a different phone number or login.", status_code=409)
-            
-            # Create user account and session
-            created_at = datetime.utcnow()
-            with engine.begin() as conn:
-                # Insert user and get the user_id
-                result = conn.execute(
-                    text("""
-                        INSERT INTO public.users (
-                            name, phone_number, parent_number, birth_date, governorate,
-                            password, grade, section, lang_type, account_status, points,
-                            early_access, subscription_plan, created_at
-                        )
-                        VALUES (
-                            :name, :phone_number, :parent_number, :birth_date, :governorate,
-                            :password, :grade, :section, :lang_type, :account_status, :points,
-                            :early_access, :subscription_plan, :created_at
-                        )
-                        RETURNING id
-                    """),
-                    {
-                        "name": name,
-                        "phone_number": phone_number,
-                        "parent_number": parent_number,
-                        "birth_date": birth_date_parsed,
-                        "governorate": governorate,
-                        "password": password,
-                        "grade": grade,
-                        "section": section,
-                        "lang_type": lang_type,
-                        "account_status": "active",
-                        "points": 0,
-                        "early_access": False,
-                        "subscription_plan": None,
-                        "created_at": created_at
-                    }
-                )
-                user_id = result.scalar()
-                
-                # Create JWT token with user_id, created_at, and role
-                token = create_user_jwt_token(user_id, created_at, "user")
-                
-                # Insert session into sessions table
-                conn.execute(
-                    text("""
-                        INSERT INTO public.sessions (user_id, session, created_at, active)
-                        VALUES (:user_id, :session, :created_at, :active)
-                    """),
-                    {
-                        "user_id": user_id,
-                        "session": token,
-                        "created_at": created_at,
-                        "active": True
-                    }
-                )
+        result = await run_in_threadpool(_create_user, {
+            "name": name,
+            "phone_number": phone_number,
+            "parent_number": parent_number,
+            "birth_date": birth_date_parsed,
+            "governorate": governorate,
+            "password": password,
+            "grade": grade,
+            "section": section,
+            "lang_type": lang_type,
+        })
+        if result is None:
+            logging.warning(f"Registration failed: phone number already exists: {phone_number}")
+            return create_response(False, "Phone number already registered. Please use a different phone number or login.", status_code=409)
+        user_id, token = result
+        db_router.mark_write(user_id)
         logging.info(f"User added successfully: {phone_number}, user_id: {user_id}")
         return create_response(True, "User registered successfully", {
             "token": token,
             "token_type": "bearer"
         }, status_code=200)
     
+    except PasswordPoolBusy:
+        logging.warning("Registration rejected: password pool is busy")
+        return create_response(False, "Server is busy, please try again shortly", status_code=503)
     except Exception as e:
         logging.error(f"Error in register: {str(e)}")
         return create_response(False, f"An error occurred: {str(e)}", status_code=500)
@@ -0,0 +1,106 @@
+# response_cache.py — LRU لـ responses جاهزة (bytes) بميزانية ذاكرة بالـ MB
+# صفحة الأسئلة واحدة لكل الطلبة في نفس الصف لنفس (subject_id, chapter_id, page/cursor)، فبنخزن
+# الـ JSON بعد الـ encoding والـ hit بيرجع الـ bytes زي ما هي من غير DB ولا json.dumps.
+# الحجم المحسوب = طول الـ body بالـ bytes (الـ overhead بتاع الـ keys صغير جنبه).
+#
+# RESPONSE_CACHE_MB           الميزانية (افتراضياً 64، 0 = مقفول)
+# RESPONSE_CACHE_TTL_SECONDS  أقصى عمر للصفحة (افتراضياً 300) — احتياط لأي تعديل مباشر في الـ DB
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+from .pagination import question_counts
+
+RESPONSE_CACHE_MB = float(os.getenv("RESPONSE_CACHE_MB", "64"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+
+class ByteLRUCache:
+    def __init__(self, max_bytes: int, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (body, subject_id, expires_at)
+        self._by_subject = {}          # subject_id -> set(keys)
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        body, subject_id, _ = self._entries.pop(key)
+        self.size_bytes -= len(body)
+        keys = self._by_subject.get(subject_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[subject_id]
+
+    def get(self, key) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, subject_id: int, body: bytes):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self.size_bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (body, subject_id, time.monotonic() + self.ttl_seconds)
+            self._by_subject.setdefault(subject_id, set()).add(key)
+            self.size_bytes += size
+
+    def invalidate_subject(self, subject_id: int):
+        with self._lock:
+            for key in list(self._by_subject.get(subject_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_subject.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+question_pages = ByteLRUCache(int(RESPONSE_CACHE_MB * 1024 * 1024))
+metrics.register("question_page_cache", question_pages.stats)
+
+
+def invalidate_subject_pages(*subject_ids: int):
+    """لأي تعديل بيأثر على أسئلة مادة: يمسح صفحاتها المتخزنة وعدد أسئلتها (في الـ worker ده)."""
+    for subject_id in subject_ids:
+        question_pages.invalidate_subject(subject_id)
+        question_counts.invalidate_subject(subject_id)
@@ -0,0 +1,157 @@
+# sessions_store.py — تخزين السيشنات كـ SHA256 digest ثابت الحجم مع expires_at
+# public.sessions مقسّم (partitioned) شهرياً على created_at، فالداتا القديمة بتتشال بـ DROP
+# للـ partition كله بدل DELETE، والـ index على token_hash بيفضل صغير (32 بايت بدل التوكن كامل).
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from .users_common import engine, ACCESS_TOKEN_EXPIRE_MINUTES
+
+PARTITION_PREFIX = "sessions_p"
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def session_params(user_id: int, token: str, created_at: datetime) -> dict:
+    """باراميترات صف السيشن (:user_id, :token_hash, :created_at, :expires_at) لأي INSERT."""
+    return {
+        "user_id": user_id,
+        "token_hash": token_digest(token),
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+
+
+INSERT_SESSION_SQL = """
+    INSERT INTO public.sessions (user_id, token_hash, created_at, expires_at, active)
+    VALUES (:user_id, :token_hash, :created_at, :expires_at, TRUE)
+"""
+
+
+def insert_session(conn, user_id: int, token: str, created_at: datetime):
+    """يضيف سيشن جديدة على الـ connection الحالية (داخل نفس الـ transaction بتاع الـ caller)."""
+    conn.execute(text(INSERT_SESSION_SQL), session_params(user_id, token, created_at))
+
+
+def _month_start(d: datetime) -> datetime:
+    return datetime(d.year, d.month, 1)
+
+
+def _next_month(d: datetime) -> datetime:
+    return datetime(d.year + (d.month // 12), d.month % 12 + 1, 1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _create_partition(conn, name: str, month: datetime, upper: datetime) -> int:
+    """
+    ينشئ partition شهر واحد. لو الـ cron وقف فترة وصفوف الشهر ده نزلت في sessions_default، Postgres
+    بيرفض CREATE ... PARTITION OF (الـ default فيه صفوف تخص الـ partition الجديد)، فبنفصل الـ default،
+    ننشئ الـ partition، ننقل الصفوف، ونرجّع الـ default — كله في transaction الـ caller.
+    يرجع عدد الصفوف اللي اتنقلت.
+    """
+    bounds = {"lower": month, "upper": upper}
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": f"public.{name}"}).scalar() is not None:
+        return 0
+    stranded = conn.execute(text("""
+        SELECT COUNT(*) FROM public.sessions_default
+        WHERE created_at >= :lower AND created_at < :upper
+    """), bounds).scalar()
+    partition_sql = f"""
+        CREATE TABLE public.{name} PARTITION OF public.sessions
+        FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')
+    """
+    if not stranded:
+        conn.execute(text(partition_sql))
+        return 0
+    logging.warning(f"sessions_default holds {stranded} rows for {month:%Y-%m}; moving them into {name} "
+                    f"(session maintenance was not running)")
+    conn.execute(text("ALTER TABLE public.sessions DETACH PARTITION public.sessions_default"))
+    conn.execute(text(partition_sql))
+    conn.execute(text(f"""
+        INSERT INTO public.{name}
+        SELECT * FROM public.sessions_default
+        WHERE created_at >= :lower AND created_at < :upper
+    """), bounds)
+    conn.execute(text("""
+        DELETE FROM public.sessions_default
+        WHERE created_at >= :lower AND created_at < :upper
+    """), bounds)
+    conn.execute(text("ALTER TABLE public.sessions ATTACH PARTITION public.sessions_default DEFAULT"))
+    return stranded
+
+
+def ensure_partitions(conn, months_ahead: int = 2, now: datetime | None = None) -> list:
+    """ينشئ partitions الشهر الحالي والشهور الجاية لو مش موجودة. يرجع أسماء الـ partitions."""
+    month = _month_start(now or datetime.utcnow())
+    names = []
+    for _ in range(months_ahead + 1):
+        upper = _next_month(month)
+        name = _partition_name(month)
+        _create_partition(conn, name, month, upper)
+        names.append(name)
+        month = upper
+    return names
+
+
+def drop_old_partitions(conn, retain_months: int = 1, now: datetime | None = None) -> list:
+    """يحذف partitions الشهور اللي انتهت بالكامل قبل فترة الاحتفاظ (كل السيشنات فيها منتهية)."""
+    cutoff = _month_start(now or datetime.utcnow())
+    for _ in range(retain_months):
+        cutoff = _month_start(cutoff - timedelta(days=1))
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = 'public' AND p.relname = 'sessions'
+    """)).fetchall()
+    dropped = []
+    for (name,) in rows:
+        suffix = name[len(PARTITION_PREFIX):]
+        if not name.startswith(PARTITION_PREFIX) or not suffix.isdigit():
+            continue  # الـ default partition أو أي اسم غير متوقع
+        if datetime.strptime(suffix, "%Y%m") < cutoff:
+            conn.execute(text(f"DROP TABLE IF EXISTS public.{name}"))
+            dropped.append(name)
+    return dropped
+
+
+def prune_expired_sessions(batch_size: int = 5000, grace_minutes: int = 0) -> int:
+    """يمسح السيشنات المنتهية على دفعات (transaction لكل دفعة). يرجع عدد الصفوف الممسوحة."""
+    cutoff = datetime.utcnow() - timedelta(minutes=grace_minutes)
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(
+                text("""
+                    DELETE FROM public.sessions
+                    WHERE (id, created_at) IN (
+                        SELECT id, created_at FROM public.sessions
+                        WHERE expires_at < :cutoff
+                        LIMIT :batch_size
+                    )
+                """),
+                {"cutoff": cutoff, "batch_size": batch_size}
+            ).rowcount
+        total += deleted
+        if deleted < batch_size:
+            break
+    logging.info(f"Pruned {total} expired sessions")
+    return total
+
+
+def run_maintenance(batch_size: int = 5000, months_ahead: int = 2, retain_months: int = 1) -> dict:
+    """مهمة الصيانة الدورية: partitions جديدة، حذف القديمة، ومسح المنتهي في الـ partitions الحالية."""
+    with engine.begin() as conn:
+        created = ensure_partitions(conn, months_ahead)
+        dropped = drop_old_partitions(conn, retain_months)
+    pruned = prune_expired_sessions(batch_size)
+    return {"partitions": created, "dropped_partitions": dropped, "pruned": pruned}
@@ -5,26 +5,40 @@ from pydantic import BaseModel
 from sqlalchemy import text
 
 from .users_common import create_response, engine, verify_user_jwt_token
+from .db_router import db_router, READ
+from .queries import HOT_QUERIES, hot_queries
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
 
 
-def _get_under_construction():
-    """قراءة قيمة under_construction من الجدول."""
-    with engine.connect() as conn:
-        row = conn.execute(
-            text("SELECT value FROM public.site_settings WHERE key = 'under_construction'")
-        ).fetchone()
+UNDER_CONSTRUCTION_SQL = HOT_QUERIES["site_under_construction"]
+
+
+def _parse_under_construction(row) -> bool:
     if row:
         return (row[0] or "").strip().lower() in ("1", "true", "yes")
     return True  # افتراضي: تحت الإنشاء
 
 
+def _get_under_construction():
+    """قراءة قيمة under_construction من الجدول."""
+    with engine.connect() as conn:
+        row = conn.execute(text(UNDER_CONSTRUCTION_SQL)).fetchone()
+    return _parse_under_construction(row)
+
+
+async def _get_under_construction_async():
+    # prepared على asyncpg مباشرة: من غير BEGIN/ROLLBACK حوالين الـ SELECT زي conn.execute
+    async with db_router.connect(READ) as conn:
+        row = await hot_queries.fetchrow(conn, "site_under_construction")
+    return _parse_under_construction(row)
+
+
 @router.get("/site-status")
-def get_site_status():
+async def get_site_status():
     """عام — لا يتطلب توكن. يستخدمه صفحة الطالب لمعرفة هل تعرض «تحت الإنشاء»."""
-    under_construction = _get_under_construction()
+    under_construction = await _get_under_construction_async()
     return create_response(True, "OK", {"under_construction": under_construction}, status_code=200)
 
 
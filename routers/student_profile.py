@@ -5,6 +5,8 @@ from sqlalchemy import text
 from datetime import datetime
 import logging
 from .auth import get_current_user
+from .user_cache import invalidate_user
+from .db_router import db_router, READ
 from .users_common import (
     engine,
     create_response,
@@ -31,14 +33,14 @@ class UpdateProfileBody(BaseModel):
 
 
 @router.get("/profile")
-def get_student_profile(payload: dict = Depends(get_current_user)):
+async def get_student_profile(payload: dict = Depends(get_current_user)):
     """جلب بيانات الطالب المسجّل دخوله."""
     user_id = payload.get("user_id")
     if not user_id:
         return create_response(False, "User not found", status_code=401)
     try:
-        with engine.connect() as conn:
-            row = conn.execute(
+        async with db_router.connect(READ, user_id=user_id) as conn:
+            row = (await conn.execute(
                 text("""
                     SELECT name, phone_number, parent_number, birth_date, governorate,
                            grade, section, lang_type
@@ -46,7 +48,7 @@ def get_student_profile(payload: dict = Depends(get_current_user)):
                     WHERE id = :user_id
                 """),
                 {"user_id": user_id},
-            ).mappings().fetchone()
+            )).mappings().fetchone()
             if not row:
                 return create_response(False, "User not found", status_code=404)
             # Convert date to string if needed
@@ -133,6 +135,7 @@ def update_student_profile(body: UpdateProfileBody, payload: dict = Depends(get_
         """
         with engine.begin() as conn:
             conn.execute(text(sql), params)
+        invalidate_user(user_id)
         logging.info(f"Student profile updated: user_id={user_id}")
         return create_response(True, "تم تحديث البيانات بنجاح", status_code=200)
     except Exception as e:
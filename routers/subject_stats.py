@@ -0,0 +1,158 @@
+# subject_stats.py — reconcile دوري لجدول subject_stats (migrations/0002_subject_stats.py)
+# الـ triggers بتحدث الأعداد مع كل كتابة؛ هنا بنحسبها كلها من الأول ونصلح أي صف منحرف
+# (كتابة وقت ما الـ triggers كانت مقفولة، restore جزئي، ...). الصفوف اللي اتصلحت بتتسجل في الـ log.
+# worker واحد بس بيعمل reconcile في نفس الوقت (pg_try_advisory_xact_lock — الباقيين بيتخطوا الدورة).
+# الحساب الكامل قراءة عادية من غير locks؛ بعده الصفوف اللي طلعت غلط بس بتتقفل (FOR UPDATE) وتتحسب تاني:
+# الـ triggers على المواد دي بتستنى لحظة، وأي كتابة تانية (الأسئلة، الامتحانات، الاستيراد) مبتستناش حاجة.
+#
+# SUBJECT_STATS_RECONCILE_SECONDS  كل قد إيه (افتراضياً 3600، 0 = مقفول — شغّل scripts/reconcile_subject_stats.py من cron)
+# SUBJECT_STATS_LOCK_TIMEOUT_MS    أقصى انتظار للـ lock قبل ما الدورة دي تتساب (افتراضياً 5000)
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from . import metrics
+from .catalog import refresh_catalog
+from .database import engine
+
+SUBJECT_STATS_RECONCILE_SECONDS = float(os.getenv("SUBJECT_STATS_RECONCILE_SECONDS", "3600"))
+SUBJECT_STATS_LOCK_TIMEOUT_MS = int(os.getenv("SUBJECT_STATS_LOCK_TIMEOUT_MS", "5000"))
+
+SUBJECT_STATS_LOCK_KEY = 0x7374617473  # "stats"
+
+
+def _counts_sql(only_subject_ids: bool) -> str:
+    """
+    (subject_id, chapters_count, questions_count, exams_count) من الجداول نفسها — لكل المواد،
+    أو للمواد اللي في :subject_ids بس (الفلتر جوه كل subquery عشان العد ميلفش على الجداول كلها).
+    """
+    subjects = "AND subject_id = ANY(:subject_ids)" if only_subject_ids else ""
+    exam_subjects = "AND eq.subject_id = ANY(:subject_ids)" if only_subject_ids else ""
+    subject_rows = "AND s.id = ANY(:subject_ids)" if only_subject_ids else ""
+    return f"""
+        SELECT s.id AS subject_id, COALESCE(c.n, 0) AS chapters_count,
+               COALESCE(q.n, 0) AS questions_count, COALESCE(e.n, 0) AS exams_count
+        FROM public.subjects s
+        LEFT JOIN (SELECT subject_id, COUNT(*) AS n FROM public.chapters
+                   WHERE true {subjects} GROUP BY subject_id) c
+            ON c.subject_id = s.id
+        LEFT JOIN (SELECT subject_id, COUNT(*) AS n FROM public.questions
+                   WHERE status = 'active' {subjects} GROUP BY subject_id) q
+            ON q.subject_id = s.id
+        LEFT JOIN (SELECT eq.subject_id, COUNT(DISTINCT eq.exam_id) AS n
+                   FROM public.exams_questions eq JOIN public.exams ex ON ex.id = eq.exam_id
+                   WHERE ex.is_active = true {exam_subjects} GROUP BY eq.subject_id) e
+            ON e.subject_id = s.id
+        WHERE true {subject_rows}
+    """
+
+
+# المواد اللي صفها في subject_stats غلط أو ناقص — قراءة بس، من غير locks
+DRIFT_SQL = f"""
+    SELECT counts.subject_id
+    FROM ({_counts_sql(False)}) counts
+    LEFT JOIN public.subject_stats st ON st.subject_id = counts.subject_id
+    WHERE (st.chapters_count, st.questions_count, st.exams_count)
+        IS DISTINCT FROM (counts.chapters_count, counts.questions_count, counts.exams_count)
+    ORDER BY counts.subject_id
+"""
+
+# صفوف المواد دي بس: الـ triggers بتعمل UPDATE على نفس الصف فبتستنى، وكتابة لسه متعملهاش commit
+# بتخلص الأول (ماسكة الصف) فبتتحسب في العد اللي بعد الـ lock
+LOCK_ROWS_SQL = """
+    SELECT subject_id FROM public.subject_stats
+    WHERE subject_id = ANY(:subject_ids) ORDER BY subject_id FOR UPDATE
+"""
+
+RECONCILE_SQL = f"""
+    INSERT INTO public.subject_stats AS st (subject_id, chapters_count, questions_count, exams_count)
+    {_counts_sql(True)}
+    ON CONFLICT (subject_id) DO UPDATE
+    SET chapters_count = EXCLUDED.chapters_count,
+        questions_count = EXCLUDED.questions_count,
+        exams_count = EXCLUDED.exams_count,
+        updated_at = now()
+    WHERE (st.chapters_count, st.questions_count, st.exams_count)
+        IS DISTINCT FROM (EXCLUDED.chapters_count, EXCLUDED.questions_count, EXCLUDED.exams_count)
+    RETURNING st.subject_id
+"""
+
+
+class SubjectStatsReconciler:
+    def __init__(self, interval_seconds: float = SUBJECT_STATS_RECONCILE_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._thread = None
+        self._stop = threading.Event()
+        self.runs = 0
+        self.failures = 0
+        self.corrected = 0
+        self.skipped = 0
+        self.last_corrected = None
+        self.last_run_at = None
+        self.duration_ms = metrics.LatencyStats()
+
+    def reconcile(self) -> list | None:
+        """
+        يصلح subject_stats من الجداول نفسها. يرجع الـ subject_ids اللي كانت غلط (أو ناقصة)،
+        أو None لو process تانية بتعمل reconcile دلوقتي.
+        """
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"),
+                                {"key": SUBJECT_STATS_LOCK_KEY}).scalar():
+                self.skipped += 1
+                return None
+            drifted = [row[0] for row in conn.execute(text(DRIFT_SQL)).fetchall()]
+            corrected = []
+            if drifted:
+                conn.execute(text(f"SET LOCAL lock_timeout = {SUBJECT_STATS_LOCK_TIMEOUT_MS}"))
+                conn.execute(text(LOCK_ROWS_SQL), {"subject_ids": drifted})
+                corrected = [row[0] for row in conn.execute(text(RECONCILE_SQL), {"subject_ids": drifted}).fetchall()]
+        self.runs += 1
+        self.corrected += len(corrected)
+        self.last_corrected = len(corrected)
+        self.last_run_at = time.time()
+        self.duration_ms.observe((time.perf_counter() - started) * 1000)
+        if corrected:
+            logging.warning(f"subject_stats drift corrected for {len(corrected)} subjects: {corrected[:20]}")
+        return corrected
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                if self.reconcile():
+                    # الأعداد اللي في الـ catalog كانت غلط هي كمان
+                    refresh_catalog()
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"subject_stats reconcile failed: {e}")
+
+    def start(self):
+        if self.interval_seconds <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="subject-stats-reconcile", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "corrected": self.corrected,
+            "skipped": self.skipped,
+            "last_corrected": self.last_corrected,
+            "last_run_age_seconds": round(time.time() - self.last_run_at, 1) if self.last_run_at else None,
+            "duration": self.duration_ms.snapshot(),
+        }
+
+
+reconciler = SubjectStatsReconciler()
+metrics.register("subject_stats", reconciler.stats)
@@ -1,15 +1,32 @@
 # subjects.py
 # Endpoint to get available subjects based on user's grade
-from fastapi import APIRouter, Header, Query
-from sqlalchemy import text
+from fastapi import APIRouter, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
 import math
-import jwt
 import logging
-from .users_common import engine, SECRET_KEY, ALGORITHM, create_response
+from .users_common import verify_user_jwt_token, create_response, create_rendered_response, render_json
+from .db_router import db_router, READ
+from .user_cache import get_user_profile_async
+from .queries import hot_queries, DB_JSON_RENDERING, QUESTION_SEARCH_MAX_CANDIDATES
+from .loaders import load_question_choices, question_item
+from .catalog import catalog, with_counts_item
+from .pagination import (
+    QUESTIONS_DEFAULT_PER_PAGE,
+    QUESTIONS_MAX_PER_PAGE,
+    parse_question_cursor,
+    parse_search_cursor,
+    question_cursor,
+    question_counts,
+    search_cursor,
+)
+from .response_cache import question_pages
+from .question_export import question_exporter, ExportStreamingResponse
 
 router = APIRouter()
 
-def decode_token_and_get_user(authorization: str):
+QUESTION_SEARCH_MAX_LENGTH = 200
+
+async def decode_token_and_get_user(authorization: str):
     """
     Helper function to decode JWT token and get user info
     Returns: (user_id, user_dict) or (None, error_response)
@@ -25,33 +42,32 @@ def decode_token_and_get_user(authorization: str):
     except ValueError:
         return None, create_response(False, "Invalid authorization header format", status_code=401)
     
-    # Decode JWT token
+    # Verify JWT token (shared verifier with cache)
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        
-        if not user_id:
-            return None, create_response(False, "Invalid token: user_id not found", status_code=401)
-    except jwt.ExpiredSignatureError:
-        return None, create_response(False, "Token has expired", status_code=401)
-    except jwt.InvalidTokenError as e:
-        return None, create_response(False, f"Invalid token: {str(e)}", status_code=401)
+        payload = verify_user_jwt_token(token)
+    except ValueError as e:
+        return None, create_response(False, str(e), status_code=401)
+    user_id = payload.get("user_id")
+    if not user_id:
+        return None, create_response(False, "Invalid token: user_id not found", status_code=401)
     
-    # Get user information from database
-    with engine.connect() as connection:
-        user = connection.execute(
-            text("SELECT id, name, grade FROM public.users WHERE id = :user_id"),
-            {"user_id": user_id}
-        ).mappings().fetchone()
-        
-        if not user:
-            logging.warning(f"User not found for user_id: {user_id}")
-            return None, create_response(False, "User not found", status_code=404)
+    # Get user information (cached per user_id)
+    user = await get_user_profile_async(user_id)
+    if not user:
+        logging.warning(f"User not found for user_id: {user_id}")
+        return None, create_response(False, "User not found", status_code=404)
     
     return user_id, user
 
+async def _catalog_snapshot():
+    """snapshot المواد والفصول — أول طلب بس (قبل ما الـ refresh يخلص) بيبنيه في threadpool."""
+    if catalog.loaded():
+        return catalog.get()
+    return await run_in_threadpool(catalog.get)
+
+
 @router.get("/subjects/available")
-def get_available_subjects(authorization: str = Header(None)):
+async def get_available_subjects(authorization: str = Header(None)):
     """
     Get all available subjects for the user's grade level
     Requires JWT token in Authorization header: "Bearer <token>"
@@ -60,7 +76,7 @@ def get_available_subjects(authorization: str = Header(None)):
         JSON response with list of subjects for user's grade
     """
     try:
-        user_id, result = decode_token_and_get_user(authorization)
+        user_id, result = await decode_token_and_get_user(authorization)
         if not user_id:
             return result
         
@@ -71,34 +87,29 @@ def get_available_subjects(authorization: str = Header(None)):
             logging.warning(f"User grade not set for user_id: {user_id}")
             return create_response(False, "User grade not configured", status_code=400)
         
-        # Get all subjects for this grade, ordered by name
-        with engine.connect() as connection:
-            subjects = connection.execute(
-                text("SELECT id, name, grade, stream FROM public.subjects WHERE grade = :grade ORDER BY name"),
-                {"grade": grade}
-            ).mappings().fetchall()
-            
-            subjects_list = [
-                {
-                    "id": subject["id"],
-                    "name": subject["name"],
-                    "grade": subject["grade"],
-                    "stream": subject["stream"]
-                }
-                for subject in subjects
-            ]
-            
-            logging.info(f"Fetched {len(subjects_list)} subjects for user_id: {user_id}, grade: {grade}")
-            
-            return create_response(True, "Subjects fetched successfully", {
-                "user": {
-                    "id": user["id"],
-                    "name": user["name"],
-                    "grade": grade
-                },
-                "subjects": subjects_list,
-                "count": len(subjects_list)
-            }, status_code=200)
+        # Get all subjects for this grade, ordered by name (من الـ snapshot في الذاكرة)
+        snapshot = await _catalog_snapshot()
+        subjects_list = [
+            {
+                "id": subject["id"],
+                "name": subject["name"],
+                "grade": subject["grade"],
+                "stream": subject["stream"]
+            }
+            for subject in snapshot.grade_subjects(grade)
+        ]
+        
+        logging.info(f"Fetched {len(subjects_list)} subjects for user_id: {user_id}, grade: {grade}")
+        
+        return create_response(True, "Subjects fetched successfully", {
+            "user": {
+                "id": user["id"],
+                "name": user["name"],
+                "grade": grade
+            },
+            "subjects": subjects_list,
+            "count": len(subjects_list)
+        }, status_code=200)
     
     except Exception as e:
         logging.error(f"Error in get_available_subjects: {str(e)}")
@@ -106,13 +117,13 @@ def get_available_subjects(authorization: str = Header(None)):
 
 
 @router.get("/subjects/with-counts")
-def get_subjects_with_counts(authorization: str = Header(None)):
+async def get_subjects_with_counts(authorization: str = Header(None)):
     """
     المواد المتاحة لصف الطالب مع أعداد: الشاباتر، الأسئلة المنفردة، الامتحانات.
     يتطلب: Authorization: Bearer <token>
     """
     try:
-        user_id, result = decode_token_and_get_user(authorization)
+        user_id, result = await decode_token_and_get_user(authorization)
         if not user_id:
             return result
         user = result
@@ -120,47 +131,27 @@ def get_subjects_with_counts(authorization: str = Header(None)):
         if not grade:
             return create_response(False, "User grade not configured", status_code=400)
 
-        with engine.connect() as connection:
-            subjects = connection.execute(
-                text("""
-                    SELECT s.id, s.name, s.grade, s.stream,
-                        (SELECT COUNT(*) FROM public.chapters c WHERE c.subject_id = s.id) AS chapters_count,
-                        (SELECT COUNT(*) FROM public.questions q WHERE q.subject_id = s.id AND q.status = 'active') AS questions_count,
-                        (SELECT COUNT(DISTINCT eq.exam_id) FROM public.exams_questions eq
-                         JOIN public.exams e ON e.id = eq.exam_id
-                         WHERE eq.subject_id = s.id AND e.is_active = true) AS exams_count
-                    FROM public.subjects s
-                    WHERE s.grade = :grade
-                    ORDER BY s.name
-                """),
-                {"grade": grade},
-            ).mappings().fetchall()
-
-            subjects_list = [
-                {
-                    "id": s["id"],
-                    "name": s["name"] or "",
-                    "grade": s["grade"] or "",
-                    "stream": s["stream"] or "",
-                    "chapters_count": s["chapters_count"] or 0,
-                    "questions_count": s["questions_count"] or 0,
-                    "exams_count": s["exams_count"] or 0,
-                }
-                for s in subjects
-            ]
-            return create_response(
-                True,
-                "Subjects with counts",
-                {"subjects": subjects_list, "grade": grade, "count": len(subjects_list)},
-                status_code=200,
-            )
+        snapshot = await _catalog_snapshot()
+        if DB_JSON_RENDERING:
+            return create_rendered_response("Subjects with counts", {
+                "subjects": snapshot.with_counts_json(grade),
+                "grade": render_json(grade),
+                "count": str(len(snapshot.grade_subjects(grade))),
+            })
+        subjects_list = [with_counts_item(s) for s in snapshot.grade_subjects(grade)]
+        return create_response(
+            True,
+            "Subjects with counts",
+            {"subjects": subjects_list, "grade": grade, "count": len(subjects_list)},
+            status_code=200,
+        )
     except Exception as e:
         logging.error(f"Error in get_subjects_with_counts: {str(e)}")
         return create_response(False, str(e), status_code=500)
 
 
 @router.get("/subjects/{subject_id}/chapters")
-def get_subject_chapters(subject_id: int, authorization: str = Header(None)):
+async def get_subject_chapters(subject_id: int, authorization: str = Header(None)):
     """
     Get all chapters for a specific subject
     Requires JWT token in Authorization header: "Bearer <token>"
@@ -173,7 +164,7 @@ def get_subject_chapters(subject_id: int, authorization: str = Header(None)):
         JSON response with list of chapters for the subject
     """
     try:
-        user_id, result = decode_token_and_get_user(authorization)
+        user_id, result = await decode_token_and_get_user(authorization)
         if not user_id:
             return result
         
@@ -184,76 +175,100 @@ def get_subject_chapters(subject_id: int, authorization: str = Header(None)):
             logging.warning(f"User grade not set for user_id: {user_id}")
             return create_response(False, "User grade not configured", status_code=400)
         
-        with engine.connect() as connection:
-            # First, verify subject exists and belongs to user's grade
-            subject = connection.execute(
-                text("SELECT id, name, grade FROM public.subjects WHERE id = :subject_id AND grade = :grade"),
-                {"subject_id": subject_id, "grade": grade}
-            ).mappings().fetchone()
-            
-            if not subject:
-                logging.warning(f"Subject {subject_id} not found or not available for grade {grade}")
-                return create_response(False, "Subject not found or not available for your grade", status_code=404)
-            
-            # Get all chapters for this subject, ordered by order_index
-            chapters = connection.execute(
-                text("""
-                    SELECT id, subject_id, name, order_index, created_at 
-                    FROM public.chapters 
-                    WHERE subject_id = :subject_id 
-                    ORDER BY order_index ASC, name ASC
-                """),
-                {"subject_id": subject_id}
-            ).mappings().fetchall()
-            
-            chapters_list = [
-                {
-                    "id": chapter["id"],
-                    "subject_id": chapter["subject_id"],
-                    "name": chapter["name"],
-                    "order": chapter["order_index"]
-                }
-                for chapter in chapters
-            ]
-            
-            logging.info(f"Fetched {len(chapters_list)} chapters for subject_id: {subject_id}, user_id: {user_id}")
-            
-            return create_response(True, "Chapters fetched successfully", {
-                "subject": {
-                    "id": subject["id"],
-                    "name": subject["name"],
-                    "grade": subject["grade"]
-                },
-                "chapters": chapters_list,
-                "count": len(chapters_list)
-            }, status_code=200)
+        snapshot = await _catalog_snapshot()
+        # First, verify subject exists and belongs to user's grade
+        subject = snapshot.subject_for_grade(subject_id, grade)
+        
+        if not subject:
+            logging.warning(f"Subject {subject_id} not found or not available for grade {grade}")
+            return create_response(False, "Subject not found or not available for your grade", status_code=404)
+        
+        # All chapters for this subject, ordered by order_index
+        chapters_list = snapshot.chapters(subject_id)
+        
+        logging.info(f"Fetched {len(chapters_list)} chapters for subject_id: {subject_id}, user_id: {user_id}")
+        
+        if DB_JSON_RENDERING:
+            return create_rendered_response("Chapters fetched successfully", {
+                "subject": render_json({"id": subject["id"], "name": subject["name"], "grade": subject["grade"]}),
+                "chapters": snapshot.chapters_json(subject_id),
+                "count": str(len(chapters_list)),
+            })
+        
+        return create_response(True, "Chapters fetched successfully", {
+            "subject": {
+                "id": subject["id"],
+                "name": subject["name"],
+                "grade": subject["grade"]
+            },
+            "chapters": list(chapters_list),
+            "count": len(chapters_list)
+        }, status_code=200)
     
     except Exception as e:
         logging.error(f"Error in get_subject_chapters: {str(e)}")
         return create_response(False, f"An error occurred: {str(e)}", status_code=500)
 
 
+def _question_page_query(subject_id: int, chapter_id: int | None, per_page: int, page: int, after) -> tuple:
+    """(اسم الاستعلام في hot_queries، الـ args) للصفحة: OFFSET، أو keyset بعد (order_index, id)."""
+    if after is None:
+        # أول صفحة أو وضع page القديم (OFFSET)
+        name, args = "questions_page", (subject_id, per_page, (page - 1) * per_page)
+    elif after[0] is None:
+        # الـ cursor جوه الأسئلة اللي من غير order_index
+        name, args = "questions_after_null", (subject_id, per_page, after[1])
+    else:
+        name, args = "questions_after", (subject_id, per_page, after[0], after[1])
+    if chapter_id:
+        name, args = f"{name}_by_chapter", args + (chapter_id,)
+    return name, args
+
+
+async def _fetch_questions_page(connection, page_query: str, page_args: tuple) -> tuple:
+    """(الأسئلة كـ dicts بالاختيارات، عددها، (order_index, id) لآخر سؤال) — استعلامين."""
+    questions_rows = await hot_queries.fetch(connection, page_query, *page_args)
+    # اختيارات كل الأسئلة في استعلام واحد
+    choices_by_question = await load_question_choices(connection, [q["id"] for q in questions_rows])
+    questions_list = [question_item(q, choices_by_question[q["id"]]) for q in questions_rows]
+    last_key = (questions_rows[-1]["order_index"], questions_rows[-1]["id"]) if questions_rows else None
+    return questions_list, len(questions_list), last_key
+
+
+async def _fetch_questions_page_json(connection, page_query: str, page_args: tuple) -> tuple:
+    """DB_JSON_RENDERING: نفس الصفحة في استعلام واحد — الأسئلة JSON جاهز (نص) من Postgres."""
+    row = await hot_queries.fetchrow(connection, f"{page_query}_json", *page_args)
+    last_key = (row["last_order_index"], row["last_id"]) if row["n"] else None
+    return row["questions"], row["n"], last_key
+
+
 @router.get("/subjects/{subject_id}/questions")
-def get_subject_questions(
+async def get_subject_questions(
     subject_id: int,
-    page: int = Query(1, ge=1, description="رقم الصفحة"),
+    page: int = Query(1, ge=1, description="رقم الصفحة (للعملاء القدام — الأفضل cursor)"),
     chapter_id: int = Query(None, description="فلتر حسب الفصل (اختياري)"),
+    cursor: str = Query(None, description="next_cursor من الصفحة اللي قبلها"),
+    per_page: int = Query(QUESTIONS_DEFAULT_PER_PAGE, ge=1, le=QUESTIONS_MAX_PER_PAGE, description="عدد الأسئلة في الصفحة"),
+    include_total: bool = Query(None, description="رجّع total_count (افتراضياً في وضع page بس)"),
     authorization: str = Header(None)
 ):
     """
-    جلب الأسئلة مع تقسيمها بيدجات (50 سؤال في كل صفحة)
+    جلب الأسئلة صفحة صفحة.
     Requires JWT token in Authorization header: "Bearer <token>"
     
     Args:
         subject_id: رقم المادة
-        page: رقم الصفحة (افتراضي 1)
+        page: رقم الصفحة (افتراضي 1) — OFFSET، بيبطأ مع الصفحات البعيدة
         chapter_id: رقم الفصل (اختياري - للفلترة حسب الفصل)
+        cursor: next_cursor من الرد اللي قبله — keyset على (order_index, id)، وقت ثابت لأي صفحة
+        per_page: حجم الصفحة (افتراضي 50، أقصى QUESTIONS_MAX_PER_PAGE)
+        include_total: total_count (من كاش لمدة QUESTION_COUNT_TTL_SECONDS)
     
     Returns:
-        JSON response مع 50 سؤال في كل صفحة
+        JSON response مع الأسئلة و next_cursor للصفحة الجاية
     """
     try:
-        user_id, result = decode_token_and_get_user(authorization)
+        user_id, result = await decode_token_and_get_user(authorization)
         if not user_id:
             return result
         
@@ -264,96 +279,214 @@ def get_subject_questions(
             logging.warning(f"User grade not set for user_id: {user_id}")
             return create_response(False, "User grade not configured", status_code=400)
         
-        per_page = 50
-        offset = (page - 1) * per_page
+        after = None
+        if cursor:
+            try:
+                after = parse_question_cursor(cursor)
+            except ValueError as e:
+                return create_response(False, str(e), status_code=400)
+        if include_total is None:
+            include_total = cursor is None
         
-        with engine.connect() as connection:
+        # الصفحة متخزنة جاهزة (bytes) لنفس الصف — من غير DB ولا JSON encoding.
+        # الـ grade جوه المفتاح، والصفحة مبتتخزنش غير بعد ما اتأكدنا إن المادة تبع الصف ده.
+        page_key = (grade, subject_id, chapter_id, page if after is None else None, cursor, per_page, include_total)
+        cached_body = question_pages.get(page_key)
+        if cached_body is not None:
+            return Response(content=cached_body, media_type="application/json")
+        
+        # 3 استعلامات بالكتير: المادة (+ العدد لو مش في الكاش)، الصفحة، اختيارات كل أسئلة الصفحة
+        # (مع DB_JSON_RENDERING الصفحة واختياراتها استعلام واحد)
+        async with db_router.connect(READ, user_id=user_id) as connection:
             # التحقق من أن المادة موجودة وتنتمي لصف المستخدم
-            subject = connection.execute(
-                text("SELECT id, name, grade FROM public.subjects WHERE id = :subject_id AND grade = :grade"),
-                {"subject_id": subject_id, "grade": grade}
-            ).mappings().fetchone()
+            total_count = question_counts.get(subject_id, chapter_id) if include_total else None
+            if include_total and total_count is None:
+                if chapter_id:
+                    subject = await hot_queries.fetchrow(connection, "subject_with_count_by_chapter", subject_id, grade, chapter_id)
+                else:
+                    subject = await hot_queries.fetchrow(connection, "subject_with_count", subject_id, grade)
+                if subject:
+                    total_count = subject["total"] or 0
+                    question_counts.put(subject_id, chapter_id, total_count)
+            else:
+                subject = await hot_queries.fetchrow(connection, "subject_for_grade", subject_id, grade)
             
             if not subject:
                 logging.warning(f"Subject {subject_id} not found or not available for grade {grade}")
                 return create_response(False, "Subject not found or not available for your grade", status_code=404)
             
-            # بناء الاستعلام مع فلتر الفصل اختياري
-            where_clause = "WHERE q.subject_id = :subject_id AND q.status = 'active'"
-            params = {"subject_id": subject_id, "limit": per_page, "offset": offset}
-            params_count = {"subject_id": subject_id}
-            
-            if chapter_id:
-                where_clause += " AND q.chapter_id = :chapter_id"
-                params["chapter_id"] = chapter_id
-                params_count["chapter_id"] = chapter_id
+            page_query, page_args = _question_page_query(subject_id, chapter_id, per_page, page, after)
+            if DB_JSON_RENDERING:
+                questions, count, last_key = await _fetch_questions_page_json(connection, page_query, page_args)
+            else:
+                questions, count, last_key = await _fetch_questions_page(connection, page_query, page_args)
             
-            # جلب إجمالي عدد الأسئلة
-            count_query = text(f"""
-                SELECT COUNT(*) as total FROM public.questions q {where_clause}
-            """)
-            total_result = connection.execute(count_query, params_count).mappings().fetchone()
-            total_count = total_result["total"] or 0
-            total_pages = math.ceil(total_count / per_page) if total_count > 0 else 0
+            next_cursor = None
+            if count == per_page:
+                next_cursor = question_cursor({"order_index": last_key[0], "id": last_key[1]})
+            total_pages = math.ceil(total_count / per_page) if total_count else (0 if total_count == 0 else None)
+            if after is None and total_pages is not None:
+                has_next = page < total_pages
+            else:
+                has_next = next_cursor is not None
             
-            # جلب الأسئلة مع الـ pagination
-            questions_query = text(f"""
-                SELECT q.id, q.subject_id, q.chapter_id, q.question_text, q.question_image_url,
-                       q.question_type, q.difficulty, q.expected_time, q.explanation, q.order_index
-                FROM public.questions q
-                {where_clause}
-                ORDER BY q.order_index ASC NULLS LAST, q.id ASC
-                LIMIT :limit OFFSET :offset
-            """)
-            questions_rows = connection.execute(questions_query, params).mappings().fetchall()
+            logging.info(f"Fetched {'cursor page' if after else f'page {page}'} with {count} questions for subject_id: {subject_id}, user_id: {user_id}")
             
-            questions_list = []
-            for q in questions_rows:
-                # جلب الاختيارات لكل سؤال
-                choices = connection.execute(
-                    text("""
-                        SELECT id, text, is_correct, "order"
-                        FROM public.question_choices
-                        WHERE question_id = :question_id
-                        ORDER BY "order" ASC NULLS LAST, id ASC
-                    """),
-                    {"question_id": q["id"]}
-                ).mappings().fetchall()
-                
-                choices_list = [
-                    {"id": c["id"], "text": c["text"], "is_correct": c["is_correct"], "order": c["order"]}
-                    for c in choices
-                ]
-                
-                questions_list.append({
-                    "id": q["id"],
-                    "subject_id": q["subject_id"],
-                    "chapter_id": q["chapter_id"],
-                    "question_text": q["question_text"],
-                    "question_image_url": q["question_image_url"],
-                    "question_type": q["question_type"],
-                    "difficulty": q["difficulty"],
-                    "expected_time": q["expected_time"],
-                    "explanation": q["explanation"],
-                    "order_index": q["order_index"],
-                    "choices": choices_list
+            pagination = {
+                "page": page if after is None else None,
+                "per_page": per_page,
+                "total_count": total_count,
+                "total_pages": total_pages,
+                "has_next": has_next,
+                "has_prev": after is not None or page > 1,
+                "next_cursor": next_cursor if has_next else None
+            }
+            if DB_JSON_RENDERING:
+                response = create_rendered_response("Questions fetched successfully", {
+                    "questions": questions,
+                    "pagination": render_json(pagination),
+                    "count": str(count),
                 })
-            
-            logging.info(f"Fetched page {page} with {len(questions_list)} questions for subject_id: {subject_id}, user_id: {user_id}")
-            
-            return create_response(True, "Questions fetched successfully", {
-                "questions": questions_list,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total_count": total_count,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
-                },
-                "count": len(questions_list)
-            }, status_code=200)
+            else:
+                response = create_response(True, "Questions fetched successfully", {
+                    "questions": questions,
+                    "pagination": pagination,
+                    "count": count
+                }, status_code=200)
+            question_pages.put(page_key, subject_id, response.body)
+            return response
     
     except Exception as e:
         logging.error(f"Error in get_subject_questions: {str(e)}")
         return create_response(False, f"An error occurred: {str(e)}", status_code=500)
+
+
+@router.get("/subjects/{subject_id}/questions/search")
+async def search_subject_questions(
+    subject_id: int,
+    q: str = Query(..., description="نص البحث"),
+    chapter_id: int = Query(None, description="فلتر حسب الفصل (اختياري)"),
+    cursor: str = Query(None, description="next_cursor من الصفحة اللي قبلها"),
+    per_page: int = Query(QUESTIONS_DEFAULT_PER_PAGE, ge=1, le=QUESTIONS_MAX_PER_PAGE, description="عدد النتائج في الصفحة"),
+    authorization: str = Header(None)
+):
+    """
+    بحث في أسئلة المادة (نص السؤال والشرح) مرتب بالأقرب — لو التطابقات أكتر من QUESTION_SEARCH_MAX_CANDIDATES
+    أول N بترتيب id بس هي اللي بتترتب و pagination.truncated = true.
+    Requires JWT token in Authorization header: "Bearer <token>"
+    
+    Args:
+        subject_id: رقم المادة
+        q: نص البحث — التشكيل وأشكال الألف/الهمزة والتاء المربوطة مش فارقين، وفيه تسامح مع الأخطاء الإملائية
+        chapter_id: رقم الفصل (اختياري)
+        cursor: next_cursor من الرد اللي قبله — keyset على (score, id)
+        per_page: حجم الصفحة (افتراضي 50، أقصى QUESTIONS_MAX_PER_PAGE)
+    
+    Returns:
+        JSON response مع الأسئلة (ومعاها score) و next_cursor للصفحة الجاية و truncated
+    """
+    try:
+        user_id, result = await decode_token_and_get_user(authorization)
+        if not user_id:
+            return result
+        
+        grade = result.get("grade")
+        if not grade:
+            logging.warning(f"User grade not set for user_id: {user_id}")
+            return create_response(False, "User grade not configured", status_code=400)
+        
+        q = q.strip()
+        if sum(ch.isalnum() for ch in q) < 2 or len(q) > QUESTION_SEARCH_MAX_LENGTH:
+            return create_response(False, f"Search query must have 2 to {QUESTION_SEARCH_MAX_LENGTH} characters", status_code=400)
+        
+        after = (None, None)
+        if cursor:
+            try:
+                after = parse_search_cursor(cursor)
+            except ValueError as e:
+                return create_response(False, str(e), status_code=400)
+        
+        snapshot = await _catalog_snapshot()
+        if not snapshot.subject_for_grade(subject_id, grade):
+            logging.warning(f"Subject {subject_id} not found or not available for grade {grade}")
+            return create_response(False, "Subject not found or not available for your grade", status_code=404)
+        
+        async with db_router.connect(READ, user_id=user_id) as connection:
+            if chapter_id:
+                rows = await hot_queries.fetch(connection, "questions_search_by_chapter", subject_id, q, per_page, *after, chapter_id)
+            else:
+                rows = await hot_queries.fetch(connection, "questions_search", subject_id, q, per_page, *after)
+            choices_by_question = await load_question_choices(connection, [row["id"] for row in rows])
+        
+        questions_list = [
+            {**question_item(row, choices_by_question[row["id"]]), "score": round(row["score"], 4)}
+            for row in rows
+        ]
+        next_cursor = search_cursor(rows[-1]["score"], rows[-1]["id"]) if len(rows) == per_page else None
+        
+        logging.info(f"Search returned {len(rows)} questions for subject_id: {subject_id}, user_id: {user_id}")
+        
+        return create_response(True, "Questions fetched successfully", {
+            "query": q,
+            "questions": questions_list,
+            "pagination": {
+                "per_page": per_page,
+                "has_next": next_cursor is not None,
+                "has_prev": cursor is not None,
+                "next_cursor": next_cursor,
+                "max_results": QUESTION_SEARCH_MAX_CANDIDATES,
+                "truncated": bool(rows) and rows[0]["truncated"]
+            },
+            "count": len(questions_list)
+        }, status_code=200)
+    
+    except Exception as e:
+        logging.error(f"Error in search_subject_questions: {str(e)}")
+        return create_response(False, f"An error occurred: {str(e)}", status_code=500)
+
+
+@router.get("/subjects/{subject_id}/questions/export")
+async def export_subject_questions(
+    subject_id: int,
+    authorization: str = Header(None),
+    accept_encoding: str = Header(None)
+):
+    """
+    كل الأسئلة النشطة للمادة باختياراتها كـ NDJSON (سطر JSON لكل سؤال) — للتحميل offline مرة واحدة
+    بدل المرور على /questions صفحة صفحة. الرد streaming؛ gzip لو الطلب فيه Accept-Encoding: gzip.
+    Requires JWT token in Authorization header: "Bearer <token>"
+    """
+    try:
+        user_id, result = await decode_token_and_get_user(authorization)
+        if not user_id:
+            return result
+        
+        grade = result.get("grade")
+        if not grade:
+            logging.warning(f"User grade not set for user_id: {user_id}")
+            return create_response(False, "User grade not configured", status_code=400)
+        
+        snapshot = await _catalog_snapshot()
+        if not snapshot.subject_for_grade(subject_id, grade):
+            logging.warning(f"Subject {subject_id} not found or not available for grade {grade}")
+            return create_response(False, "Subject not found or not available for your grade", status_code=404)
+        
+        slot = question_exporter.try_acquire()
+        if slot is None:
+            return create_response(False, "Server is busy, please try again shortly", status_code=503)
+    
+    except Exception as e:
+        logging.error(f"Error in export_subject_questions: {str(e)}")
+        return create_response(False, f"An error occurred: {str(e)}", status_code=500)
+    
+    compress = "gzip" in (accept_encoding or "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="subject-{subject_id}-questions.ndjson"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    logging.info(f"Exporting questions for subject_id: {subject_id}, user_id: {user_id}, gzip: {compress}")
+    return ExportStreamingResponse(
+        question_exporter.stream(slot, subject_id, user_id, compress),
+        slot,
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
@@ -0,0 +1,89 @@
+# user_cache.py — كاش داخل العملية لبيانات الطالب الأساسية (id, name, grade) بمفتاح user_id
+# /subjects/* و /dashboard/stats و /verify كانوا بيعملوا SELECT على public.users في كل طلب،
+# والصف والاسم نادراً ما بيتغيروا. الكاش بيتمسح صراحةً عند أي تعديل (student_profile, admin_crud)
+# وبينتهي بعد TTL كحد أقصى (مهم لو فيه أكتر من worker).
+import os
+import threading
+import time
+
+from . import metrics
+from .db_router import db_router, READ
+from .queries import hot_queries
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "50000"))
+
+
+class UserProfileCache:
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> dict | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id: int, profile: dict):
+        with self._lock:
+            if len(self._entries) >= self.max_size and user_id not in self._entries:
+                # أقدم إدخال (dict بيحافظ على ترتيب الإضافة)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (dict(profile), time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 4) if total else 0,
+            }
+
+
+user_profiles = UserProfileCache()
+metrics.register("user_cache", user_profiles.stats)
+
+
+async def get_user_profile_async(user_id: int) -> dict | None:
+    """يرجع {id, name, grade} من الكاش أو من public.users (asyncpg). None لو المستخدم غير موجود."""
+    profile = user_profiles.get(user_id)
+    if profile is not None:
+        return profile
+    async with db_router.connect(READ, user_id=user_id) as connection:
+        row = await hot_queries.fetchrow(connection, "user_profile", user_id)
+    if not row:
+        return None
+    profile = dict(row)
+    user_profiles.put(user_id, profile)
+    return profile
+
+
+def invalidate_user(user_id: int):
+    """يمسح بيانات المستخدم من الكاش بعد أي تعديل أو حذف، وقراءاته الجاية تروح للـ primary لفترة."""
+    user_profiles.invalidate(user_id)
+    db_router.mark_write(user_id)
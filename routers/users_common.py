@@ -1,12 +1,14 @@
 # users_common.py
 # Shared configuration and utilities for user endpoints
-from sqlalchemy import create_engine
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 import jwt
 import logging
 import hashlib
+import hmac
+import json
 from passlib.context import CryptContext
+from .jwt_cache import verified_tokens
 
 # تشفير كلمات المرور (bcrypt) — bcrypt يقبل 72 بايت كحد أقصى، نستخدم SHA256 أولاً لتفادي المشكلة
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
@@ -28,13 +30,8 @@ logging.basicConfig(
 # -----------------------------
 # Database connection
 # -----------------------------
-db_user = "postgres"
-db_password = "x4IQEBxzpSwDSUIcYxqNfsuEY40jzdrTP5AMKWiDppbAY4kevp0KeL3odvWHqhfE"
-db_host = "37.60.236.213"
-db_port = "5432"
-db_name = "naqwa"
-database_url = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-engine = create_engine(database_url)
+# الإعدادات (الرابط وحجم الـ pool والـ timeouts) في database.py ومتاخدة من environment variables
+from .database import engine, database_url  # noqa: E402
 
 # JWT settings
 SECRET_KEY = "mysecretkey123"
@@ -78,47 +75,120 @@ def verify_user_jwt_token(token: str) -> dict:
     """
     Verify JWT token and return payload (user_id, role, created_at).
     Raises ValueError if token is invalid or expired.
+    التوكنات اللي اتعمل لها verify بتتحفظ في كاش LRU لحد وقت الـ exp.
     """
     if not token:
         raise ValueError("Token is required")
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if "user_id" not in payload:
-            raise ValueError("Invalid token payload")
-        return payload
     except jwt.ExpiredSignatureError:
         raise ValueError("Token has expired")
     except jwt.InvalidTokenError:
         raise ValueError("Invalid token")
+    if "user_id" not in payload:
+        raise ValueError("Invalid token payload")
+    verified_tokens.put(token, payload)
+    return payload
+
+
+# -----------------------------
+# Password hash schemes
+# -----------------------------
+# الهاش بيتخزن بصيغة "<scheme>$<hash>" عشان المتحقق يعرف يشغّل خوارزمية واحدة بس.
+# الصفوف القديمة (قبل الـ prefix) ممكن تكون bcrypt(sha256) أو bcrypt(password) أو نص عادي.
+SCHEME_SEPARATOR = "$"
+DEFAULT_PASSWORD_SCHEME = "bcrypt_sha256"
+UNTAGGED_BCRYPT = "bcrypt_untagged"
+
+
+def _verify_bcrypt_sha256(plain_password: str, hashed: str) -> bool:
+    try:
+        return pwd_context.verify(_prepare_password_for_bcrypt(plain_password), hashed)
+    except Exception:
+        return False
+
+
+def _verify_bcrypt_raw(plain_password: str, hashed: str) -> bool:
+    # كلمات المرور القديمة لم تُحفظ بأكثر من 72 بايت
+    if len(plain_password.encode("utf-8")) > 72:
+        return False
+    try:
+        return pwd_context.verify(plain_password, hashed)
+    except Exception:
+        return False
+
+
+def _verify_plain(plain_password: str, hashed: str) -> bool:
+    return hmac.compare_digest(plain_password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+# scheme -> دالة التحقق (plain_password, hash_without_prefix)
+PASSWORD_SCHEMES = {
+    "bcrypt_sha256": _verify_bcrypt_sha256,
+    "bcrypt": _verify_bcrypt_raw,
+    "plain": _verify_plain,
+}
+
+
+def _is_bcrypt_hash(value: str) -> bool:
+    return value.startswith("$2") or value.startswith("$b$")
+
+
+def tag_password_hash(scheme: str, hashed: str) -> str:
+    """يضيف prefix الـ scheme للهاش."""
+    if scheme not in PASSWORD_SCHEMES:
+        raise ValueError(f"Unknown password scheme: {scheme}")
+    return f"{scheme}{SCHEME_SEPARATOR}{hashed}"
+
+
+def split_password_hash(stored: str) -> tuple[str, str]:
+    """
+    يرجع (scheme, hash بدون prefix).
+    bcrypt قديم بدون prefix يرجع UNTAGGED_BCRYPT، وأي قيمة تانية بدون prefix تعتبر نص عادي.
+    """
+    scheme, sep, rest = stored.partition(SCHEME_SEPARATOR)
+    if sep and scheme in PASSWORD_SCHEMES:
+        return scheme, rest
+    if _is_bcrypt_hash(stored):
+        return UNTAGGED_BCRYPT, stored
+    return "plain", stored
 
 
 def hash_password(password: str) -> str:
     """تشفر كلمة المرور قبل الحفظ في قاعدة البيانات. تستخدم SHA256 قبل bcrypt لتجنب حد 72 بايت."""
     prepared = _prepare_password_for_bcrypt(password)
-    return pwd_context.hash(prepared)
+    return tag_password_hash(DEFAULT_PASSWORD_SCHEME, pwd_context.hash(prepared))
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """تتحقق من تطابق كلمة المرور مع الهاش. تدعم الهاش القديم (مباشر) والجديد (SHA256 قبل bcrypt)."""
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    تتحقق من كلمة المرور وترجع (ok, new_hash).
+    new_hash لا يساوي None لو الهاش المخزن محتاج يتحدث (بدون prefix أو بـ scheme غير الافتراضي)
+    — الـ caller يحفظه في قاعدة البيانات.
+    """
     if not hashed_password:
-        return False
-    if hashed_password.startswith("$2") or hashed_password.startswith("$b$"):
-        # الصيغة الجديدة: bcrypt(sha256(password)) — تتجنب حد 72 بايت
-        prepared = _prepare_password_for_bcrypt(plain_password)
-        try:
-            if pwd_context.verify(prepared, hashed_password):
-                return True
-        except Exception:
-            pass
-        # التوافق مع كلمات المرور القديمة: bcrypt(password) — لا نمرر أكثر من 72 بايت
-        plain_bytes = plain_password.encode("utf-8")
-        if len(plain_bytes) > 72:
-            return False  # كلمات المرور القديمة لم تُحفظ بأكثر من 72 بايت
-        try:
-            return pwd_context.verify(plain_password, hashed_password)
-        except Exception:
-            return False
-    return plain_password == hashed_password
+        return False, None
+    scheme, hashed = split_password_hash(hashed_password)
+    if scheme == UNTAGGED_BCRYPT:
+        # صف قديم: لازم نجرب الاتنين مرة واحدة، وبعدها يتخزن بالـ prefix الصحيح
+        if _verify_bcrypt_sha256(plain_password, hashed):
+            return True, tag_password_hash("bcrypt_sha256", hashed)
+        if _verify_bcrypt_raw(plain_password, hashed):
+            return True, hash_password(plain_password)
+        return False, None
+    if not PASSWORD_SCHEMES[scheme](plain_password, hashed):
+        return False, None
+    if scheme != DEFAULT_PASSWORD_SCHEME:
+        return True, hash_password(plain_password)
+    return True, None
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """تتحقق من تطابق كلمة المرور مع الهاش. الـ prefix بيحدد خوارزمية واحدة للتحقق."""
+    return verify_and_update_password(plain_password, hashed_password)[0]
 
 
 # Function to create standardized response with status code
@@ -147,6 +217,28 @@ def create_response(success: bool, message: str, data: dict = None, status_code:
     
     return JSONResponse(content=response_body, status_code=status_code)
 
+
+def render_json(value) -> bytes:
+    """Encode a value exactly like JSONResponse does (compact, UTF-8)."""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def create_rendered_response(message: str, fragments: dict, status_code: int = 200):
+    """
+    Same body shape as create_response(True, message, data), but every value in fragments is
+    already-encoded JSON (str or bytes) — e.g. rendered by Postgres or pre-encoded in a snapshot —
+    and is spliced into the body as is, without building Python objects.
+    """
+    from fastapi import Response
+    
+    parts = [render_json({"success": True, "message": message})[:-1]]
+    for key, value in fragments.items():
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        parts.append(b"," + render_json(key) + b":" + value)
+    parts.append(b"}")
+    return Response(content=b"".join(parts), status_code=status_code, media_type="application/json")
+
 # List of all Egyptian governorates
 EGYPTIAN_GOVERNORATES = [
     "القاهرة",
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+CPU والـ allocations لكل request: الرد المبني من dicts في Python (الافتراضي) مقابل DB_JSON_RENDERING
+(صفحة الأسئلة JSON جاهز من Postgres، وقوايم الـ catalog متعملها encode مع الـ snapshot).
+الـ CPU بـ time.process_time (وقت انتظار الـ DB مش محسوب) والزمن الكلي (فيه شغل Postgres الزيادة) في لفة،
+والـ allocations بـ tracemalloc (أقصى ذاكرة للـ request) في لفة تانية عشان tracemalloc ما يأثرش على الـ CPU.
+
+استخدام:
+    python scripts/bench_json_rendering.py --subject-id 1 --grade "الصف الثالث الثانوي" --per-page 50 --iterations 200
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.database import async_engine, engine
+from routers.catalog import CATALOG_SUBJECTS_SQL, CATALOG_CHAPTERS_SQL, CatalogSnapshot, with_counts_item
+from routers.subjects import _question_page_query, _fetch_questions_page, _fetch_questions_page_json
+from routers.users_common import create_response, create_rendered_response, render_json
+
+
+async def _questions_python(conn, page_query, page_args):
+    questions, count, _ = await _fetch_questions_page(conn, page_query, page_args)
+    return create_response(True, "Questions fetched successfully", {"questions": questions, "count": count}).body
+
+
+async def _questions_db(conn, page_query, page_args):
+    questions, count, _ = await _fetch_questions_page_json(conn, page_query, page_args)
+    return create_rendered_response("Questions fetched successfully", {"questions": questions, "count": str(count)}).body
+
+
+async def _measure(label, render, iterations):
+    # الـ CPU والزمن في لفة من غير tracemalloc (بيبطّأ كل allocation)، والـ allocations في لفة لوحدها
+    await render()
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        body = await render()
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    peak = 0
+    for _ in range(min(iterations, 20)):
+        tracemalloc.start()
+        await render()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<32} {cpu * 1000 / iterations:>8.3f} ms CPU/request  {wall * 1000 / iterations:>8.3f} ms/request  "
+          f"{peak / 1024:>9.1f} KiB peak  {len(body):>8} bytes")
+
+
+async def main_async(args):
+    page_query, page_args = _question_page_query(args.subject_id, None, args.per_page, 1, None)
+    async with async_engine.connect() as conn:
+        await _measure("questions: python dicts", lambda: _questions_python(conn, page_query, page_args), args.iterations)
+        await _measure("questions: postgres json_agg", lambda: _questions_db(conn, page_query, page_args), args.iterations)
+    await async_engine.dispose()
+
+    with engine.connect() as sync_conn:
+        subject_rows = sync_conn.execute(text(CATALOG_SUBJECTS_SQL)).mappings().fetchall()
+        chapter_rows = sync_conn.execute(text(CATALOG_CHAPTERS_SQL)).mappings().fetchall()
+    snapshot = CatalogSnapshot(subject_rows, chapter_rows, render=False)
+    rendered = CatalogSnapshot(subject_rows, chapter_rows, render=True)
+
+    async def with_counts_python():
+        items = [with_counts_item(s) for s in snapshot.grade_subjects(args.grade)]
+        return create_response(True, "Subjects with counts", {"subjects": items, "grade": args.grade, "count": len(items)}).body
+
+    async def with_counts_rendered():
+        return create_rendered_response("Subjects with counts", {
+            "subjects": rendered.with_counts_json(args.grade),
+            "grade": render_json(args.grade),
+            "count": str(len(rendered.grade_subjects(args.grade))),
+        }).body
+
+    await _measure("with-counts: python dicts", with_counts_python, args.iterations)
+    await _measure("with-counts: pre-rendered", with_counts_rendered, args.iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark لـ DB_JSON_RENDERING")
+    parser.add_argument("--subject-id", type=int, required=True)
+    parser.add_argument("--grade", required=True, help="الصف اللي هيتقاس له /subjects/with-counts")
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+مقارنة الاستعلامات الساخنة: text() على psycopg2 زي الأول (compile + parse + plan كل مرة) مقابل
+الـ prepared statements المسجلة في routers/queries.py — لكل endpoint نفس الاستعلامات اللي بيعملها بالترتيب.
+بيطبع الزمن لكل request ووقت CPU الـ backend بتاع Postgres لكل request (من /proc/<pid>/stat — لو الـ DB على
+نفس الجهاز). لو pg_stat_statements متفعّل بيطبع كمان وقت الـ planning/execution على السيرفر.
+
+استخدام:
+    python scripts/bench_prepared.py --subject-id 1 --grade S3 --user-id 1 --iterations 2000
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.database import engine, async_engine
+from routers.queries import HOT_QUERIES, hot_queries
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def _to_text_sql(sql: str) -> str:
+    """$1, $2 ... -> (:p1), (:p2) ... عشان نفس الاستعلام يتنفذ بـ text() (الأقواس عشان $1::int[])."""
+    return re.sub(r"\$(\d+)", r"(:p\1)", sql)
+
+
+def _backend_cpu_ms(pid: int) -> float | None:
+    """utime + stime للـ backend process، أو None لو Postgres مش على نفس الجهاز."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) * 1000 / _CLOCK_TICKS
+
+
+def _per_request(started: float, cpu_before, cpu_after, iterations: int) -> tuple:
+    latency_ms = (time.perf_counter() - started) * 1000 / iterations
+    cpu_ms = None if cpu_before is None or cpu_after is None else (cpu_after - cpu_before) / iterations
+    return latency_ms, cpu_ms
+
+
+def _bench_plain(statements: list, iterations: int) -> tuple:
+    compiled = [(text(_to_text_sql(HOT_QUERIES[name])), {f"p{i + 1}": v for i, v in enumerate(args)})
+                for name, args in statements]
+    with engine.connect() as conn:
+        pid = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+        cpu_before = _backend_cpu_ms(pid)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for statement, params in compiled:
+                conn.execute(statement, params).fetchall()
+        return _per_request(started, cpu_before, _backend_cpu_ms(pid), iterations)
+
+
+async def _bench_prepared(statements: list, iterations: int) -> tuple:
+    async with async_engine.connect() as conn:
+        pid = await conn.scalar(text("SELECT pg_backend_pid()"))
+        for name, args in statements:
+            await hot_queries.fetch(conn, name, *args)  # prepare مرة واحدة خارج القياس
+        cpu_before = _backend_cpu_ms(pid)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for name, args in statements:
+                await hot_queries.fetch(conn, name, *args)
+        return _per_request(started, cpu_before, _backend_cpu_ms(pid), iterations)
+
+
+async def _server_stats():
+    async with async_engine.connect() as conn:
+        try:
+            rows = (await conn.execute(text("""
+                SELECT calls, round(total_plan_time::numeric, 1) AS plan_ms,
+                       round(total_exec_time::numeric, 1) AS exec_ms, left(regexp_replace(query, '\\s+', ' ', 'g'), 70) AS query
+                FROM pg_stat_statements
+                WHERE query ILIKE '%public.questions%' OR query ILIKE '%public.subjects%'
+                ORDER BY total_plan_time + total_exec_time DESC
+                LIMIT 10
+            """))).fetchall()
+        except Exception as e:
+            print(f"pg_stat_statements غير متاح: {e}")
+            return
+    for calls, plan_ms, exec_ms, query in rows:
+        print(f"  calls={calls} plan={plan_ms}ms exec={exec_ms}ms  {query}")
+
+
+def _format_ms(value) -> str:
+    return "n/a" if value is None else f"{value:.3f}"
+
+
+async def main_async(args):
+    with engine.connect() as conn:
+        page_ids = [row[0] for row in conn.execute(text(_to_text_sql(HOT_QUERIES["questions_page"])),
+                                                   {"p1": args.subject_id, "p2": 50, "p3": 0})]
+    # نفس الاستعلامات اللي الـ endpoint بيعملها على الـ DB (من غير الكاش)
+    endpoints = [
+        ("/subjects/{id}/questions", [
+            ("subject_with_count", (args.subject_id, args.grade)),
+            ("questions_page", (args.subject_id, 50, 0)),
+            ("question_choices_batch", (page_ids,)),
+        ]),
+        ("/dashboard/stats", [("dashboard_stats", (args.grade, args.user_id))]),
+    ]
+    print(f"{'endpoint':<26} {'text() ms':>10} {'prepared ms':>12} {'text() pg cpu':>14} {'prepared pg cpu':>16}")
+    for label, statements in endpoints:
+        plain_ms, plain_cpu = _bench_plain(statements, args.iterations)
+        prepared_ms, prepared_cpu = await _bench_prepared(statements, args.iterations)
+        print(f"{label:<26} {plain_ms:>10.3f} {prepared_ms:>12.3f} {_format_ms(plain_cpu):>14} {_format_ms(prepared_cpu):>16}")
+    await _server_stats()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark للـ prepared statements")
+    parser.add_argument("--subject-id", type=int, required=True)
+    parser.add_argument("--grade", default="S3")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=1000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+سرعة الاستيراد بـ COPY: بيولد N سؤال وهمي (4 اختيارات لكل سؤال) ويستوردهم dry run (ROLLBACK في الآخر)،
+ويطبع أسئلة/ثانية. الـ INSERT القديم صف صف للمقارنة بـ --row-by-row.
+المقاس (Postgres 18 على نفس الجهاز، 1 vCPU، 300 ألف سؤال موجودين): ~5,500 سؤال/ثانية بـ COPY
+(50 و100 ألف سؤال) مقابل ~540 صف صف — أقل من هدف الـ 10 آلاف: ~20% مراجعة السطور في Python والباقي
+INSERT في questions (trigger الـ search + الـ GIN indexes) و question_choices (فحص الـ FK لكل صف).
+
+استخدام:
+    python scripts/bench_question_import.py --subject-id 1 --created-by 1 --count 50000
+"""
+import argparse
+import json
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.database import engine
+from routers.question_import import question_importer
+
+
+def _bundle(subject_id: int, count: int):
+    bundle = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    for i in range(1, count + 1):
+        bundle.write(json.dumps({
+            "subject_id": subject_id, "question_type": "mcq", "difficulty": i % 5 + 1, "order_index": i,
+            "question_text": f"سؤال تجريبي رقم {i}",
+            "choices": [{"text": f"اختيار {n}", "is_correct": n == 1} for n in range(1, 5)],
+        }, ensure_ascii=False).encode("utf-8") + b"\n")
+    bundle.seek(0)
+    return bundle
+
+
+def _row_by_row(subject_id: int, created_by: int, count: int) -> float:
+    started = time.perf_counter()
+    with engine.connect() as conn, conn.begin() as tx:
+        for i in range(1, count + 1):
+            question_id = conn.execute(text("""
+                INSERT INTO public.questions (subject_id, question_text, question_type, difficulty, order_index, created_by)
+                VALUES (:subject_id, :text, 'mcq', :difficulty, :i, :created_by) RETURNING id
+            """), {"subject_id": subject_id, "text": f"سؤال تجريبي رقم {i}", "difficulty": i % 5 + 1,
+                   "i": i, "created_by": created_by}).scalar()
+            for n in range(1, 5):
+                conn.execute(text("""
+                    INSERT INTO public.question_choices (question_id, text, is_correct, "order")
+                    VALUES (:question_id, :text, :is_correct, :n)
+                """), {"question_id": question_id, "text": f"اختيار {n}", "is_correct": n == 1, "n": n})
+        tx.rollback()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark لاستيراد الأسئلة")
+    parser.add_argument("--subject-id", type=int, required=True)
+    parser.add_argument("--created-by", type=int, required=True)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--row-by-row", type=int, default=0, help="كمان قيس INSERT صف صف لعدد الأسئلة ده")
+    args = parser.parse_args()
+
+    with _bundle(args.subject_id, args.count) as bundle:
+        report = question_importer.run(bundle, "jsonl", args.created_by, dry_run=True)
+    seconds = report["duration_ms"] / 1000
+    print(f"COPY import: {report['inserted']} questions + {report['choices']} choices in {seconds:.2f} s "
+          f"({report['inserted'] / seconds:.0f} questions/s), {report['error_count']} errors")
+    if args.row_by_row:
+        seconds = _row_by_row(args.subject_id, args.created_by, args.row_by_row)
+        print(f"row by row:  {args.row_by_row} questions in {seconds:.2f} s ({args.row_by_row / seconds:.0f} questions/s)")
+
+
+if __name__ == "__main__":
+    main()
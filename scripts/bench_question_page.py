@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+صفحة الأسئلة قبل وبعد الـ batch loader: اختيارات كل سؤال في استعلام لوحده (N+1) مقابل
+load_question_choices (استعلام واحد بـ = ANY). بيطبع متوسط الوقت وعدد الاستعلامات للصفحة.
+
+استخدام:
+    python scripts/bench_question_page.py --subject-id 1 --per-page 50 --iterations 200
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers import query_stats
+from routers.database import async_engine
+from routers.queries import hot_queries
+from routers.loaders import load_question_choices
+
+PER_QUESTION_SQL = text("""
+    SELECT id, text, is_correct, "order"
+    FROM public.question_choices
+    WHERE question_id = :question_id
+    ORDER BY "order" ASC NULLS LAST, id ASC
+""")
+
+
+async def _per_question(conn, question_ids):
+    return {qid: (await conn.execute(PER_QUESTION_SQL, {"question_id": qid})).mappings().fetchall()
+            for qid in question_ids}
+
+
+async def _measure(label, loader, conn, subject_id, per_page, iterations):
+    stats, token = query_stats.start_request(label)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        rows = await hot_queries.fetch(conn, "questions_page", subject_id, per_page, 0)
+        await loader(conn, [r["id"] for r in rows])
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+    query_stats._current.reset(token)
+    print(f"{label}: {elapsed_ms:.2f} ms/page, {stats.count / iterations:.0f} queries/page")
+
+
+async def main_async(args):
+    async with async_engine.connect() as conn:
+        await _measure("per-question (before)", _per_question, conn, args.subject_id, args.per_page, args.iterations)
+        await _measure("batched (after)", load_question_choices, conn, args.subject_id, args.per_page, args.iterations)
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark لاختيارات صفحة الأسئلة")
+    parser.add_argument("--subject-id", type=int, required=True)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+زمن البحث في الأسئلة (questions_search في routers/queries.py) على بنك أسئلة وهمي بالعربي.
+الأسئلة بتتضاف لمادة واحدة (أسوأ حالة: كل البنك في نفس المادة) في transaction واحدة بتعمل ROLLBACK في الآخر،
+فلازم 0003_question_search تكون متطبقة (الـ trigger هو اللي بيملا search_vector و search_text).
+الكلمات بتتختار بـ hashint4 (أول القائمة أشيع من آخرها زي النص الحقيقي) فالبيانات هي هي في كل تشغيل. شغّله على staging مش production.
+
+استخدام:
+    python scripts/bench_question_search.py --subject-id 1 --created-by 1 --rows 1000000
+    python scripts/bench_question_search.py --subject-id 1 --created-by 1 --rows 1000000 --explain
+    python scripts/bench_question_search.py --subject-id 1 --created-by 1 --rows 0   # على الأسئلة الموجودة بس
+"""
+import argparse
+import re
+import statistics
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.database import engine
+from routers.queries import HOT_QUERIES, QUESTION_SEARCH_MAX_CANDIDATES
+
+TARGET_MS = 50
+
+WORDS = [
+    "احسب", "أوجد", "إذا", "كانت", "السرعة", "المتوسطة", "لجسم", "يتحرك", "في", "خط", "مستقيم", "العجلة",
+    "القوة", "المؤثرة", "على", "الكتلة", "الطاقة", "الحركية", "الوضع", "الشغل", "المبذول", "التيار", "الكهربي",
+    "المقاومة", "فرق", "الجهد", "المعادلة", "الكيميائية", "التفاعل", "المول", "الذرة", "الإلكترون", "النواة",
+    "الخلية", "النبات", "الوراثة", "الجين", "البروتين", "الإنزيم", "الدالة", "المشتقة", "التكامل", "المنحنى",
+    "النقطة", "المماس", "المثلث", "الزاوية", "المساحة", "الحجم", "الأسطوانة", "الكرة", "الجملة", "الفعل",
+    "الفاعل", "المفعول", "الإعراب", "القصيدة", "الشاعر", "المعنى", "الصورة", "مسؤول", "قراءة", "مبتدأ",
+]
+
+SEED_SQL = text("""
+    INSERT INTO public.questions (subject_id, question_text, explanation, question_type, status, order_index, created_by)
+    SELECT :subject_id,
+           (SELECT string_agg(w[1 + floor(cardinality(w) * power((abs(hashint4(g * 16 + k)::bigint) % 1000000) / 1e6, 2))::int], ' ')
+            FROM generate_series(1, 12) AS k),
+           (SELECT string_agg(w[1 + floor(cardinality(w) * power((abs(hashint4(g * 16 + k + 100)::bigint) % 1000000) / 1e6, 2))::int], ' ')
+            FROM generate_series(1, 6) AS k),
+           'mcq', 'active', g, :created_by
+    FROM generate_series(1, :rows) AS g, (SELECT CAST(:words AS text[]) AS w) words
+""")
+
+# (وصف، نص البحث) — نفس الكلمة بتشكيل/همزة/تاء مربوطة مختلفة لازم ترجع نفس النتائج
+SEARCHES = [
+    ("كلمة واحدة", "المعادلة"),
+    ("تشكيل وتاء مربوطة", "المُعادَله"),
+    ("همزة", "اوجد السرعه"),
+    ("جملة", "القوة المؤثرة على الكتلة"),
+    ("خطأ إملائي (trigram)", "الكيمياءية"),
+    ("كلمة نادرة", "مبتدا"),
+]
+
+
+def _to_text_sql(sql: str) -> str:
+    """$1, $2 ... -> (:p1), (:p2) ... عشان نفس الاستعلام يتنفذ بـ text() (الأقواس عشان $4::float8)."""
+    return re.sub(r"\$(\d+)", r"(:p\1)", sql)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark للبحث في الأسئلة")
+    parser.add_argument("--subject-id", type=int, required=True, help="المادة اللي هتتضاف لها الأسئلة الوهمية")
+    parser.add_argument("--created-by", type=int, required=True, help="users.id لعمود created_by")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--explain", action="store_true", help="اطبع EXPLAIN ANALYZE لأول بحث")
+    args = parser.parse_args()
+
+    search = text(_to_text_sql(HOT_QUERIES["questions_search"]))
+    with engine.connect() as conn:
+        tx = conn.begin()
+        try:
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            started = time.perf_counter()
+            conn.execute(SEED_SQL, {"subject_id": args.subject_id, "created_by": args.created_by,
+                                    "rows": args.rows, "words": WORDS})
+            conn.execute(text("ANALYZE public.questions"))
+            print(f"seeded {args.rows} questions in {time.perf_counter() - started:.1f} s "
+                  f"(QUESTION_SEARCH_MAX_CANDIDATES={QUESTION_SEARCH_MAX_CANDIDATES})")
+
+            if args.explain:
+                plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + _to_text_sql(HOT_QUERIES["questions_search"])),
+                                    {"p1": args.subject_id, "p2": SEARCHES[0][1], "p3": args.per_page,
+                                     "p4": None, "p5": None}).fetchall()
+                print("\n".join(row[0] for row in plan))
+
+            print(f"{'search':<24} {'hits':>5} {'ranked':>7} {'p50 ms':>8} {'p95 ms':>8} {'page 2 ms':>10}")
+            worst = 0.0
+            for label, query in SEARCHES:
+                params = {"p1": args.subject_id, "p2": query, "p3": args.per_page, "p4": None, "p5": None}
+                timings = []
+                for _ in range(args.iterations):
+                    t0 = time.perf_counter()
+                    rows = conn.execute(search, params).fetchall()
+                    timings.append((time.perf_counter() - t0) * 1000)
+                page2_ms = 0.0
+                if len(rows) == args.per_page:
+                    t0 = time.perf_counter()
+                    conn.execute(search, {**params, "p4": rows[-1].score, "p5": rows[-1].id}).fetchall()
+                    page2_ms = (time.perf_counter() - t0) * 1000
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                worst = max(worst, p95)
+                # ranked: كل التطابقات اترتبت، أو أول QUESTION_SEARCH_MAX_CANDIDATES بس (truncated)
+                ranked = "first N" if rows and rows[0].truncated else "all"
+                print(f"{label:<24} {len(rows):>5} {ranked:>7} {statistics.median(timings):>8.2f} {p95:>8.2f} {page2_ms:>10.2f}")
+            print(f"worst p95: {worst:.2f} ms ({'OK' if worst < TARGET_MS else 'over'} target {TARGET_MS} ms)")
+        finally:
+            tx.rollback()
+
+
+if __name__ == "__main__":
+    main()
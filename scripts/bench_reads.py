@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark لمسارات القراءة: requests/sec و p50/p99 latency مع عدد كبير من العملاء المتزامنين.
+بيحتاج سيرفر شغال بس. العميل asyncio streams خام (HTTP/1.1 keep-alive، connection لكل عميل) مش httpx:
+httpx بـ 500 عميل بياكل core كامل لوحده، فعلى جهاز صغير كنا بنقيس العميل مش السيرفر.
+
+استخدام:
+    python scripts/bench_reads.py --url http://127.0.0.1:8000 --token <jwt> --concurrency 500 --duration 30
+للمقارنة مع نسخة الـ threadpool (مثلاً revision قديمة شغالة على port تاني):
+    python scripts/bench_reads.py --url http://127.0.0.1:8000 --baseline-url http://127.0.0.1:8001 --token <jwt>
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    "/api/v1/site-status",
+    "/api/v1/verify",
+    "/api/v1/subjects/available",
+    "/api/v1/subjects/with-counts",
+    "/api/v1/dashboard/stats",
+]
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """status code، وبيقرا الـ body كله (Content-Length) عشان الـ connection تفضل صالحة للطلب الجاي."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _worker(host: str, port: int, requests: list, deadline: float, latencies: list, errors: list, offset: int):
+    """latencies: (رقم المسار، ms) عشان الـ p99 يتحسب كمان لكل مسار لوحده."""
+    i = offset
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        index = i % len(requests)
+        request = requests[index]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status = await _read_response(reader)
+            if status >= 500:
+                errors.append(status)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        latencies.append((index, (time.perf_counter() - started) * 1000))
+    if writer is not None:
+        writer.close()
+
+
+async def run(url: str, token: str | None, paths: list, concurrency: int, duration: float) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    auth = f"Authorization: Bearer {token}\r\n" if token else ""
+    requests = [
+        f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n{auth}Connection: keep-alive\r\n\r\n".encode()
+        for path in paths
+    ]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(host, port, requests, deadline, latencies, errors, n) for n in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    overall = sorted(ms for _, ms in latencies)
+    per_path = {}
+    for n, path in enumerate(paths):
+        values = sorted(ms for index, ms in latencies if index == n)
+        per_path[path] = {"p50_ms": round(_percentile(values, 50), 1), "p99_ms": round(_percentile(values, 99), 1)}
+    return {
+        "url": url,
+        "requests": len(overall),
+        "errors": len(errors),
+        "rps": round(len(overall) / elapsed, 1),
+        "p50_ms": round(_percentile(overall, 50), 1),
+        "p99_ms": round(_percentile(overall, 99), 1),
+        "paths": per_path,
+    }
+
+
+def _print(result: dict):
+    print(f"{result['url']}: {result['rps']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['requests']} requests, {result['errors']} errors")
+    if len(result["paths"]) > 1:
+        for path, values in result["paths"].items():
+            print(f"    {path:<32} p50 {values['p50_ms']:>8} ms  p99 {values['p99_ms']:>8} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark مسارات القراءة")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--baseline-url", help="سيرفر تاني للمقارنة (مثلاً نسخة الـ threadpool)")
+    parser.add_argument("--token", help="JWT لطالب (مطلوب لكل المسارات ما عدا /site-status)")
+    parser.add_argument("--path", action="append", dest="paths", help="مسار معين (ممكن يتكرر)")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+
+    paths = args.paths or (DEFAULT_PATHS if args.token else ["/api/v1/site-status"])
+    for url in filter(None, [args.baseline_url, args.url]):
+        _print(asyncio.run(run(url, args.token, paths, args.concurrency, args.duration)))
+
+
+if __name__ == "__main__":
+    main()
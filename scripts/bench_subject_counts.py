@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+أعداد /subjects/with-counts: الـ subqueries القديمة (COUNT على questions و COUNT(DISTINCT) على exams_questions)
+مقابل القراءة من subject_stats، مع تكبير بنك الأسئلة خطوة خطوة لحد مليون سؤال.
+كل الأسئلة الوهمية بتتضاف في transaction واحدة بتعمل ROLLBACK في الآخر — بس برضه شغّله على staging مش production.
+بيطبع كمان وقت الـ INSERT لكل خطوة (فيه تكلفة الـ triggers).
+
+استخدام:
+    python scripts/bench_subject_counts.py --subject-id 1 --created-by 1 --steps 10000,100000,1000000
+"""
+import argparse
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.database import engine
+from routers.catalog import CATALOG_SUBJECTS_LIVE_SQL, CATALOG_SUBJECTS_SQL
+
+GROW_SQL = text("""
+    INSERT INTO public.questions (subject_id, question_text, question_type, status, order_index, created_by)
+    SELECT :subject_id, 'bench question ' || g, 'mcq', 'active', g, :created_by
+    FROM generate_series(:start, :stop) AS g
+""")
+
+
+def _measure(conn, sql, iterations):
+    statement = text(sql)
+    conn.execute(statement).fetchall()  # warm-up: الـ plan والـ cache مش جزء من القياس
+    started = time.perf_counter()
+    for _ in range(iterations):
+        conn.execute(statement).fetchall()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark لأعداد المواد قبل وبعد subject_stats")
+    parser.add_argument("--subject-id", type=int, required=True, help="المادة اللي هتتضاف لها الأسئلة الوهمية")
+    parser.add_argument("--created-by", type=int, required=True, help="users.id لعمود created_by")
+    parser.add_argument("--steps", default="10000,100000,1000000", help="إجمالي الأسئلة المضافة في كل خطوة")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    steps = [int(s) for s in args.steps.split(",")]
+
+    with engine.connect() as conn:
+        tx = conn.begin()
+        try:
+            # الـ INSERT لمليون سؤال أطول من DB_STATEMENT_TIMEOUT_MS
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            added = 0
+            print(f"{'added':>10} {'insert s':>9} {'live ms':>9} {'subject_stats ms':>17}")
+            for target in [0] + steps:
+                insert_s = 0.0
+                if target > added:
+                    started = time.perf_counter()
+                    conn.execute(GROW_SQL, {"subject_id": args.subject_id, "created_by": args.created_by,
+                                            "start": added + 1, "stop": target})
+                    insert_s = time.perf_counter() - started
+                    added = target
+                    conn.execute(text("ANALYZE public.questions"))
+                live_ms = _measure(conn, CATALOG_SUBJECTS_LIVE_SQL, args.iterations)
+                rollup_ms = _measure(conn, CATALOG_SUBJECTS_SQL, args.iterations)
+                print(f"{added:>10} {insert_s:>9.2f} {live_ms:>9.2f} {rollup_ms:>17.2f}")
+        finally:
+            tx.rollback()
+
+
+if __name__ == "__main__":
+    main()
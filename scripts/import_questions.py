@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+استيراد بنك أسئلة من ملف JSONL أو CSV (نفس الـ endpoint POST /api/v1/admin/questions/import).
+التقرير (عدد اللي اتضاف، الأخطاء برقم السطر، ids الأسئلة الجديدة) بيتطبع ملخص، وكامل بـ --report.
+الـ API بيشوف الأسئلة الجديدة في /questions و /with-counts بعد RESPONSE_CACHE_TTL_SECONDS و CATALOG_REFRESH_SECONDS.
+
+استخدام:
+    python scripts/import_questions.py bank.jsonl --created-by 1 [--dry-run] [--report report.json]
+    python scripts/import_questions.py bank.csv --created-by 1
+"""
+import argparse
+import json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.question_import import question_importer, QuestionImportError
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استيراد أسئلة بـ COPY")
+    parser.add_argument("path", help="ملف .jsonl أو .csv")
+    parser.add_argument("--created-by", type=int, required=True, help="users.id لعمود created_by")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="افتراضياً من امتداد الملف")
+    parser.add_argument("--dry-run", action="store_true", help="راجع بس من غير ما تحفظ")
+    parser.add_argument("--report", help="اكتب التقرير كامل JSON في الملف ده")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    try:
+        with open(args.path, "rb") as bundle:
+            # التقرير الكامل (كل الـ ids) بس لو هيتكتب في ملف
+            report = question_importer.run(bundle, fmt, args.created_by, args.dry_run,
+                                           max_question_ids=None if args.report else 0)
+    except QuestionImportError as e:
+        sys.exit(f"error: {e}")
+
+    rate = report["inserted"] * 1000 / report["duration_ms"] if report["duration_ms"] else 0
+    print(f"{'dry run: ' if args.dry_run else ''}{report['inserted']}/{report['total']} questions, "
+          f"{report['choices']} choices in {report['duration_ms']} ms ({rate:.0f} questions/s)")
+    for error in report["errors"][:20]:
+        print(f"  line {error['line']}: {error['error']}")
+    if report["error_count"] > 20:
+        print(f"  ... {report['error_count'] - 20} more errors")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
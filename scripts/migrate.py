@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+تطبيق الـ migrations المرقّمة (migrations/NNNN_*.py) وتسجيل نسخة الـ schema في public.schema_migrations.
+استخدام:
+    python scripts/migrate.py             # تطبيق كل الـ migrations اللي لسه متطبقتش
+    python scripts/migrate.py --status    # النسخة الحالية والـ migrations المعلقة
+    python scripts/migrate.py --target 1  # لحد نسخة معينة
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.migrations import migrate, status, MigrationLocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--target", type=int)
+    args = parser.parse_args()
+
+    if args.status:
+        result = status()
+        print(f"current version: {result['current_version']}")
+        print(f"pending: {', '.join(result['pending']) or '-'}")
+        if result["changed"]:
+            print(f"changed after apply: {', '.join(result['changed'])}")
+        return
+
+    try:
+        done = migrate(args.target)
+    except MigrationLocked as e:
+        print(e)
+        sys.exit(1)
+    for migration, duration_ms in done:
+        print(f"applied {migration!r} in {duration_ms} ms")
+    if not done:
+        print("schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+سكربت لترحيل هاشات كلمات المرور في جدولي users و admins لصيغة "<scheme>$<hash>".
+استخدام:
+    python scripts/migrate_password_hashes.py                      # تقرير بعدد الحسابات على كل scheme
+    python scripts/migrate_password_hashes.py --hash-plaintext     # تشفير كلمات المرور المخزنة كنص عادي
+    python scripts/migrate_password_hashes.py --assume-untagged bcrypt_sha256
+        # إضافة prefix لهاشات bcrypt القديمة (بدون prefix) لو معروف إنها كلها bcrypt(sha256)
+
+هاشات bcrypt القديمة بدون prefix مينفعش نعرف الـ scheme بتاعها من غير كلمة المرور،
+فلو مفيش --assume-untagged بتتحدث تلقائياً عند أول تسجيل دخول ناجح.
+"""
+import argparse
+import sys
+import os
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from routers.users_common import (
+    engine,
+    hash_password,
+    split_password_hash,
+    tag_password_hash,
+    UNTAGGED_BCRYPT,
+)
+
+TABLES = ("users", "admins")
+
+
+def _iter_batches(table: str, batch_size: int):
+    """قراءة (id, password) بـ keyset pagination على id."""
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT id, password FROM public.{table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": batch_size}
+            ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def migrate_table(table: str, hash_plaintext: bool, assume_untagged: str | None, batch_size: int, dry_run: bool) -> tuple[Counter, int]:
+    """يرجع (عدد الحسابات على كل scheme بعد الترحيل، عدد الصفوف اللي اتحدثت)."""
+    counts = Counter()
+    updated = 0
+    for rows in _iter_batches(table, batch_size):
+        updates = []
+        for row_id, stored in rows:
+            stored = (stored or "").strip()
+            scheme, hashed = split_password_hash(stored)
+            if scheme == "plain" and hash_plaintext and stored:
+                updates.append({"id": row_id, "pw": hash_password(hashed)})
+                scheme = "bcrypt_sha256"
+            elif scheme == UNTAGGED_BCRYPT and assume_untagged:
+                updates.append({"id": row_id, "pw": tag_password_hash(assume_untagged, hashed)})
+                scheme = assume_untagged
+            counts[scheme] += 1
+        if updates and not dry_run:
+            with engine.begin() as conn:
+                conn.execute(text(f"UPDATE public.{table} SET password = :pw WHERE id = :id"), updates)
+        updated += len(updates)
+    return counts, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ترحيل هاشات كلمات المرور لصيغة <scheme>$<hash>")
+    parser.add_argument("--hash-plaintext", action="store_true", help="تشفير كلمات المرور المخزنة كنص عادي")
+    parser.add_argument("--assume-untagged", choices=["bcrypt_sha256", "bcrypt"], help="الـ scheme لهاشات bcrypt القديمة بدون prefix")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="عرض النتيجة بدون حفظ")
+    args = parser.parse_args()
+
+    for table in TABLES:
+        counts, updated = migrate_table(table, args.hash_plaintext, args.assume_untagged, args.batch_size, args.dry_run)
+        action = "سيتم تحديث" if args.dry_run else "تم تحديث"
+        print(f"{table}: {action} {updated} صف")
+        for scheme, n in sorted(counts.items()):
+            print(f"  {scheme}: {n}")
+
+
+if __name__ == "__main__":
+    main()
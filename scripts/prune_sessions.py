@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+سكربت صيانة جدول السيشنات (يتشغل من cron مثلاً كل ساعة).
+- ينشئ partitions الشهور الجاية
+- يحذف partitions الشهور القديمة بالكامل
+- يمسح السيشنات المنتهية على دفعات
+استخدام: python scripts/prune_sessions.py [--batch-size 5000] [--months-ahead 2] [--retain-months 1]
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.sessions_store import run_maintenance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="صيانة جدول public.sessions")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--months-ahead", type=int, default=2)
+    parser.add_argument("--retain-months", type=int, default=1)
+    args = parser.parse_args()
+
+    result = run_maintenance(args.batch_size, args.months_ahead, args.retain_months)
+    print(f"partitions: {', '.join(result['partitions'])}")
+    print(f"dropped partitions: {', '.join(result['dropped_partitions']) or '-'}")
+    print(f"pruned sessions: {result['pruned']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+تصحيح جدول subject_stats من الجداول نفسها (نفس اللي الـ API بيعمله كل SUBJECT_STATS_RECONCILE_SECONDS).
+يتشغل من cron لو الـ reconcile جوه السيرفر مقفول (SUBJECT_STATS_RECONCILE_SECONDS=0).
+استخدام: python scripts/reconcile_subject_stats.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.subject_stats import reconciler
+
+
+def main():
+    corrected = reconciler.reconcile()
+    if corrected is None:
+        print("skipped: another process is reconciling subject_stats")
+        return
+    print(f"corrected subjects: {len(corrected)}" + (f" ({', '.join(map(str, corrected))})" if corrected else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# test_catalog.py — إجمالي الصف في الـ catalog snapshot (routers/catalog.py) لـ /dashboard/stats
+from routers.catalog import CatalogSnapshot
+
+
+def _subject(subject_id: int, grade: str, questions_count: int) -> dict:
+    return {"id": subject_id, "name": f"Subject {subject_id}", "grade": grade, "stream": None,
+            "chapters_count": 0, "questions_count": questions_count, "exams_count": 1}
+
+
+def test_grade_totals_sum_questions_and_take_distinct_exams_per_grade():
+    snapshot = CatalogSnapshot(
+        [_subject(1, "S1", 40), _subject(2, "S1", None), _subject(3, "S1", 5), _subject(4, "S2", 7)],
+        [],
+        # امتحان فيه أسئلة من مادتين بيتعد مرة واحدة للصف (مش مجموع exams_count بتاع المواد)
+        [{"grade": "S1", "exams_count": 2}],
+        render=False,
+    )
+
+    assert snapshot.totals_for_grade("S1") == (45, 2)
+    assert snapshot.totals_for_grade("S2") == (7, 0)
+    assert snapshot.totals_for_grade("S3") == (0, 0)
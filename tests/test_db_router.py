@@ -0,0 +1,172 @@
+# test_db_router.py — توجيه القراءة/الكتابة (routers/db_router.py) على engines وهمية: مفيش DB
+import asyncio
+
+import pytest
+from sqlalchemy.engine import make_url
+
+from routers.db_router import DatabaseRouter, READ, WRITE
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+        self.closed = False
+
+    async def scalar(self, statement):
+        return self.engine.lag
+
+    async def close(self):
+        self.closed = True
+
+    def __await__(self):
+        # engine.connect() في SQLAlchemy بيتعمله await أو async with
+        async def _self():
+            return self
+        return _self().__await__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class FakePool:
+    _max_overflow = 1
+
+    def size(self):
+        return 2
+
+
+class FakeEngine:
+    def __init__(self, name: str, lag: float = 0.0):
+        self.url = make_url(f"postgresql+asyncpg://app:secret@{name}/naqwa")
+        self.sync_engine = type("SyncEngine", (), {"pool": FakePool()})()
+        self.lag = lag
+        self.down = False
+        self.connections = []
+
+    def connect(self):
+        if self.down:
+            raise OSError(f"{self.url.host} is down")
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    async def dispose(self):
+        pass
+
+
+def _router(replica_count: int = 2, **kwargs):
+    primary = FakeEngine("primary")
+    replicas = [FakeEngine(f"replica{i}") for i in range(1, replica_count + 1)]
+    # check_seconds كبير: الفحص بيتعمل يدوي بـ refresh_health في الاختبار
+    router = DatabaseRouter(primary, replicas, max_lag_seconds=5, check_seconds=3600, **kwargs)
+    asyncio.run(router.refresh_health())
+    return router, primary, replicas
+
+
+def _read_host(router, user_id=None) -> str:
+    async def read():
+        async with router.connect(READ, user_id=user_id) as connection:
+            return connection.engine.url.host
+    return asyncio.run(read())
+
+
+def test_reads_round_robin_over_healthy_replicas():
+    router, primary, replicas = _router()
+
+    hosts = [_read_host(router) for _ in range(4)]
+
+    assert sorted(hosts[:2]) == ["replica1", "replica2"]
+    assert hosts[2:] == hosts[:2]
+    assert [r.reads for r in router.replicas] == [2, 2]
+    assert not primary.connections
+
+
+def test_lagging_replica_is_skipped_until_it_catches_up():
+    router, primary, replicas = _router()
+    replicas[0].lag = 30
+    asyncio.run(router.refresh_health())
+
+    assert {_read_host(router) for _ in range(4)} == {"replica2"}
+
+    replicas[1].lag = 30
+    asyncio.run(router.refresh_health())
+    assert _read_host(router) == "primary"
+    assert router.fallbacks == 1
+
+    replicas[0].lag = replicas[1].lag = 0
+    asyncio.run(router.refresh_health())
+    assert {_read_host(router) for _ in range(4)} == {"replica1", "replica2"}
+
+
+def test_replica_down_falls_back_to_primary():
+    router, primary, replicas = _router(replica_count=1)
+    replicas[0].down = True
+
+    assert _read_host(router) == "primary"
+    assert router.replicas[0].healthy is False
+    assert router.replicas[0].last_error == "OSError"
+    assert router.fallbacks == 1
+    # اتعلّمت واقعة: الطلب الجاي يروح للـ primary على طول من غير محاولة
+    assert _read_host(router) == "primary"
+    assert router.replicas[0].failures == 1
+
+
+def test_reads_stick_to_primary_after_write():
+    router, primary, replicas = _router(sticky_seconds=60)
+
+    async def write():
+        async with router.connect(WRITE, user_id=7):
+            pass
+    asyncio.run(write())
+
+    assert _read_host(router, user_id=7) == "primary"
+    assert _read_host(router, user_id=8).startswith("replica")
+    assert router.sticky_reads == 1
+    assert router.writes == 1
+
+
+def test_sticky_window_expires():
+    router, primary, replicas = _router(sticky_seconds=0)
+
+    async def write():
+        async with router.connect(WRITE, user_id=7):
+            pass
+    asyncio.run(write())
+
+    assert _read_host(router, user_id=7).startswith("replica")
+
+
+def test_write_that_raises_still_marks_user_sticky():
+    router, primary, replicas = _router(sticky_seconds=60)
+
+    async def write():
+        async with router.connect(WRITE, user_id=7):
+            # commit حصل، وبعده الـ handler وقع
+            raise RuntimeError("after commit")
+    with pytest.raises(RuntimeError):
+        asyncio.run(write())
+
+    assert _read_host(router, user_id=7) == "primary"
+    assert all(c.closed for c in primary.connections)
+
+
+def test_gate_serves_waiters_in_arrival_order():
+    router, primary, replicas = _router(replica_count=0)
+    assert router.primary_gate.capacity == 3
+    order = []
+
+    async def read(n):
+        async with router.connect(READ):
+            order.append(n)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(read(n) for n in range(10)))
+
+    asyncio.run(main())
+    assert order == list(range(10))
+    assert router.primary_gate.waiting == 0
+    assert len(primary.connections) == 10 and all(c.closed for c in primary.connections)
@@ -0,0 +1,144 @@
+# test_exam_packages.py — حزمة الامتحان في الذاكرة (routers/exam_packages.py): نسخة كل طالب والتحميل المشترك
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from routers import exam_packages
+from routers.exam_packages import ExamPackage, ExamPackageCache
+
+
+def _exam_row(exam_id: int = 7, num_to_show: int | None = None, shuffle_questions: bool = False,
+              shuffle_options: bool = False) -> dict:
+    return {"id": exam_id, "title": "Exam", "description": None, "duration": 30, "num_to_show": num_to_show,
+            "shuffle_questions": shuffle_questions, "shuffle_options": shuffle_options, "required": False}
+
+
+def _question_rows(count: int) -> list:
+    return [{"id": 100 + n, "subject_id": 1, "chapter_id": None, "question_text": f"Q{n}",
+             "question_image_url": None, "question_type": "mcq", "difficulty": "easy", "expected_time": 60,
+             "explanation": "secret"} for n in range(count)]
+
+
+def _choice_rows(question_rows: list) -> list:
+    return [{"id": q["id"] * 10 + n, "exam_question_id": q["id"], "text": f"C{n}", "is_correct": n == 0}
+            for q in question_rows for n in range(4)]
+
+
+def _package(count: int = 20, **exam) -> ExamPackage:
+    questions = _question_rows(count)
+    choices = {}
+    for row in _choice_rows(questions):
+        choices.setdefault(row["exam_question_id"], []).append({"id": row["id"], "text": row["text"]})
+    return ExamPackage(_exam_row(**exam), questions, choices)
+
+
+def _ids(questions: list) -> list:
+    return [q["id"] for q in questions]
+
+
+def test_same_student_gets_same_subset_and_order():
+    package = _package(num_to_show=5, shuffle_questions=True, shuffle_options=True)
+
+    first = package.for_student(42)
+
+    assert package.for_student(42) == first
+    # حزمة اتبنت من جديد (worker تاني أو بعد الـ TTL) بتدي نفس النسخة
+    assert _package(num_to_show=5, shuffle_questions=True, shuffle_options=True).for_student(42) == first
+    assert any(_ids(package.for_student(user_id)) != _ids(first) for user_id in range(43, 53))
+
+
+def test_num_to_show_picks_that_many_distinct_questions():
+    package = _package(num_to_show=5)
+
+    questions = package.for_student(42)
+
+    assert len(questions) == 5
+    assert len(set(_ids(questions))) == 5
+    assert [q["position"] for q in questions] == [1, 2, 3, 4, 5]
+    assert len(_package(num_to_show=0).for_student(42)) == 20
+    assert len(_package(num_to_show=50).for_student(42)) == 20
+
+
+def test_without_shuffle_questions_keep_pool_order():
+    assert _ids(_package().for_student(42)) == list(range(100, 120))
+    subset = _ids(_package(num_to_show=5).for_student(42))
+    assert subset == sorted(subset)
+
+
+def test_shuffle_questions_changes_order():
+    full = _ids(_package(shuffle_questions=True).for_student(42))
+    assert sorted(full) == list(range(100, 120)) and full != sorted(full)
+    subset = _ids(_package(num_to_show=10, shuffle_questions=True).for_student(42))
+    assert subset != sorted(subset)
+
+
+def test_shuffle_options_only_when_enabled():
+    in_order = [[c["text"] for c in q["choices"]] for q in _package().for_student(42)]
+    assert all(texts == ["C0", "C1", "C2", "C3"] for texts in in_order)
+
+    shuffled = [[c["text"] for c in q["choices"]] for q in _package(shuffle_options=True).for_student(42)]
+    assert all(sorted(texts) == ["C0", "C1", "C2", "C3"] for texts in shuffled)
+    assert any(texts != ["C0", "C1", "C2", "C3"] for texts in shuffled)
+    # ترتيب الأسئلة نفسه مبيتغيرش
+    assert _ids(_package(shuffle_options=True).for_student(42)) == list(range(100, 120))
+
+
+class FakeRouter:
+    """connect() بيستنى الـ gate: الطلبات كلها بتوصل والتحميل لسه شغال."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.connects = 0
+
+    @asynccontextmanager
+    async def connect(self, intent, user_id=None):
+        self.connects += 1
+        await self.gate.wait()
+        yield object()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    questions = _question_rows(3)
+
+    async def fetchrow(conn, name, *args):
+        assert name == "exam_meta"
+        return _exam_row(exam_id=args[0])
+
+    async def fetch(conn, name, *args):
+        return {"exam_questions_pool": questions, "exam_choices_batch": _choice_rows(questions)}[name]
+
+    fake_router = FakeRouter()
+    monkeypatch.setattr(exam_packages, "db_router", fake_router)
+    monkeypatch.setattr(exam_packages.hot_queries, "fetchrow", fetchrow)
+    monkeypatch.setattr(exam_packages.hot_queries, "fetch", fetch)
+    return fake_router
+
+
+def test_loaded_package_has_no_answers(fake_db):
+    fake_db.gate.set()
+    package = asyncio.run(ExamPackageCache().get(7))
+
+    for question, choices in package.questions:
+        assert "explanation" not in question
+        assert all(set(choice) == {"id", "text"} for choice in choices)
+    assert all("is_correct" not in choice for q in package.for_student(42) for choice in q["choices"])
+
+
+def test_concurrent_gets_share_one_load(fake_db):
+    cache = ExamPackageCache()
+
+    async def run():
+        requests = [asyncio.ensure_future(cache.get(7)) for _ in range(50)]
+        await asyncio.sleep(0)
+        fake_db.gate.set()
+        return await asyncio.gather(*requests)
+
+    packages = asyncio.run(run())
+
+    assert fake_db.connects == 1
+    assert all(package is packages[0] for package in packages)
+    assert (cache.loads, cache.coalesced) == (1, 49)
+    assert asyncio.run(cache.get(7)) is packages[0]
+    assert cache.hits == 1 and fake_db.connects == 1
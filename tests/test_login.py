@@ -0,0 +1,188 @@
+# test_login.py — الدخول: الـ connection مش محجوز أثناء bcrypt، و round trips حقيقية للـ DB (مش cursor executes بس)
+import uuid
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+from sqlalchemy import text
+
+from .conftest import requires_db
+
+
+class RoundTripConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection بيعد الرسايل اللي بتروح للسيرفر: كل execute (ومعاه BEGIN ضمني لو مش autocommit
+    ومفيش transaction مفتوحة)، والـ COMMIT/ROLLBACK لو فيه transaction. الـ pre-ping execute عادي فبيتحسب.
+    """
+    round_trips = 0
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", RoundTripCursor)
+        return super().cursor(*args, **kwargs)
+
+    def _end(self, method):
+        if self.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            RoundTripConnection.round_trips += 1
+        return method()
+
+    def commit(self):
+        return self._end(super().commit)
+
+    def rollback(self):
+        return self._end(super().rollback)
+
+
+class RoundTripCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        connection = self.connection
+        if not connection.autocommit and connection.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            RoundTripConnection.round_trips += 1
+        RoundTripConnection.round_trips += 1
+        return super().execute(query, vars)
+
+
+@pytest.fixture
+def round_trips(client, monkeypatch):
+    """engine.pool بـ connections بتعد الـ round trips (مع الـ pre-ping)؛ بيرجّع دالة بتقرا العداد من أول الاختبار."""
+    from routers.database import engine
+    pool = engine.pool.recreate()
+    dsn = engine.url.render_as_string(hide_password=False).replace("postgresql+psycopg2://", "postgresql://")
+    pool._creator = lambda: psycopg2.connect(dsn, connection_factory=RoundTripConnection)
+    monkeypatch.setattr(engine, "pool", pool)
+    # connection سخن في الـ pool: الـ connect نفسه (وإعداد الـ dialect) مش جزء من الدخول
+    with engine.connect():
+        pass
+    RoundTripConnection.round_trips = 0
+    yield lambda: RoundTripConnection.round_trips
+    pool.dispose()
+
+
+def _create_user(password: str) -> str:
+    from routers.database import engine
+    from routers.users_common import hash_password
+    phone_number = "010" + str(uuid.uuid4().int)[:8]
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO public.users (name, phone_number, password, grade)
+            VALUES ('Login Test', :phone_number, :password, 'third secondary')
+        """), {"phone_number": phone_number, "password": hash_password(password)})
+    return phone_number
+
+
+@requires_db
+def test_login_releases_connection_during_bcrypt(client, monkeypatch):
+    from routers import login
+    from routers.database import engine
+
+    phone_number = _create_user("secret123")
+    checked_out = []
+    verify = login.verify_and_update_password_async
+
+    async def verify_and_record(*args):
+        checked_out.append(engine.pool.checkedout())
+        return await verify(*args)
+
+    monkeypatch.setattr(login, "verify_and_update_password_async", verify_and_record)
+    response = client.post("/api/v1/login", json={"phone_number": phone_number, "password": "secret123"})
+
+    assert response.status_code == 200, response.text
+    assert checked_out == [0]
+
+
+@requires_db
+def test_login_round_trips(client, round_trips):
+    phone_number = _create_user("secret123")
+    start = round_trips()
+
+    response = client.post("/api/v1/login", json={"phone_number": phone_number, "password": "secret123"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["token"]
+    # (pre-ping + SELECT) ثم (pre-ping + الـ write CTE) — من غير BEGIN/COMMIT
+    assert round_trips() - start == 4
+
+
+@requires_db
+def test_failed_login_does_not_write(client, round_trips):
+    phone_number = _create_user("secret123")
+    start = round_trips()
+
+    response = client.post("/api/v1/login", json={"phone_number": phone_number, "password": "wrong"})
+
+    assert response.status_code == 401
+    assert round_trips() - start == 2
+
+
+def _set_password(phone_number: str, stored: str):
+    from routers.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE public.users SET password = :p WHERE phone_number = :phone_number"),
+                     {"p": stored, "phone_number": phone_number})
+
+
+def _stored_password(phone_number: str) -> str:
+    from routers.database import engine
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT password FROM public.users WHERE phone_number = :phone_number"),
+                            {"phone_number": phone_number}).scalar()
+
+
+def test_untagged_hash_costs_two_checks_until_tagged(monkeypatch):
+    from routers import users_common
+    from routers.users_common import hash_password, split_password_hash, verify_and_update_password
+
+    calls = []
+    for name, scheme in (("_verify_bcrypt_sha256", "bcrypt_sha256"), ("_verify_bcrypt_raw", "bcrypt")):
+        verify = getattr(users_common, name)
+        counted = lambda *args, _v=verify, _n=name: calls.append(_n) or _v(*args)  # noqa: E731
+        monkeypatch.setattr(users_common, name, counted)
+        monkeypatch.setitem(users_common.PASSWORD_SCHEMES, scheme, counted)
+    tagged = hash_password("secret123")
+    untagged = split_password_hash(tagged)[1]
+
+    # من غير prefix مش معروف الهاش على SHA256 ولا لأ: الغلط بيجرب الاتنين
+    assert verify_and_update_password("wrong", untagged) == (False, None)
+    assert calls == ["_verify_bcrypt_sha256", "_verify_bcrypt_raw"]
+    # الصح بيرجع نفس الـ bcrypt بالـ prefix (من غير rehash) عشان الـ caller يحفظه
+    assert verify_and_update_password("secret123", untagged) == (True, tagged)
+    calls.clear()
+    assert verify_and_update_password("wrong", tagged) == (False, None)
+    assert calls == ["_verify_bcrypt_sha256"]
+
+
+@requires_db
+def test_untagged_hash_tagged_on_first_login(client):
+    from routers.users_common import split_password_hash
+
+    phone_number = _create_user("secret123")
+    tagged = _stored_password(phone_number)
+    _set_password(phone_number, split_password_hash(tagged)[1])
+
+    assert client.post("/api/v1/login", json={"phone_number": phone_number, "password": "wrong"}).status_code == 401
+    assert _stored_password(phone_number) != tagged
+    response = client.post("/api/v1/login", json={"phone_number": phone_number, "password": "secret123"})
+
+    assert response.status_code == 200, response.text
+    assert _stored_password(phone_number) == tagged
+
+
+@requires_db
+def test_login_does_not_overwrite_password_changed_during_verify(client, monkeypatch):
+    from routers import login
+    from routers.users_common import hash_password, split_password_hash
+
+    phone_number = _create_user("secret123")
+    _set_password(phone_number, split_password_hash(_stored_password(phone_number))[1])
+    changed = hash_password("changed456")
+    verify = login.verify_and_update_password_async
+
+    async def verify_then_change(*args):
+        result = await verify(*args)
+        _set_password(phone_number, changed)  # تغيير كلمة المرور وإحنا في طابور bcrypt
+        return result
+
+    monkeypatch.setattr(login, "verify_and_update_password_async", verify_then_change)
+    response = client.post("/api/v1/login", json={"phone_number": phone_number, "password": "secret123"})
+
+    assert response.status_code == 200, response.text
+    assert _stored_password(phone_number) == changed
@@ -0,0 +1,101 @@
+# test_migrations.py — migrations على قاعدة الاختبار (routers/migrations.py)
+import random
+
+import pytest
+from sqlalchemy import text
+
+from tests.conftest import requires_db
+
+pytestmark = requires_db
+
+
+def _phone() -> str:
+    return "011" + "".join(random.choices("0123456789", k=8))
+
+
+def _register(client, phone: str):
+    return client.post("/api/v1/register", json={
+        "name": "Dup Test", "phone_number": phone, "password": "secret123", "parent_number": _phone(),
+        "birth_date": "2008-01-01", "governorate": "القاهرة", "grade": "S1", "section": "ادبي", "lang_type": "عربي",
+    })
+
+
+def test_phone_unique_migration_stops_on_duplicates(client):
+    from routers.database import engine
+    from routers.migrations import migrate
+
+    phone = _phone()
+    with engine.begin() as conn:
+        # قاعدة قديمة: من غير الـ unique index، ورقم متسجل مرتين
+        conn.execute(text("DROP INDEX IF EXISTS public.uq_users_phone_number"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_users_phone_number ON public.users(phone_number)"))
+        conn.execute(text("DELETE FROM public.schema_migrations WHERE version = 5"))
+        for _ in range(2):
+            conn.execute(text("INSERT INTO public.users (name, phone_number, password) VALUES ('Dup', :p, 'x')"),
+                         {"p": phone})
+    try:
+        with pytest.raises(Exception, match="duplicated numbers"):
+            migrate()
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT to_regclass('public.uq_users_phone_number')")).scalar() is None
+            assert conn.execute(text("SELECT 1 FROM public.schema_migrations WHERE version = 5")).scalar() is None
+
+        # التسجيل شغال من غير الـ index (SELECT قبل الـ INSERT)
+        assert _register(client, phone).status_code == 409
+        new_phone = _phone()
+        assert _register(client, new_phone).status_code == 200
+        assert _register(client, new_phone).status_code == 409
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                DELETE FROM public.users
+                WHERE phone_number = :p AND id > (SELECT min(id) FROM public.users WHERE phone_number = :p)
+            """), {"p": phone})
+
+    assert [repr(m) for m, _ in migrate()] == ["0005_users_phone_unique"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass('public.uq_users_phone_number')")).scalar() is not None
+        assert conn.execute(text("SELECT to_regclass('public.idx_users_phone_number')")).scalar() is None
+    assert _register(client, phone).status_code == 409
+
+
+def test_concurrent_index_on_missing_table_fails():
+    from routers.database import engine
+    from routers.migrations import _run_concurrent_index
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        with pytest.raises(RuntimeError, match="public.no_such_table not found"):
+            _run_concurrent_index(conn, "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_missing ON public.no_such_table (id)")
+
+
+def test_legacy_sessions_copied_as_digests_and_dropped():
+    from datetime import datetime, timedelta
+
+    from routers.database import engine
+    from routers.migrations import migrate
+    from routers.sessions_store import token_digest
+
+    now = datetime.utcnow()
+    valid, expired, inactive = (f"legacy.{name}.{random.random()}" for name in ("valid", "expired", "inactive"))
+    with engine.begin() as conn:
+        # جدول sessions القديم زي ما create_tables بيسيبه بعد الـ rename (التوكن كامل)
+        conn.execute(text("""
+            CREATE TABLE public.sessions_legacy (
+                id SERIAL PRIMARY KEY, user_id INTEGER, session VARCHAR(500),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, active BOOLEAN DEFAULT TRUE
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO public.sessions_legacy (user_id, session, created_at, active)
+            VALUES (1, :valid, :recent, TRUE), (1, :expired, :old, TRUE), (1, :inactive, :recent, FALSE)
+        """), {"valid": valid, "expired": expired, "inactive": inactive,
+               "recent": now - timedelta(minutes=5), "old": now - timedelta(hours=3)})
+        conn.execute(text("DELETE FROM public.schema_migrations WHERE version = 7"))
+
+    assert [repr(m) for m, _ in migrate()] == ["0007_drop_sessions_legacy"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass('public.sessions_legacy')")).scalar() is None
+        rows = conn.execute(text("""
+            SELECT token_hash, expires_at - created_at FROM public.sessions WHERE token_hash = ANY(:digests)
+        """), {"digests": [token_digest(t) for t in (valid, expired, inactive)]}).fetchall()
+    assert [(bytes(h), d) for h, d in rows] == [(token_digest(valid), timedelta(minutes=60))]
@@ -0,0 +1,76 @@
+# test_query_stats.py — QueryStatsMiddleware (routers/query_stats.py): العدّاد بيتقفل بعد آخر جزء من الـ body
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from routers import query_stats
+from routers.query_stats import QueryStatsMiddleware
+
+
+async def _plain(request):
+    query_stats.record("SELECT 1", 2.0)
+    return JSONResponse({"ok": True})
+
+
+async def _streamed(request):
+    async def rows():
+        # زي الـ export: كل batch استعلام بيتنفذ وهو بيبعت الـ body
+        for n in range(12):
+            query_stats.record("SELECT * FROM public.questions WHERE id > $1 LIMIT 500", 1.0)
+            yield f"{n}\n".encode()
+    return StreamingResponse(rows(), media_type="text/plain")
+
+
+app = QueryStatsMiddleware(Starlette(routes=[Route("/plain", _plain), Route("/export", _streamed)]))
+
+
+def _get(path: str) -> list:
+    messages = []
+    requested = False
+
+    async def receive():
+        # بعد الـ request العميل فاضل متصل: StreamingResponse بيستنى http.disconnect طول ما بيبعت
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 5000), "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def _headers(messages: list) -> dict:
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    return dict(start["headers"])
+
+
+def test_server_timing_header_counts_handler_queries():
+    with query_stats.capture_queries() as captured:
+        messages = _get("/plain")
+
+    assert _headers(messages)[b"server-timing"].startswith(b'db;dur=2.0;desc="1 queries"')
+    assert [(s.label, s.count) for s in captured] == [("GET /plain", 1)]
+
+
+def test_streamed_body_queries_are_counted_and_flagged(caplog):
+    queries_before = query_stats._totals.stats()["queries"]
+    with query_stats.capture_queries() as captured:
+        messages = _get("/export")
+
+    assert b"".join(m.get("body", b"") for m in messages).count(b"\n") == 12
+    # الـ header اتبعت قبل الـ body: فيه اللي حصل قبل أول byte بس
+    assert b'desc="0 queries"' in _headers(messages)[b"server-timing"]
+    assert [(s.label, s.count) for s in captured] == [("GET /export", 12)]
+    assert query_stats._totals.stats()["queries"] - queries_before == 12
+    assert "N+1 suspected: GET /export" in caplog.text
@@ -0,0 +1,130 @@
+# test_question_export.py — حد الـ exports في نفس الوقت (routers/question_export.py) على DB وهمية: طلبات ASGI مباشرة
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+import main
+from routers import question_export, subjects
+from routers.question_export import QuestionExporter
+
+
+class FakeResult:
+    def mappings(self):
+        return self
+
+    async def partitions(self):
+        return
+        yield
+
+
+class FakeConnection:
+    async def stream(self, statement, params):
+        return FakeResult()
+
+
+class FakeRouter:
+    """connect() بيفضل مستني لحد ما الاختبار يفتح الـ gate — الـ export ماسك مكانه طول الوقت ده."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.open = 0
+
+    @asynccontextmanager
+    async def connect(self, intent, user_id=None):
+        self.open += 1
+        await self.gate.wait()
+        yield FakeConnection()
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    async def decode_token_and_get_user(authorization):
+        return 7, {"grade": "S1"}
+
+    async def catalog_snapshot():
+        return type("Snapshot", (), {"subject_for_grade": lambda self, subject_id, grade: {"id": subject_id}})()
+
+    exporter = QuestionExporter(max_concurrent=2)
+    monkeypatch.setattr(subjects, "decode_token_and_get_user", decode_token_and_get_user)
+    monkeypatch.setattr(subjects, "_catalog_snapshot", catalog_snapshot)
+    monkeypatch.setattr(subjects, "question_exporter", exporter)
+    return exporter
+
+
+async def _get(path: str, disconnect: asyncio.Event) -> tuple:
+    """GET على main.app: (status, body). العميل بيقفل لما disconnect تتعمل set."""
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"authorization", b"Bearer test")], "client": ("127.0.0.1", 5000), "server": ("test", 80),
+    }
+    await main.app(scope, receive, send)
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+def test_simultaneous_exports_over_the_limit_get_503(exporter, monkeypatch):
+    fake_router = FakeRouter()
+    monkeypatch.setattr(question_export, "db_router", fake_router)
+
+    async def run():
+        never = asyncio.Event()
+        requests = [asyncio.create_task(_get("/api/v1/subjects/1/questions/export", never)) for _ in range(3)]
+        # الاتنين اللي خدوا مكان ماسكينه لحد ما الـ gate تتفتح، والتالت لازم يكون رجع 503 قبلها
+        done, _ = await asyncio.wait(requests, timeout=5, return_when=asyncio.FIRST_COMPLETED)
+        assert exporter.active == 2
+        fake_router.gate.set()
+        return [await r for r in requests], done
+
+    results, done = asyncio.run(run())
+
+    assert sorted(status for status, _ in results) == [200, 200, 503]
+    assert [json.loads(body)["success"] for status, body in results if status == 503] == [False]
+    assert [task.result()[0] for task in done] == [503]
+    assert fake_router.open == 2
+    assert exporter.active == 0
+    assert exporter.stats()["rejected"] == 1 and exporter.stats()["completed"] == 2
+
+
+def test_slot_released_when_client_leaves_before_the_stream_starts(exporter, monkeypatch):
+    fake_router = FakeRouter()
+    monkeypatch.setattr(question_export, "db_router", fake_router)
+
+    async def run():
+        disconnect = asyncio.Event()
+        disconnect.set()
+        return await _get("/api/v1/subjects/1/questions/export", disconnect)
+
+    asyncio.run(run())
+
+    assert exporter.active == 0
+    assert exporter.try_acquire() is not None
+
+
+def test_slot_release_is_idempotent():
+    exporter = QuestionExporter(max_concurrent=1)
+    slot = exporter.try_acquire()
+    assert exporter.try_acquire() is None
+
+    slot.release()
+    slot.release()
+
+    assert exporter.active == 0
+    assert exporter.try_acquire() is not None
+    assert exporter.try_acquire() is None
@@ -0,0 +1,30 @@
+# test_question_import.py — استيراد الأسئلة بـ COPY (routers/question_import.py) على قاعدة الاختبار
+import io
+import json
+
+from sqlalchemy import text
+
+from tests.conftest import requires_db
+
+pytestmark = requires_db
+
+
+def test_report_caps_question_ids(schema):
+    from routers.database import engine
+    from routers.question_import import question_importer
+
+    with engine.begin() as conn:
+        subject_id = conn.execute(text("INSERT INTO public.subjects (name, grade) VALUES ('Import', 'S1') RETURNING id")).scalar()
+        created_by = conn.execute(text("SELECT min(id) FROM public.users")).scalar()
+    lines = b"".join(
+        json.dumps({"subject_id": subject_id, "question_type": "mcq", "question_text": f"Q{n}"}).encode() + b"\n"
+        for n in range(3)
+    )
+
+    report = question_importer.run(io.BytesIO(lines), "jsonl", created_by, dry_run=True, max_question_ids=2)
+
+    assert report["inserted"] == 3
+    assert [q["line"] for q in report["question_ids"]] == [1, 2]
+    assert report["subject_ids"] == [subject_id]
+
+    assert len(question_importer.run(io.BytesIO(lines), "jsonl", created_by, dry_run=True, max_question_ids=None)["question_ids"]) == 3
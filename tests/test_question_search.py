@@ -0,0 +1,83 @@
+# test_question_search.py — بحث الأسئلة (routers/queries.py _search_sql) على قاعدة الاختبار
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import text
+
+from tests.conftest import requires_db, TEST_DATABASE_URL
+
+pytestmark = requires_db
+
+
+@pytest.fixture
+def subject(schema):
+    """مادة جديدة فيها 5 أسئلة عن التمثيل الضوئي وسؤال عن الوراثة."""
+    from routers.database import engine
+    with engine.begin() as conn:
+        user_id = conn.execute(text("""
+            INSERT INTO public.users (name, phone_number, password) VALUES ('Search', :p, 'x') RETURNING id
+        """), {"p": "012" + "".join(random.choices("0123456789", k=8))}).scalar()
+        subject_id = conn.execute(text("INSERT INTO public.subjects (name, grade) VALUES ('Search', 'S1') RETURNING id")).scalar()
+        texts = [f"سؤال {n} عن التمثيل الضوئي في النبات" for n in range(5)] + ["قوانين الوراثة عند مندل"]
+        ids = [conn.execute(text("""
+            INSERT INTO public.questions (subject_id, question_text, question_type, created_by)
+            VALUES (:s, :t, 'mcq', :u) RETURNING id
+        """), {"s": subject_id, "t": t, "u": user_id}).scalar() for t in texts]
+    return subject_id, ids
+
+
+def _search_all(subject_id: int, q: str, per_page: int) -> list:
+    """كل الصفحات بالـ cursor لحد ما الصفحة تيجي ناقصة: [[(id, truncated), ...], ...]."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+    from routers.database import to_async_url
+    from routers.queries import PreparedStatementRegistry, _search_sql
+
+    async def run():
+        registry = PreparedStatementRegistry({"search": _search_sql()})
+        async_engine = create_async_engine(to_async_url(TEST_DATABASE_URL), poolclass=NullPool)
+        pages, after = [], (None, None)
+        try:
+            async with async_engine.connect() as conn:
+                while True:
+                    rows = await registry.fetch(conn, "search", subject_id, q, per_page, *after)
+                    pages.append([(r["id"], r["truncated"]) for r in rows])
+                    if len(rows) < per_page:
+                        return pages
+                    after = (rows[-1]["score"], rows[-1]["id"])
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(run())
+
+
+def test_search_caps_candidates_by_id_and_pages_without_repeats(subject, monkeypatch):
+    from routers import queries
+    subject_id, ids = subject
+    monkeypatch.setattr(queries, "QUESTION_SEARCH_MAX_CANDIDATES", 3)
+
+    pages = _search_all(subject_id, "التمثيل الضوئي", per_page=2)
+
+    found = [i for page in pages for i, _ in page]
+    assert len(found) == len(set(found))
+    assert sorted(found) == ids[:3]
+    assert all(truncated for page in pages for _, truncated in page)
+
+
+def test_search_ranks_all_matches_under_the_cap(subject, monkeypatch):
+    from routers import queries
+    subject_id, ids = subject
+    monkeypatch.setattr(queries, "QUESTION_SEARCH_MAX_CANDIDATES", 5)
+
+    pages = _search_all(subject_id, "التمثيل الضوئي", per_page=2)
+
+    assert sorted(i for page in pages for i, _ in page) == ids[:5]
+    assert not any(truncated for page in pages for _, truncated in page)
+
+
+def test_search_falls_back_to_trigram_only_without_fulltext_hits(subject):
+    subject_id, ids = subject
+
+    assert _search_all(subject_id, "الوراسة", per_page=10) == [[(ids[5], False)]]
+    # فيه تطابق full-text: الـ trigram مبيضيفش حاجة
+    assert sorted(i for i, _ in _search_all(subject_id, "الضوئي", per_page=10)[0]) == ids[:5]
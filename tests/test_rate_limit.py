@@ -0,0 +1,40 @@
+# test_rate_limit.py — IP العميل للـ rate limit ورا proxy (routers/rate_limit.py)
+import ipaddress
+
+import pytest
+from starlette.requests import Request
+
+from routers import rate_limit
+
+
+def _request(peer: str, forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/api/v1/login", "headers": headers,
+                    "client": (peer, 51000)})
+
+
+@pytest.fixture
+def trusted(monkeypatch):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXIES", (ipaddress.ip_network("10.0.0.0/8"),))
+
+
+def test_forwarded_for_ignored_without_trusted_proxies():
+    assert rate_limit.client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_forwarded_for_ignored_from_untrusted_peer(trusted):
+    assert rate_limit.client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_client_taken_from_trusted_proxy(trusted):
+    assert rate_limit.client_ip(_request("10.0.0.5", "198.51.100.1")) == "198.51.100.1"
+
+
+def test_spoofed_entries_left_of_real_client_are_ignored(trusted):
+    # العميل بعت X-Forwarded-For: 1.2.3.4 بنفسه، والـ proxies ضافوا IPه الحقيقي وبعدين proxy داخلي
+    request = _request("10.0.0.5", "1.2.3.4, 198.51.100.1, 10.0.0.9")
+    assert rate_limit.client_ip(request) == "198.51.100.1"
+
+
+def test_trusted_proxy_without_header_uses_peer(trusted):
+    assert rate_limit.client_ip(_request("10.0.0.5")) == "10.0.0.5"
@@ -0,0 +1,60 @@
+# test_subject_stats.py — reconcile جدول subject_stats (routers/subject_stats.py)
+import pytest
+from sqlalchemy import text
+
+from tests.conftest import requires_db
+
+pytestmark = requires_db
+
+
+@pytest.fixture
+def subjects(schema):
+    """مادتين جداد، كل واحدة فيها فصل."""
+    from routers.database import engine
+    with engine.begin() as conn:
+        ids = [conn.execute(text("INSERT INTO public.subjects (name, grade) VALUES (:n, 'S1') RETURNING id"),
+                            {"n": f"Stats {n}"}).scalar() for n in range(2)]
+        for subject_id in ids:
+            conn.execute(text("INSERT INTO public.chapters (subject_id, name) VALUES (:s, 'Ch')"), {"s": subject_id})
+    return ids
+
+
+def _chapters_count(subject_id: int) -> int:
+    from routers.database import engine
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT chapters_count FROM public.subject_stats WHERE subject_id = :s"),
+                            {"s": subject_id}).scalar()
+
+
+def test_reconcile_fixes_only_drifted_rows_without_blocking_other_writes(subjects):
+    from routers.database import engine
+    from routers.subject_stats import SubjectStatsReconciler
+
+    drifted, busy = subjects
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE public.subject_stats SET chapters_count = 42 WHERE subject_id = :s"), {"s": drifted})
+
+    # كتابة شغالة على مادة تانية ماسكة صفها (زي trigger استيراد أسئلة لسه معملش commit)
+    writer = engine.connect()
+    try:
+        writer.execute(text("UPDATE public.subject_stats SET updated_at = now() WHERE subject_id = :s"), {"s": busy})
+        corrected = SubjectStatsReconciler(interval_seconds=0).reconcile()
+    finally:
+        writer.rollback()
+        writer.close()
+
+    assert corrected == [drifted]
+    assert _chapters_count(drifted) == 1
+    assert _chapters_count(busy) == 1
+
+
+def test_reconcile_skips_while_another_process_runs_it(subjects):
+    from routers.database import engine
+    from routers.subject_stats import SubjectStatsReconciler, SUBJECT_STATS_LOCK_KEY
+
+    reconciler = SubjectStatsReconciler(interval_seconds=0)
+    with engine.begin() as other:
+        other.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SUBJECT_STATS_LOCK_KEY})
+        assert reconciler.reconcile() is None
+    assert reconciler.skipped == 1 and reconciler.runs == 0
+    assert reconciler.reconcile() == []